@@ -12,5 +12,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'drf_site.settings')
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')  # без постоянных соединений в потоках sync_to_async
 
 application = get_asgi_application()
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.0/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -47,11 +48,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'example.middleware.ServerTimingMiddleware',  # первым, чтобы total включал остальные middleware
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'example.middleware.ProfilerMiddleware',  # после AuthenticationMiddleware: нужен request.user
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.contrib.admindocs.middleware.XViewMiddleware'
@@ -81,11 +84,58 @@ WSGI_APPLICATION = 'drf_site.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Постоянные соединения выгодны WSGI воркеру с постоянными потоками. Под ASGI синхронный код идет
+# в потоках пула, и каждый поток держал бы свое соединение - asgi.py выставляет DB_CONN_MAX_AGE=0
+CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    'replica': {  # тот же файл, отдельное соединение только для чтения (PRAGMA query_only)
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# Через кеш идут счетчики поколений (example/generations.py): по ним все воркеры сбрасывают индексы
+# в памяти (id предметов и вопросов), кеш ответов и кеш аутентификации. Общими для воркеров
+# они будут только с общим кешем - при нескольких процессах gunicorn/uvicorn нужен REDIS_URL.
+# Без него LocMemCache: каждый процесс видит только свои изменения (подходит для runserver и тестов)
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
     }
+SHARED_CACHE = bool(REDIS_URL)  # False - поколения и кеши локальны для процесса
+
+DATABASE_ROUTERS = ['example.database.ReadWriteRouter']
+DATABASE_READ_ALIAS = 'replica'  # None - чтение и запись через default
+
+SQLITE_PRAGMAS = {  # выполняются на каждом новом соединении SQLite
+    'journal_mode': 'wal',  # читатели не блокируют писателя и наоборот
+    'synchronous': 'normal',  # в WAL без fsync на каждый коммит, целостность сохраняется
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # KiB
+    'busy_timeout': 5000,  # мс ожидания блокировки записи вместо ошибки database is locked
+    'temp_store': 'memory',
 }
 
 
@@ -146,12 +196,23 @@ REST_FRAMEWORK = {  # default settings
     #         'rest_framework.permissions.IsAuthenticated',
     #     ]
     'DEFAULT_AUTHENTICATION_CLASSES': [
-            'rest_framework.authentication.BasicAuthentication',
+            'example.authentication.CachedBasicAuthentication',  # кеш успешных проверок пароля
             'rest_framework.authentication.SessionAuthentication',
-            'rest_framework_simplejwt.authentication.JWTAuthentication',
+            'example.authentication.CachedJWTAuthentication',  # кеш пользователей по id
         ],
 }
 
+AUTH_CACHE_ENABLED = SHARED_CACHE  # без общего кеша сброс при смене пароля не дойдет до других воркеров
+AUTH_CACHE_SIZE = 10000  # записей в кеше аутентификации каждого воркера
+AUTH_CACHE_TTL = 300  # секунд
+
+ADMIN_EXACT_COUNT_LIMIT = 10000  # больше строк в списке админки - оценка вместо COUNT(*)
+
+REQUEST_TIMING_SAMPLE_RATE = 1.0  # доля запросов с заголовком Server-Timing
+REQUEST_TIMING_SLOW_MS = 500  # запросы дольше пишутся в лог example.timing, None - не писать
+REQUEST_TIMING_SLOW_QUERIES = 5
+PROFILER_MAX_STORED = 100  # профилей запросов в базе (?profile=store)
+
 
 SPECTACULAR_SETTINGS = {
     'TITLE': 'My example API Project',
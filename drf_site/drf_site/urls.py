@@ -19,7 +19,15 @@ from django.urls import path, include, re_path
 from example.views import (
     SubjectApiViewSet, AnswerApiView,
     StudentApiView, TestingListApiView,
-    AttemptView, QuestionDetailApiView
+    AttemptView, QuestionDetailApiView,
+    StudentSubjectStatsApiView, QuestionSearchApiView,
+    QuestionImportApiView, ExportApiView,
+    QuestionBatchApiView
+)
+from example.async_views import (
+    AsyncSubjectListApiView, AsyncSubjectDetailApiView,
+    AsyncSubjectQuizApiView, AsyncQuestionDetailApiView,
+    AsyncAnswerApiView, AsyncStudentApiView
 )
 from rest_framework import routers
 from example.routers import MyCustomRouter
@@ -66,10 +74,25 @@ urlpatterns = [
     path("api/v1/answers/", AnswerApiView.as_view()),
     path("api/v1/students/", StudentApiView.as_view()),
     path("api/v1/students/<int:pk>/", StudentApiView.as_view()),
+    path("api/v1/students/<int:pk>/stats/", StudentSubjectStatsApiView.as_view()),
+    path("api/v1/stats/", StudentSubjectStatsApiView.as_view()),
     path("api/v1/testings/", TestingListApiView.as_view()),
     path("api/v1/testings/<int:pk>/", TestingListApiView.as_view()),
     path("api/v1/attempts/", AttemptView.as_view()),
+    path("api/v1/attempts/export/", ExportApiView.as_view(kind="attempts")),
+    path("api/v1/testings/export/", ExportApiView.as_view(kind="testings")),
+    path("api/v1/questions/", QuestionBatchApiView.as_view()),
+    path("api/v1/questions/search/", QuestionSearchApiView.as_view()),
+    path("api/v1/questions/import/", QuestionImportApiView.as_view()),
     path("api/v1/questions/<int:pk>/", QuestionDetailApiView.as_view()),
+
+    # async варианты read маршрутов для ASGI, ответы совпадают с маршрутами выше
+    path("api/v1/async/subject/", AsyncSubjectListApiView.as_view()),
+    path("api/v1/async/subject/<int:pk>/", AsyncSubjectDetailApiView.as_view()),
+    path("api/v1/async/subject/<int:pk>/quiz/", AsyncSubjectQuizApiView.as_view()),
+    path("api/v1/async/questions/<int:pk>/", AsyncQuestionDetailApiView.as_view()),
+    path("api/v1/async/answers/", AsyncAnswerApiView.as_view()),
+    path("api/v1/async/students/", AsyncStudentApiView.as_view()),
 ]
 
 
@@ -1,18 +1,26 @@
 from django.contrib import admin, messages
-from django.http import HttpRequest
-
+from django.db.models import Q
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from example import grading, search
+from example.admin_performance import PerformanceModelAdmin, RelatedIdFilter
 from example.models import (
     Subject,
     Student,
     Attempt,
     Question,
     Answer,
-    Testing
+    Testing,
+    StudentSubjectStats,
+    RequestProfile
 )
 
 
 @admin.register(Subject)
-class SubjectAdmin(admin.ModelAdmin):
+class SubjectAdmin(PerformanceModelAdmin):
     list_display = "id", "title",
     list_display_links = "title",
     ordering = "id",
@@ -24,34 +32,39 @@ class SubjectAdmin(admin.ModelAdmin):
 
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(PerformanceModelAdmin):
     list_display = "id", "name",
     list_display_links = "name",
     ordering = "id",
     list_per_page = 10
     search_fields = ["name"]
-    list_filter = ["name"]
 
 
 @admin.register(Attempt)
-class AttemptAdmin(admin.ModelAdmin):
+class AttemptAdmin(PerformanceModelAdmin):
     fields = ["student", "subject", "result"]  # только эти поля будут доступны для редактирования
     list_display = "id", "student", "subject", "date", "result"
     list_display_links = "student", "subject", "date", "result"
     ordering = "id",
     list_per_page = 10
     search_fields = ["result", "subject__title"]
-    list_filter = ["result", "subject__title"]
+    list_filter = ["subject", ("student", RelatedIdFilter)]
 
 
 @admin.register(Question)
-class QuestionAdmin(admin.ModelAdmin):
+class QuestionAdmin(PerformanceModelAdmin):
     list_display = "id", "text", "subject", "short_info"
     list_display_links = "text", "subject"
     ordering = "id",
     list_per_page = 10
     search_fields = ["text", "subject__title"]
-    list_filter = ["text", "subject__title"]
+    list_filter = ["subject"]  # FK фильтр читает таблицу предметов, а не DISTINCT по тексту вопросов
+
+    def get_search_results(self, request, queryset, search_term):  # поиск через FTS5 индекс вместо LIKE '%...%'
+        if not search_term or not search.is_available():
+            return super().get_search_results(request, queryset, search_term)
+        subjects = Subject.objects.filter(title__icontains=search_term).values("pk")
+        return queryset.filter(search.question_filter(search_term) | Q(subject__in=subjects)), False
 
     @admin.display(description="Краткое описание", ordering="text")  # для изменения заголовка колонки в админке
     def short_info(self, question: Question):  # для отображения доп информации в колонках модели в админке
@@ -59,7 +72,7 @@ class QuestionAdmin(admin.ModelAdmin):
 
 
 @admin.register(Answer)
-class AnswerAdmin(admin.ModelAdmin):
+class AnswerAdmin(PerformanceModelAdmin):
     readonly_fields = ["text"]    # только для чтения, редактировать нельзя
     list_display = "id", "text", "is_correct", "question"
     list_display_links = "text", "question"
@@ -68,28 +81,84 @@ class AnswerAdmin(admin.ModelAdmin):
     list_per_page = 10
     actions = ("set_correct_answer", "set_incorrect_answer")
     search_fields = ["text", "question__text"]
-    list_filter = ["text", "question__text", "is_correct"]
+    list_filter = [("question", RelatedIdFilter), "is_correct"]
     # prepopulated_fields = {"slug": ("title", )}  - автоматическое создание слага (обязательно редактируемый)
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not search.is_available():
+            return super().get_search_results(request, queryset, search_term)
+        questions = Question.objects.filter(search.question_filter(search_term)).values("pk")
+        return queryset.filter(search.answer_filter(search_term) | Q(question__in=questions)), False
+
     @admin.action(description="Установить ответы правильными")
     def set_correct_answer(self, request: HttpRequest, queryset):  # добавления пользовательского действия в админке
-        count = queryset.update(is_correct=True)
+        answer_ids = list(queryset.values_list("pk", flat=True))
+        count = queryset.update(is_correct=True)  # update() не шлет сигналы, пересчитываем попытки вручную
+        grading.grade_for_answers(answer_ids)
         self.message_user(request, f"Изменено {count} ответов")
 
     @admin.action(description="Установить ответы неправильными")
     def set_incorrect_answer(self, request: HttpRequest, queryset):  # добавления пользовательского действия в админке
+        answer_ids = list(queryset.values_list("pk", flat=True))
         count = queryset.update(is_correct=False)
+        grading.grade_for_answers(answer_ids)
         self.message_user(request, f"Изменено {count} ответов", level=messages.WARNING)
         # сообщение при применении действия с иконкой внимание /\
 
 
 @admin.register(Testing)
-class TestingAdmin(admin.ModelAdmin):
+class TestingAdmin(PerformanceModelAdmin):
     # exclude = ["attempt"]  - это поле исключается из редактируемых
     list_display = "id", "attempt", "question", "answer"
     list_display_links = "attempt",
     ordering = "id",  # сортировка
     list_editable = "question", "answer"
+    raw_id_fields = "question", "answer"  # вместо выпадающих списков со всеми вопросами и ответами в каждой строке
     list_per_page = 10
     search_fields = ["question__text", "answer__text"]
-    list_filter = ["question__text", "answer__text"]
+    list_filter = [("question", RelatedIdFilter), ("answer", RelatedIdFilter)]
+
+
+@admin.register(StudentSubjectStats)
+class StudentSubjectStatsAdmin(PerformanceModelAdmin):
+    list_display = "id", "student", "subject", "attempt_count", "average_result", "best_result", "last_attempt_date"
+    list_select_related = "student", "subject"
+    ordering = "id",
+    list_per_page = 10
+    readonly_fields = "student", "subject", "attempt_count", "result_sum", "best_result", "last_attempt_date"
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(PerformanceModelAdmin):
+    list_display = "id", "created_at", "method", "path", "status", "duration_ms", "user", "download"
+    list_display_links = "id", "path"
+    list_per_page = 20
+    exclude = "stats", "summary"
+    readonly_fields = "created_at", "user", "method", "path", "status", "duration_ms", "summary_text", "download"
+
+    def get_queryset(self, request: HttpRequest):
+        return super().get_queryset(request).defer("stats")  # двоичный профиль нужен только для скачивания
+
+    def has_add_permission(self, request: HttpRequest) -> bool:  # профили создает только ProfilerMiddleware
+        return False
+
+    def get_urls(self):
+        return [
+            path("<int:pk>/download/", self.admin_site.admin_view(self.download_view),
+                 name="example_requestprofile_download"),
+            *super().get_urls(),
+        ]
+
+    def download_view(self, request: HttpRequest, pk: int) -> HttpResponse:
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(bytes(profile.stats), content_type="application/octet-stream")
+        response["Content-Disposition"] = f'attachment; filename="profile-{profile.pk}.prof"'
+        return response
+
+    @admin.display(description="pstats")
+    def download(self, profile: RequestProfile):
+        return format_html('<a href="{}">Скачать</a>', reverse("admin:example_requestprofile_download", args=[profile.pk]))
+
+    @admin.display(description="Сводка")
+    def summary_text(self, profile: RequestProfile):
+        return format_html("<pre>{}</pre>", profile.summary)
@@ -0,0 +1,184 @@
+"""
+Режим производительности админки для больших таблиц: фильтры по id связанной записи вместо
+SELECT DISTINCT по текстовым колонкам, select_related для FK колонок list_display,
+оценка числа строк вместо полного COUNT(*) и подписи raw id полей одним запросом на страницу
+"""
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import AutoField, BigAutoField, ForeignKey, Max, QuerySet
+from django.urls import NoReverseMatch, reverse
+from django.utils.functional import cached_property
+from django.utils.text import Truncator
+from django.utils.translation import gettext_lazy as _
+
+EXACT_COUNT_LIMIT = getattr(settings, "ADMIN_EXACT_COUNT_LIMIT", 10000)  # до этого числа строк считаем точно
+
+
+def table_estimate(queryset: QuerySet) -> int | None:
+    """
+    Примерное число строк таблицы без прохода по ней; None если оценить нельзя
+    """
+    connection = connections[queryset.db]
+    model = queryset.model
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+        return row[0] if row and row[0] >= 0 else None
+    if isinstance(model._meta.pk, (AutoField, BigAutoField)):
+        # максимальный ключ берется из индекса, удаленные строки дают оценку сверху
+        return model._default_manager.using(queryset.db).aggregate(estimate=Max("pk"))["estimate"] or 0
+    return None
+
+
+def estimate_count(queryset: QuerySet, limit: int | None = None) -> int:
+    """
+    Точный счет для небольших выборок; без фильтров - оценка по таблице,
+    с фильтрами - COUNT не дальше limit + 1 строк
+    """
+    limit = EXACT_COUNT_LIMIT if limit is None else limit
+    if not queryset.query.where:
+        estimate = table_estimate(queryset)
+        if estimate is not None and estimate > limit:
+            return estimate
+    return queryset.order_by()[:limit + 1].count()
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор списка админки с оценкой количества строк. Счет с фильтрами идет до конца
+    запрошенной страницы и еще одной строки (проба следующей страницы): дальние страницы
+    открываются, а список показывает "больше N" вместо точного числа
+    """
+    def __init__(self, *args, page_number: int = 1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_number = page_number
+
+    @cached_property
+    def limit(self) -> int:
+        # COUNT по строкам до страницы стоит столько же, сколько OFFSET самой страницы
+        return max(EXACT_COUNT_LIMIT, self.page_number * self.per_page)
+
+    @cached_property
+    def count(self) -> int:
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        if self.object_list.query.where:
+            return estimate_count(self.object_list, self.limit)
+        return estimate_count(self.object_list)  # без фильтров оценка по таблице, проба не нужна
+
+    @cached_property
+    def count_is_lower_bound(self) -> bool:
+        """
+        Счет с фильтрами остановился на limit + 1: строк больше limit, точное число неизвестно
+        """
+        return isinstance(self.object_list, QuerySet) and bool(self.object_list.query.where) and self.count > self.limit
+
+
+class RelatedIdFilter(admin.FieldListFilter):
+    """
+    Фильтр по id связанной записи: поле ввода вместо списка всех значений
+    """
+    template = "admin/example/related_id_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f"{field_path}__{field.target_field.name}__exact"
+        super().__init__(field, request, params, model, model_admin, field_path)
+        values = self.used_parameters.get(self.lookup_kwarg)
+        self.lookup_val = values[-1] if values else None
+        self.hidden_params = []
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    @cached_property
+    def selected_object(self):
+        if not self.lookup_val:
+            return None
+        return self.field.related_model._default_manager.filter(pk=self.lookup_val).first()
+
+    def choices(self, changelist):
+        # остальные параметры списка передаются скрытыми полями формы
+        self.hidden_params = [
+            (name, value) for name, values in changelist.filter_params.items()
+            if name != self.lookup_kwarg for value in values
+        ]
+        yield {
+            "selected": self.lookup_val is None,
+            "query_string": changelist.get_query_string(remove=[self.lookup_kwarg]),
+            "display": _("All"),
+        }
+
+
+class PrefetchedRawIdWidget(ForeignKeyRawIdWidget):
+    """
+    Raw id виджет, который берет подпись из заранее загруженных объектов
+    """
+    objects = None  # {str(pk): объект}, заполняет формсет списка
+
+    def label_and_url_for_value(self, value):
+        if self.objects is None or value in (None, ""):
+            return super().label_and_url_for_value(value)
+        obj = self.objects.get(str(value))
+        if obj is None:
+            return "", ""
+        try:
+            url = reverse(
+                f"{self.admin_site.name}:{obj._meta.app_label}_{obj._meta.model_name}_change",
+                args=(obj.pk,),
+            )
+        except NoReverseMatch:
+            url = ""
+        return Truncator(obj).words(14), url
+
+
+class PerformanceModelAdmin(admin.ModelAdmin):
+    """
+    ModelAdmin для больших таблиц
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # второй COUNT(*) по всей таблице
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        try:
+            page_number = max(int(request.GET.get(PAGE_VAR, 1)), 1)
+        except ValueError:
+            page_number = 1
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page, page_number=page_number)
+
+    def get_list_select_related(self, request):
+        """
+        select_related только по FK колонкам list_display, а не по всем связям рекурсивно
+        """
+        if self.list_select_related is not False:
+            return self.list_select_related
+        foreign_keys = {field.name for field in self.model._meta.fields if isinstance(field, ForeignKey)}
+        return tuple(name for name in self.get_list_display(request) if name in foreign_keys)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.raw_id_fields:
+            kwargs["widget"] = PrefetchedRawIdWidget(db_field.remote_field, self.admin_site, using=kwargs.get("using"))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_formset(self, request, **kwargs):
+        formset_class = super().get_changelist_formset(request, **kwargs)
+        raw_fields = [name for name in self.list_editable if name in self.raw_id_fields]
+        if not raw_fields:
+            return formset_class
+
+        class PrefetchedLabelsFormSet(formset_class):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                for name in raw_fields:
+                    # подписи всех строк страницы одним запросом вместо запроса на виджет
+                    values = {form.initial.get(name) for form in self.forms} - {None, ""}
+                    model = self.model._meta.get_field(name).related_model
+                    objects = {str(pk): obj for pk, obj in model._default_manager.in_bulk(values).items()}
+                    for form in self.forms:
+                        form.fields[name].widget.objects = objects
+
+        return PrefetchedLabelsFormSet
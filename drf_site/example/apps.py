@@ -5,3 +5,6 @@ class ExampleConfig(AppConfig):
     verbose_name = "Приложение пример"  # название приложения в админке
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'example'
+
+    def ready(self):
+        from example import signals  # noqa: F401 - регистрация обработчиков сигналов
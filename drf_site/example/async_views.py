@@ -0,0 +1,215 @@
+"""
+Асинхронные варианты read маршрутов для ASGI (/api/v1/async/...): ответы те же, что у синхронных
+view, но запрос к базе идет через async ORM (aget, acount, aiterator) без потока на весь запрос
+"""
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.shortcuts import aget_object_or_404
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from example import sampling, timing
+from example.compiled import compile_serializer
+from example.models import Answer, Question, Student, Subject
+from example.pagination import AsyncPageNumberMixin
+from example.permissions import IsAdminOrReadOnly
+from example.renderers import NDJSONRenderer
+from example.response_cache import cache_response
+from example.serializers import (
+    AnswerSerializer, QuestionDetailSerializer,
+    QuizQuestionSerializer, StudentSerializer,
+    SubjectSerializer, optimize_queryset
+)
+from example.streaming import astream_queryset, stream_format
+from example.views import PaginationClass, SubjectApiViewSet, parse_quiz_size
+
+
+class AsyncPaginationClass(AsyncPageNumberMixin, PaginationClass):
+    """
+    Та же пагинация, что у SubjectApiViewSet
+    """
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView с async def обработчиками: в DRF 3.14 dispatch() только синхронный.
+    Аутентификация, права и throttling - один переход в поток, обработчик и JSON рендер - в event loop
+    """
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)  # request.user может читать сессию из базы
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if isawaitable(response):  # options() и http_method_not_allowed() синхронные
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.rendered(self.response)
+
+    @staticmethod
+    def rendered(response):
+        """
+        Готовый HttpResponse: у ответа с render() Django вызывает его через sync_to_async.
+        Browsable API остается шаблонным ответом - шаблон читает request.user
+        """
+        if not isinstance(response, Response) or isinstance(response.accepted_renderer, BrowsableAPIRenderer):
+            return response
+        response.render()
+        plain = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            plain[header] = value
+        return plain
+
+
+class AsyncSubjectListApiView(AsyncAPIView):
+    """
+    Предметы
+    """
+    queryset = Subject.objects.all()
+    pagination_class = AsyncPaginationClass
+
+    @extend_schema(
+        summary="Get all subjects (async)",
+        responses={
+            404: OpenApiResponse(description="Invalid page"),
+            200: SubjectSerializer
+        }
+    )
+    @cache_response()
+    async def get(self, request: Request) -> Response:
+        """
+        Страница предметов через скомпилированный сериализатор, как в SubjectApiViewSet.list()
+        """
+        compiled = compile_serializer(SubjectSerializer)
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(compiled.values(self.queryset), request, self)
+        return paginator.get_paginated_response(compiled.serialize(page))
+
+
+class AsyncSubjectDetailApiView(AsyncAPIView):
+    """
+    Предмет по id
+    """
+    queryset = Subject.objects.all()
+    lookup_field = "pk"
+    lookup_url_kwarg = None
+
+    @extend_schema(
+        summary="Get subject by id (async)",
+        responses={
+            404: OpenApiResponse(description="No subject for id"),
+            200: SubjectSerializer
+        }
+    )
+    @cache_response(detail=True)
+    async def get(self, request: Request, pk: int) -> Response:
+        return Response(timing.serializer_data(SubjectSerializer(await aget_object_or_404(self.queryset, pk=pk))))
+
+
+class AsyncSubjectQuizApiView(AsyncAPIView):
+    """
+    Случайные вопросы предмета
+    """
+    @extend_schema(
+        summary="Get random quiz for subject (async)",
+        parameters=[OpenApiParameter("n", int, description="Количество вопросов (по умолчанию 20)")],
+        responses={
+            400: OpenApiResponse(description="n is not an integer"),
+            404: OpenApiResponse(description="No subject for id"),
+            200: QuizQuestionSerializer(many=True)
+        }
+    )
+    async def get(self, request: Request, pk: int) -> Response:
+        count = parse_quiz_size(request.query_params, SubjectApiViewSet.quiz_size, SubjectApiViewSet.max_quiz_size)
+        index = await sync_to_async(sampling.get_index)()
+        if not index.has_subject(pk):
+            raise NotFound("No subject for id")
+
+        queryset = optimize_queryset(Question.objects.all(), QuizQuestionSerializer)
+        questions = await sampling.asample_questions(pk, count, queryset)
+        data = timing.serializer_data(QuizQuestionSerializer(questions, many=True))
+        return Response({"subject": pk, "questions": data})
+
+
+class AsyncQuestionDetailApiView(AsyncAPIView):
+    """
+    Вопрос со статистикой
+    """
+    queryset = Question.objects.all()
+    permission_classes = IsAdminOrReadOnly,
+    lookup_field = "pk"
+    lookup_url_kwarg = None
+
+    @extend_schema(
+        summary="Get question by id (async)",
+        responses={
+            404: OpenApiResponse(description="No question for id"),
+            200: QuestionDetailSerializer
+        }
+    )
+    @cache_response(detail=True)
+    async def get(self, request: Request, pk: int) -> Response:
+        queryset = optimize_queryset(self.queryset, QuestionDetailSerializer)
+        return Response(timing.serializer_data(QuestionDetailSerializer(await aget_object_or_404(queryset, pk=pk))))
+
+
+class AsyncAnswerApiView(AsyncAPIView):
+    """
+    Ответы
+    """
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+
+    @extend_schema(
+        summary="Get all answers (async)",
+        responses={
+            404: OpenApiResponse(description="Unknown error"),
+            200: AnswerSerializer
+        }
+    )
+    async def get(self, request: Request) -> Response:
+        queryset = optimize_queryset(Answer.objects.order_by("pk"), AnswerSerializer)
+        fmt = stream_format(request)
+        if fmt is not None:
+            return astream_queryset(queryset, AnswerSerializer, fmt)
+        answers = [answer async for answer in queryset]
+        return Response({"data": timing.serializer_data(AnswerSerializer(answers, many=True))})
+
+
+class AsyncStudentApiView(AsyncAPIView):
+    """
+    Студенты
+    """
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+
+    @extend_schema(
+        summary="Get all students (async)",
+        responses={
+            404: OpenApiResponse(description="No students"),
+            200: StudentSerializer
+        }
+    )
+    async def get(self, request: Request) -> Response:
+        queryset = Student.objects.order_by("pk")
+        fmt = stream_format(request)
+        if fmt is not None:
+            return astream_queryset(queryset, StudentSerializer, fmt)
+        students = [student async for student in queryset]
+        return Response({"data": timing.serializer_data(StudentSerializer(students, many=True))})
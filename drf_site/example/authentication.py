@@ -0,0 +1,150 @@
+"""
+Аутентификация с кешем в памяти воркера: успешные проверки Basic пароля (PBKDF2 ~100 мс)
+и пользователи по id для JWT. Изменения пользователя сбрасывают кеш через поколение в кеше Django,
+поэтому кеш включается только при общем для воркеров кеше (settings.SHARED_CACHE): иначе другой
+воркер еще CACHE_TTL секунд принимал бы старый пароль или токен удаленного пользователя
+"""
+import copy
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import BasicAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from example.generations import bump_generation, get_generation
+
+CACHE_SIZE = getattr(settings, "AUTH_CACHE_SIZE", 10000)
+CACHE_TTL = getattr(settings, "AUTH_CACHE_TTL", 300)  # секунды
+CACHE_ENABLED = getattr(settings, "AUTH_CACHE_ENABLED", getattr(settings, "SHARED_CACHE", False))
+
+
+class TTLCache:
+    """
+    Ограниченный по размеру LRU словарь с временем жизни записей
+    """
+    def __init__(self, maxsize: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = time.monotonic() + self.ttl, value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def pop(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+credentials_cache = TTLCache()  # digest(логин, пароль) -> (user_id, хеш пароля на момент проверки)
+users_cache = TTLCache()  # user_id -> (поколение, пользователь)
+_salt = secrets.token_bytes(32)  # свой в каждом воркере, пароль в памяти не восстановить
+
+
+def user_generation(user_id) -> str:
+    return f"auth:user:{user_id}"
+
+
+def credentials_digest(userid: str, password: str) -> str:
+    return hmac.new(_salt, f"{userid}\0{password}".encode(), hashlib.sha256).hexdigest()
+
+
+def get_cached_user(user_id):
+    """
+    Пользователь по первичному ключу; None если пользователя нет
+    """
+    if not CACHE_ENABLED:
+        return get_user_model()._default_manager.filter(pk=user_id).first()
+    generation = get_generation(user_generation(user_id))
+    entry = users_cache.get(str(user_id))  # id из токена может прийти строкой
+    if entry is None or entry[0] != generation:
+        user = get_user_model()._default_manager.filter(pk=user_id).first()
+        if user is None:
+            users_cache.pop(str(user_id))
+            return None
+        entry = generation, user
+        users_cache.set(str(user_id), entry)
+    return copy.copy(entry[1])  # request.user не должен менять общий объект
+
+
+def invalidate_user(user_id) -> None:
+    """
+    Вызывается при сохранении и удалении пользователя: смена пароля, деактивация.
+    Локальный кеш сбрасывается сразу, кеши других воркеров - через поколение в общем кеше
+    """
+    users_cache.pop(str(user_id))
+    bump_generation(user_generation(user_id))
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    """
+    BasicAuthentication, которая помнит успешные проверки пароля CACHE_TTL секунд
+    """
+    def authenticate_credentials(self, userid, password, request=None):
+        if not CACHE_ENABLED:
+            return super().authenticate_credentials(userid, password, request)
+        key = credentials_digest(userid, password)
+        entry = credentials_cache.get(key)
+        if entry is not None:
+            user_id, password_hash = entry
+            user = get_cached_user(user_id)
+            if user is not None and user.is_active and user.password == password_hash:
+                return user, None
+            credentials_cache.pop(key)
+
+        user, auth = super().authenticate_credentials(userid, password, request)
+        credentials_cache.set(key, (user.pk, user.password))
+        return user, auth
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication с LRU пользователей по id вместо запроса в базу на каждый запрос
+    """
+    def get_user(self, validated_token):
+        if jwt_settings.USER_ID_FIELD != self.user_model._meta.pk.name:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if getattr(jwt_settings, "CHECK_REVOKE_TOKEN", False):
+            if validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
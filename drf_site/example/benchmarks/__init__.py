@@ -0,0 +1,30 @@
+"""
+Бенчмарки запускаются командой `python manage.py benchmark <name>` на текущей базе
+"""
+import time
+from collections.abc import Callable
+
+BENCHMARKS = {
+    "auth": "example.benchmarks.auth",
+    "concurrency": "example.benchmarks.concurrency",
+    "endpoints": "example.benchmarks.endpoints",
+    "fieldsets": "example.benchmarks.fieldsets",
+    "search": "example.benchmarks.search",
+    "serializers": "example.benchmarks.serializers",
+    "sqlite": "example.benchmarks.sqlite",
+}
+
+
+def measure(func: Callable, iterations: int) -> dict:
+    """
+    Время выполнения func iterations раз
+    """
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    seconds = time.perf_counter() - started
+    return {
+        "iterations": iterations,
+        "seconds": round(seconds, 4),
+        "per_sec": round(iterations / seconds, 1) if seconds else None,
+    }
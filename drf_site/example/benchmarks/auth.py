@@ -0,0 +1,44 @@
+"""
+Запросов в секунду на аутентификацию: Basic и JWT без кеша и с кешем.
+Кеш работает только при AUTH_CACHE_ENABLED (по умолчанию - при общем кеше, REDIS_URL)
+"""
+import base64
+import itertools
+
+from django.contrib.auth.models import User
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from example import authentication
+from example.authentication import CachedBasicAuthentication, CachedJWTAuthentication
+from example.benchmarks import measure
+
+USERNAME = "benchmark-auth"
+PASSWORD = "benchmark-password"
+
+
+def run(iterations: int = 50, **options) -> dict:
+    user, _ = User.objects.get_or_create(username=USERNAME)
+    user.set_password(PASSWORD)
+    user.save()
+    factory = APIRequestFactory()
+    basic = "Basic " + base64.b64encode(f"{USERNAME}:{PASSWORD}".encode()).decode()
+    bearer = f"Bearer {AccessToken.for_user(user)}"
+
+    def driver(authenticator, header):
+        requests = itertools.cycle([Request(factory.get("/", HTTP_AUTHORIZATION=header))])
+        return lambda: authenticator.authenticate(next(requests))
+
+    try:
+        return {
+            "cache_enabled": authentication.CACHE_ENABLED,
+            "basic": measure(driver(BasicAuthentication(), basic), iterations),
+            "basic_cached": measure(driver(CachedBasicAuthentication(), basic), iterations),
+            "jwt": measure(driver(JWTAuthentication(), bearer), iterations * 20),
+            "jwt_cached": measure(driver(CachedJWTAuthentication(), bearer), iterations * 20),
+        }
+    finally:
+        user.delete()
@@ -0,0 +1,144 @@
+"""
+Пропускная способность read маршрутов под конкурентной нагрузкой в трех режимах:
+wsgi - синхронные view под WSGI в пуле потоков, asgi-sync - синхронные view под ASGI
+(каждый запрос уходит в поток sync_to_async), asgi-async - async view из example.async_views.
+WSGIHandler и ASGIHandler Django (как в drf_site/wsgi.py и asgi.py) вызываются в процессе, без сети:
+
+    python manage.py benchmark concurrency --dataset small --concurrency 1 10 50
+"""
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.test.utils import override_settings
+
+from example.benchmarks.endpoints import percentile, placeholders
+
+# имя -> (синхронный маршрут, async маршрут)
+ROUTES = {
+    "subject-list": ("/api/v1/subject/", "/api/v1/async/subject/"),
+    "subject-detail": ("/api/v1/subject/{subject}/", "/api/v1/async/subject/{subject}/"),
+    "subject-quiz": ("/api/v1/subject/{subject}/quiz/", "/api/v1/async/subject/{subject}/quiz/"),
+    "question-detail": ("/api/v1/questions/{question}/", "/api/v1/async/questions/{question}/"),
+    "answers": ("/api/v1/answers/", "/api/v1/async/answers/"),
+    "answers-ndjson": ("/api/v1/answers/?stream=ndjson", "/api/v1/async/answers/?stream=ndjson"),
+    "students": ("/api/v1/students/", "/api/v1/async/students/"),
+}
+MODES = "wsgi", "asgi-sync", "asgi-async"
+HOST = "testserver"
+
+
+def wsgi_get(application: WSGIHandler, url: str) -> int:
+    path, _, query = url.partition("?")
+    environ = {
+        "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": query, "SCRIPT_NAME": "",
+        "SERVER_NAME": HOST, "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1", "HTTP_HOST": HOST,
+        "HTTP_ACCEPT": "application/json", "wsgi.version": (1, 0), "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(), "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True, "wsgi.multiprocess": False, "wsgi.run_once": False,
+    }
+    status = []
+    response = application(environ, lambda line, headers: status.append(int(line.split()[0])))
+    try:
+        b"".join(response)
+    finally:
+        response.close()  # request_finished: соединение с базой потока закрывается
+    return status[0]
+
+
+async def asgi_get(application: ASGIHandler, url: str) -> int:
+    path, _, query = url.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", HOST.encode()), (b"accept", b"application/json")],
+        "client": ("127.0.0.1", 0), "server": (HOST, 80),
+    }
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    status = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()  # клиент не отключается, Django отменяет ожидание после ответа
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+def summarize(durations: list[float], errors: int, seconds: float) -> dict:
+    durations.sort()
+    return {
+        "requests_per_sec": round(len(durations) / seconds, 1) if seconds else None,
+        "p50_ms": round(percentile(durations, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(durations, 0.95) * 1000, 3),
+        "errors": errors,
+    }
+
+
+def run_wsgi(application: WSGIHandler, url: str, iterations: int, concurrency: int) -> dict:
+    def timed(_):
+        started = time.perf_counter()
+        status = wsgi_get(application, url)
+        return time.perf_counter() - started, status
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        started = time.perf_counter()
+        results = list(executor.map(timed, range(iterations)))
+        seconds = time.perf_counter() - started
+    return summarize([duration for duration, _ in results], sum(status != 200 for _, status in results), seconds)
+
+
+async def run_asgi(application: ASGIHandler, url: str, iterations: int, concurrency: int) -> dict:
+    """
+    Запускается через asyncio.run(), как event loop ASGI сервера: под async_to_sync весь sync код
+    запросов выполнялся бы в одном вызывающем потоке, а не в потоке на запрос
+    """
+    durations, statuses = [], []
+
+    async def worker(count: int):
+        for _ in range(count):
+            started = time.perf_counter()
+            statuses.append(await asgi_get(application, url))
+            durations.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        worker(iterations // concurrency + (number < iterations % concurrency)) for number in range(concurrency)
+    ))
+    return summarize(durations, sum(status != 200 for status in statuses), time.perf_counter() - started)
+
+
+def run(iterations: int = 200, concurrency: list[int] | None = None, routes: list[str] | None = None,
+        **options) -> dict:
+    values = placeholders()
+    levels = concurrency or [1, 10, 50]
+    wsgi, asgi = WSGIHandler(), ASGIHandler()
+    result = {"iterations": iterations, "concurrency": levels, "routes": {}}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, HOST]):
+        for name, (sync_url, async_url) in ROUTES.items():
+            if routes and name not in routes:
+                continue
+            sync_url, async_url = sync_url.format(**values), async_url.format(**values)
+            wsgi_get(wsgi, sync_url)  # прогрев: кеши ответов, индекс id, скомпилированные сериализаторы
+            asyncio.run(asgi_get(asgi, async_url))
+            result["routes"][name] = {
+                mode: {
+                    str(level): (
+                        run_wsgi(wsgi, sync_url, iterations, level) if mode == "wsgi"
+                        else asyncio.run(run_asgi(asgi, sync_url if mode == "asgi-sync" else async_url, iterations, level))
+                    )
+                    for level in levels
+                }
+                for mode in MODES
+            }
+    return result
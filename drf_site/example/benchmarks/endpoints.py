@@ -0,0 +1,172 @@
+"""
+Задержка, запросы к базе и размер ответа для каждого маршрута API через тестовый клиент Django.
+Профили данных - пресеты generate_data, базовые линии лежат в example/benchmarks/baselines:
+
+    python manage.py benchmark endpoints --dataset small --baseline example/benchmarks/baselines/endpoints_small.json
+    python manage.py benchmark endpoints --dataset medium --baseline example/benchmarks/baselines/endpoints_medium.json
+"""
+import re
+import statistics
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.db import connections
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from example.models import Attempt, Question, Subject, Testing
+
+# имя -> шаблон адреса, подстановки берутся из данных в базе (см. placeholders())
+ENDPOINTS = {
+    "subject-list": "/api/v1/subject/",
+    "subject-detail": "/api/v1/subject/{subject}/",
+    "subject-random": "/api/v1/subject/get_random/",
+    "subject-quiz": "/api/v1/subject/{subject}/quiz/",
+    "subject-questions": "/api/v1/subject/{subject}/questions/?page_size=50",
+    "answers": "/api/v1/answers/",
+    "answers-ndjson": "/api/v1/answers/?stream=ndjson",
+    "students": "/api/v1/students/",
+    "students-ndjson": "/api/v1/students/?stream=ndjson",
+    "student-stats": "/api/v1/students/{student}/stats/",
+    "stats": "/api/v1/stats/?subject={subject}",
+    "testings": "/api/v1/testings/",
+    "testings-page-size": "/api/v1/testings/?page_size=100",
+    "attempts": "/api/v1/attempts/",
+    "question-search": "/api/v1/questions/search/?q={word}",
+    "question-detail": "/api/v1/questions/{question}/",
+    "questions-batch": "/api/v1/questions/?ids={questions}",
+    "async-subject-list": "/api/v1/async/subject/",
+    "async-subject-detail": "/api/v1/async/subject/{subject}/",
+    "async-subject-quiz": "/api/v1/async/subject/{subject}/quiz/",
+    "async-question-detail": "/api/v1/async/questions/{question}/",
+    "async-answers": "/api/v1/async/answers/",
+    "async-students": "/api/v1/async/students/",
+    "schema": "/api/v1/schema/",
+    "swagger": "/api/v1/swagger/",
+    "redoc": "/api/v1/redoc/",
+}
+# маршруты без GET обработчика или только для форм входа
+SKIPPED = {
+    "/api/v1/students/<int:pk>/": "только PATCH",
+    "/api/v1/testings/<int:pk>/": "тот же список, что /api/v1/testings/",
+    "/api/token/": "только POST",
+    "/api/token/refresh/": "только POST",
+    "/api/v1/questions/import/": "только POST, загрузка файла",
+    "/api/v1/attempts/export/": "выгрузка всей таблицы, размер зависит от набора данных",
+    "/api/v1/testings/export/": "выгрузка всей таблицы, размер зависит от набора данных",
+}
+BENCHMARK_USERNAME = "benchmark"  # префикс, к нему добавляется случайный суффикс
+LATENCY_SLACK_MS = 2  # быстрые маршруты сравниваются с запасом, иначе шум таймера выглядит как регрессия
+
+
+def placeholders() -> dict:
+    question = Question.objects.order_by("pk").first()
+    attempt = Attempt.objects.order_by("pk").first()
+    if question is None or attempt is None or not Testing.objects.exists():
+        raise CommandError("В базе нет данных, используйте --dataset или generate_data")
+    return {
+        "subject": Subject.objects.order_by("pk").values_list("pk", flat=True).first(),
+        "student": attempt.student_id,
+        "question": question.pk,
+        "questions": ",".join(map(str, Question.objects.order_by("-pk").values_list("pk", flat=True)[:30])),
+        "word": max(re.findall(r"\w+", question.text), key=len),
+    }
+
+
+def percentile(sorted_values: list[float], share: float) -> float:
+    """
+    Ближайший ранг, без интерполяции
+    """
+    position = max(0, min(len(sorted_values) - 1, round(share * len(sorted_values)) - 1))
+    return sorted_values[position]
+
+
+def measure_endpoint(client: APIClient, url: str, iterations: int) -> dict:
+    durations = []
+    queries = size = status = None
+    client.get(url)  # прогрев: кеши ответов, индексы в памяти воркера
+    executed = []
+
+    def count_query(execute, sql, params, many, context):
+        executed.append(sql)
+        return execute(sql, params, many, context)
+
+    for _ in range(iterations):
+        executed.clear()
+        with ExitStack() as stack:
+            # чтение идет через алиас реплики (ReadWriteRouter), запросы считаются по всем алиасам;
+            # execute_wrapper, в отличие от CaptureQueriesContext, не открывает соединение сам
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            started = time.perf_counter()
+            response = client.get(url)
+            content = b"".join(response.streaming_content) if response.streaming else response.content
+            durations.append(time.perf_counter() - started)
+        queries = len(executed)
+        size = len(content)
+        status = response.status_code
+    durations.sort()
+    total = sum(durations)
+    return {
+        "url": url,
+        "status": status,
+        "p50_ms": round(percentile(durations, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(durations, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(durations) * 1000, 3),
+        "requests_per_sec": round(iterations / total, 1) if total else None,
+        "queries": queries,
+        "bytes": size,
+    }
+
+
+def run(iterations: int = 50, endpoints: list[str] | None = None, **options) -> dict:
+    values = placeholders()
+    # свой временный пользователь на запуск: существующие учетные записи не трогаются и не переиспользуются
+    user = get_user_model().objects.create_user(
+        username=f"{BENCHMARK_USERNAME}-{uuid.uuid4().hex}", password=None, is_staff=True, is_superuser=True
+    )
+    client = APIClient()
+    client.force_login(user)  # сессия, как у залогиненного администратора
+    try:
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):  # хост тестового клиента
+            return {
+                "iterations": iterations,
+                "endpoints": {
+                    name: measure_endpoint(client, template.format(**values), iterations)
+                    for name, template in ENDPOINTS.items() if not endpoints or name in endpoints
+                },
+            }
+    finally:
+        client.logout()
+        user.delete()
+
+
+def compare(result: dict, baseline: dict, tolerance: float = 0.5) -> list[str]:
+    """
+    Регрессии относительно базовой линии: больше запросов к базе, другой статус,
+    p95 или размер ответа больше базового более чем на tolerance. Эндпоинт без записи
+    в базовой линии - тоже регрессия: у него нет бюджета, базовую линию нужно перегенерировать.
+    Записи базовой линии без замера пропускаются (запуск с --endpoints)
+    """
+    expected_endpoints = baseline.get("endpoints", {})
+    regressions = [
+        f"{name}: нет в базовой линии" for name in result["endpoints"] if name not in expected_endpoints
+    ]
+    for name, expected in expected_endpoints.items():
+        actual = result["endpoints"].get(name)
+        if actual is None:
+            continue
+        if actual["status"] != expected["status"]:
+            regressions.append(f"{name}: статус {actual['status']}, в базовой линии {expected['status']}")
+        if actual["queries"] > expected["queries"]:
+            regressions.append(f"{name}: {actual['queries']} запросов к базе, бюджет {expected['queries']}")
+        if actual["bytes"] > expected["bytes"] * (1 + tolerance):
+            regressions.append(f"{name}: ответ {actual['bytes']} байт, в базовой линии {expected['bytes']}")
+        if actual["p95_ms"] > expected["p95_ms"] * (1 + tolerance) + LATENCY_SLACK_MS:
+            regressions.append(f"{name}: p95 {actual['p95_ms']} мс, в базовой линии {expected['p95_ms']} мс")
+    return regressions
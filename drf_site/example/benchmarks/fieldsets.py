@@ -0,0 +1,37 @@
+"""
+Размер ответа и задержка list маршрутов со всеми полями и с ?fields= (sparse fieldsets):
+
+    python manage.py benchmark fieldsets --dataset medium
+"""
+from django.conf import settings
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from example.benchmarks.endpoints import measure_endpoint, placeholders
+
+# имя -> (маршрут со всеми полями, параметры sparse варианта)
+CASES = {
+    "attempts": ("/api/v1/attempts/?page_size=1000", "fields=id,result"),
+    "testings": ("/api/v1/testings/?page_size=1000", "fields=id,answer"),
+    "stats": ("/api/v1/stats/?page_size=1000", "fields=student,average_result"),
+    "question-detail": ("/api/v1/questions/{question}/", "fields=id,subject"),
+    "question-search": ("/api/v1/questions/search/?q={word}&limit=100", "fields=id"),
+}
+
+
+def run(iterations: int = 50, **options) -> dict:
+    values = placeholders()
+    client = APIClient()
+    result = {"iterations": iterations, "cases": {}}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        for name, (url, sparse) in CASES.items():
+            url = url.format(**values)
+            full = measure_endpoint(client, url, iterations)
+            narrow = measure_endpoint(client, f"{url}{'&' if '?' in url else '?'}{sparse}", iterations)
+            result["cases"][name] = {
+                "full": full,
+                "sparse": narrow,
+                "bytes_ratio": round(narrow["bytes"] / full["bytes"], 3) if full["bytes"] else None,
+                "p50_speedup": round(full["p50_ms"] / narrow["p50_ms"], 2) if narrow["p50_ms"] else None,
+            }
+    return result
@@ -0,0 +1,37 @@
+"""
+Поиск вопросов: FTS5 индекс против icontains по тексту вопросов и ответов
+"""
+import itertools
+import random
+import re
+
+from django.core.management.base import CommandError
+from django.db.models import Q
+
+from example import search
+from example.benchmarks import measure
+from example.models import Question
+
+
+def sample_terms(count: int) -> list[str]:
+    texts = Question.objects.order_by("?").values_list("text", flat=True)[:200]
+    words = [word for text in texts for word in re.findall(r"\w{4,}", text.lower())]
+    if not words:
+        raise CommandError("В базе нет вопросов, сначала заполните базу")
+    return [random.choice(words) for _ in range(count)]
+
+
+def run(iterations: int = 200, limit: int = 20, **options) -> dict:
+    if not search.is_available():
+        raise CommandError("FTS5 индекс не найден, выполните migrate или rebuild_search_index")
+    terms = itertools.cycle(sample_terms(50))
+
+    def icontains():
+        term = next(terms)
+        ids = Question.objects.filter(Q(text__icontains=term) | Q(answer__text__icontains=term))
+        return list(ids.order_by("pk").values_list("pk", flat=True).distinct()[:limit])
+
+    return {
+        "icontains": measure(icontains, iterations),
+        "fts5": measure(lambda: search.search_questions(next(terms), limit), iterations),
+    }
@@ -0,0 +1,35 @@
+"""
+Строк в секунду: обычный to_representation() DRF против скомпилированного пути из values_list()
+"""
+from django.core.management.base import CommandError
+
+from example.benchmarks import measure
+from example.compiled import compile_serializer
+from example.models import Attempt, Question, Subject, Testing
+from example.serializers import AttemptSerializer, QuestionSerializer, SubjectSerializer, TestingSerializer
+
+CASES = (
+    (SubjectSerializer, Subject),
+    (AttemptSerializer, Attempt),
+    (TestingSerializer, Testing),
+    (QuestionSerializer, Question),
+)
+
+
+def run(iterations: int = 20, rows: int = 5000, **options) -> dict:
+    result = {}
+    for serializer_class, model in CASES:
+        queryset = model.objects.order_by("pk")[:rows]
+        count = queryset.count()
+        if not count:
+            raise CommandError(f"Нет строк {model.__name__}, сначала заполните базу")
+        compiled = compile_serializer(serializer_class)
+
+        drf = measure(lambda: serializer_class(queryset.all(), many=True).data, iterations)
+        fast = measure(lambda: compiled.serialize(compiled.values(queryset.all())), iterations)
+        result[serializer_class.__name__] = {
+            "rows": count,
+            "drf_rows_per_sec": round(count * drf["per_sec"]),
+            "compiled_rows_per_sec": round(count * fast["per_sec"]),
+        }
+    return result
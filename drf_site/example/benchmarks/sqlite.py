@@ -0,0 +1,195 @@
+"""
+Смешанная нагрузка чтение/запись из нескольких потоков на копии текущей базы в двух профилях SQLite:
+default - журнал DELETE, synchronous=FULL, новое соединение на каждый запрос (как CONN_MAX_AGE=0);
+tuned - SQLITE_PRAGMAS (WAL, synchronous=NORMAL, mmap, кеш, busy_timeout), постоянные соединения
+потока и отдельное соединение для чтения с query_only, как у ReadWriteRouter.
+Запросы чтения - SQL, который строит ORM для маршрутов API:
+
+    python manage.py benchmark sqlite --dataset small --concurrency 1 4 16
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.core.management.base import CommandError
+from django.db import connections
+
+from example import database
+from example.benchmarks.endpoints import percentile
+from example.models import Answer, Attempt, Question, Student, Subject, Testing
+from example.serializers import QuestionDetailSerializer, optimize_queryset
+
+PROFILES = {
+    "default": {"journal_mode": "delete", "pragmas": {"synchronous": "full"}, "persistent": False},
+    "tuned": {"journal_mode": "wal", "pragmas": database.PRAGMAS, "persistent": True},
+}
+WRITE_SHARE = 0.2  # доля операций записи
+ANSWERS_PER_WRITE = 5
+BUSY_TIMEOUT = 5.0  # секунд, как у sqlite3.connect() по умолчанию
+
+
+def statement(queryset) -> tuple[str, int]:
+    """
+    SQL queryset'а с плейсхолдерами sqlite3 и число параметров
+    """
+    sql, params = queryset.query.sql_with_params()
+    return sql.replace("%s", "?"), len(params)
+
+
+def workload() -> dict:
+    """
+    Запросы чтения (SQL и источник id для параметра) и данные для записей
+    """
+    question_ids = list(Question.objects.values_list("pk", flat=True)[:5000])
+    student_ids = list(Student.objects.values_list("pk", flat=True)[:5000])
+    answers = list(Answer.objects.values_list("question__subject_id", "question_id", "pk")[:5000])
+    if not question_ids or not student_ids or not answers:
+        raise CommandError("В базе нет данных, используйте --dataset или generate_data")
+    reads = [
+        (statement(optimize_queryset(Question.objects.filter(pk=0), QuestionDetailSerializer)), question_ids),
+        (statement(Attempt.objects.filter(student_id=0).order_by("-date", "-id")[:20]), student_ids),
+        (statement(Subject.objects.order_by("pk").values_list("title")[:5]), None),
+    ]
+    return {"reads": reads, "student_ids": student_ids, "answers": answers}
+
+
+def copy_database(path: str, journal_mode: str) -> None:
+    source = connections[database.WRITE_ALIAS]
+    source.ensure_connection()
+    target = sqlite3.connect(path)
+    try:
+        source.connection.backup(target)
+        target.execute(f"PRAGMA journal_mode = {journal_mode}")  # режим журнала хранится в файле
+    finally:
+        target.close()
+
+
+class Connections:
+    """
+    Соединения потока: новые на каждую операцию или постоянные (отдельные для чтения и записи)
+    """
+    def __init__(self, path: str, profile: dict):
+        self.path = path
+        self.profile = profile
+        self.local = threading.local()
+        self.opened = []
+        self.lock = threading.Lock()
+
+    def open(self, read_only: bool) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA foreign_keys = ON")  # как в DatabaseWrapper Django
+        pragmas = dict(self.profile["pragmas"])
+        pragmas.pop("journal_mode", None)
+        if read_only:
+            pragmas["query_only"] = "on"
+        database.apply_pragmas(connection, pragmas)
+        return connection
+
+    def get(self, read_only: bool) -> sqlite3.Connection:
+        if not self.profile["persistent"]:
+            return self.open(read_only)
+        name = "reader" if read_only else "writer"
+        connection = getattr(self.local, name, None)
+        if connection is None:
+            connection = self.open(read_only)
+            setattr(self.local, name, connection)
+            with self.lock:
+                self.opened.append(connection)
+        return connection
+
+    def release(self, connection: sqlite3.Connection) -> None:
+        if not self.profile["persistent"]:
+            connection.close()
+
+    def close(self) -> None:
+        for connection in self.opened:
+            connection.close()
+
+
+def read(pool: Connections, queries: list, rng: random.Random) -> None:
+    (sql, param_count), ids = rng.choice(queries)
+    connection = pool.get(read_only=True)
+    try:
+        connection.execute(sql, [rng.choice(ids)] * param_count if ids else []).fetchall()
+    finally:
+        pool.release(connection)
+
+
+def write(pool: Connections, data: dict, rng: random.Random) -> None:
+    """
+    Сохранение попытки с ответами одной транзакцией, как при сдаче теста
+    """
+    subject_id, _, _ = rng.choice(data["answers"])
+    connection = pool.get(read_only=False)
+    try:
+        connection.execute("BEGIN")
+        try:
+            attempt_id = connection.execute(
+                f"INSERT INTO {Attempt._meta.db_table} (student_id, subject_id, date, result) VALUES (?, ?, ?, ?)",
+                (rng.choice(data["student_ids"]), subject_id, date.today().isoformat(), 0),
+            ).lastrowid
+            connection.executemany(
+                f"INSERT INTO {Testing._meta.db_table} (attempt_id, question_id, answer_id) VALUES (?, ?, ?)",
+                [(attempt_id, question_id, answer_id)
+                 for _, question_id, answer_id in rng.sample(data["answers"], min(ANSWERS_PER_WRITE, len(data["answers"])))],
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+    finally:
+        pool.release(connection)
+
+
+def run_level(path: str, profile: dict, data: dict, iterations: int, concurrency: int) -> dict:
+    pool = Connections(path, profile)
+    timings = {"read": [], "write": []}
+    errors = []
+
+    def operation(number: int) -> None:
+        rng = random.Random(number)
+        kind = "write" if rng.random() < WRITE_SHARE else "read"
+        started = time.perf_counter()
+        try:
+            write(pool, data, rng) if kind == "write" else read(pool, data["reads"], rng)
+        except sqlite3.OperationalError as exc:  # database is locked после busy timeout
+            errors.append(str(exc))
+            return
+        timings[kind].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(operation, range(iterations)))
+    seconds = time.perf_counter() - started
+    pool.close()
+
+    result = {"ops_per_sec": round((iterations - len(errors)) / seconds, 1), "errors": len(errors)}
+    for kind, durations in timings.items():
+        durations.sort()
+        result[f"{kind}s"] = len(durations)
+        result[f"{kind}_p95_ms"] = round(percentile(durations, 0.95) * 1000, 3) if durations else None
+    return result
+
+
+def run(iterations: int = 2000, concurrency: list[int] | None = None, **options) -> dict:
+    data = workload()
+    levels = concurrency or [1, 4, 16]
+    result = {"iterations": iterations, "write_share": WRITE_SHARE, "profiles": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, profile in PROFILES.items():
+            path = os.path.join(directory, f"{name}.sqlite3")
+            copy_database(path, profile["journal_mode"])
+            result["profiles"][name] = {
+                str(level): run_level(path, profile, data, iterations, level) for level in levels
+            }
+    result["speedup"] = {
+        str(level): round(result["profiles"]["tuned"][str(level)]["ops_per_sec"]
+                          / result["profiles"]["default"][str(level)]["ops_per_sec"], 2)
+        for level in levels
+    }
+    return result
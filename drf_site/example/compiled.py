@@ -0,0 +1,113 @@
+"""
+Быстрый путь для read-only сериализации списков: по полям сериализатора один раз генерируется
+функция tuple -> dict, которая работает с кортежами из .values_list() без создания моделей.
+Результат совпадает с to_representation() сериализатора байт в байт после JSON рендера
+"""
+from functools import lru_cache
+
+from django.db.models import QuerySet
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from example import timing
+
+
+class NotCompilable(Exception):
+    """
+    Поле сериализатора не поддерживается быстрым путем
+    """
+
+
+def _identity(value):
+    return value
+
+
+def _date(value):
+    return value if isinstance(value, str) else value.isoformat()
+
+
+def _boolean(value):
+    if value in serializers.BooleanField.TRUE_VALUES:
+        return True
+    if value in serializers.BooleanField.FALSE_VALUES:
+        return False
+    return bool(value)
+
+
+def _converter(serializer_field):
+    """
+    Повторяет to_representation() поля, None обрабатывается отдельно как в Serializer.to_representation()
+    """
+    if isinstance(serializer_field, serializers.PrimaryKeyRelatedField):
+        if serializer_field.pk_field is not None:
+            raise NotCompilable(serializer_field.field_name)
+        return _identity
+    if isinstance(serializer_field, serializers.ReadOnlyField):
+        return _identity
+    if isinstance(serializer_field, serializers.BooleanField):
+        return _boolean
+    if isinstance(serializer_field, serializers.IntegerField):
+        return int
+    if isinstance(serializer_field, serializers.CharField):
+        return str
+    if type(serializer_field) is serializers.DateField:
+        output_format = getattr(serializer_field, "format", api_settings.DATE_FORMAT)
+        if output_format is None or output_format.lower() != ISO_8601:
+            raise NotCompilable(serializer_field.field_name)
+        return _date
+    raise NotCompilable(serializer_field.field_name)
+
+
+class CompiledSerializer:
+    """
+    Колонки для values_list() и сгенерированная функция row_to_dict
+    """
+    def __init__(self, serializer_class: type[serializers.BaseSerializer]):
+        self.serializer_class = serializer_class
+        self.columns = []
+        self.names = []
+        converters = []
+        for name, serializer_field in serializer_class().fields.items():
+            if serializer_field.write_only:
+                continue
+            if serializer_field.source == "*" or isinstance(serializer_field, serializers.BaseSerializer):
+                raise NotCompilable(name)
+            self.names.append(name)
+            self.columns.append(serializer_field.source.replace(".", "__"))
+            converters.append(_converter(serializer_field))
+        self.row_to_dict = self._generate(converters)
+
+    def _generate(self, converters):
+        namespace = {f"c{position}": converter for position, converter in enumerate(converters)}
+        items = []
+        for position, (name, converter) in enumerate(zip(self.names, converters)):
+            value = f"row[{position}]"
+            if converter is not _identity:
+                value = f"(None if {value} is None else c{position}({value}))"
+            items.append(f"{name!r}: {value}")
+        source = "def row_to_dict(row):\n    return {" + ", ".join(items) + "}\n"
+        exec(compile(source, f"<compiled {self.serializer_class.__name__}>", "exec"), namespace)
+        return namespace["row_to_dict"]
+
+    def values(self, queryset: QuerySet, extra: tuple = ()) -> QuerySet:
+        """
+        Кортежи для row_to_dict; extra - дополнительные колонки в конце (например ключ пагинации)
+        """
+        columns = self.columns + [name for name in extra if name not in self.columns]
+        return queryset.values_list(*columns, named=bool(extra))
+
+    def serialize(self, rows) -> list[dict]:
+        row_to_dict = self.row_to_dict
+        with timing.span("serialize"):
+            return [row_to_dict(row) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def compile_serializer(serializer_class: type[serializers.BaseSerializer]) -> CompiledSerializer | None:
+    """
+    Компиляция один раз на класс, None если сериализатор нельзя скомпилировать
+    """
+    try:
+        return CompiledSerializer(serializer_class)
+    except NotCompilable:
+        return None
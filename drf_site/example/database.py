@@ -0,0 +1,47 @@
+"""
+Профиль SQLite под нагрузку: PRAGMA на каждом новом соединении и роутер, который отправляет
+чтение на отдельный алиас. Постоянные соединения задаются CONN_MAX_AGE в DATABASES
+"""
+from django.conf import settings
+from django.db import connections
+
+WRITE_ALIAS = "default"
+READ_ALIAS = getattr(settings, "DATABASE_READ_ALIAS", None)  # None - все запросы через default
+PRAGMAS = getattr(settings, "SQLITE_PRAGMAS", {})
+
+
+def apply_pragmas(raw_connection, pragmas: dict) -> None:
+    """
+    raw_connection - соединение sqlite3, без курсора Django и без записи в connection.queries
+    """
+    for name, value in pragmas.items():
+        raw_connection.execute(f"PRAGMA {name} = {value}")
+
+
+def configure_connection(connection) -> None:
+    if connection.vendor != "sqlite":
+        return
+    pragmas = dict(PRAGMAS)
+    if connection.alias == READ_ALIAS:
+        pragmas["query_only"] = "on"  # запись в обход роутера - ошибка, а не тихая запись
+    apply_pragmas(connection.connection, pragmas)
+
+
+class ReadWriteRouter:
+    """
+    Чтение через READ_ALIAS, запись через default. Внутри транзакции на default чтение
+    остается на нем, иначе не видны собственные незакоммиченные изменения
+    """
+    def db_for_read(self, model, **hints):
+        if READ_ALIAS is None or connections[WRITE_ALIAS].in_atomic_block:
+            return WRITE_ALIAS
+        return READ_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return WRITE_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # оба алиаса - один файл базы
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == WRITE_ALIAS
@@ -0,0 +1,299 @@
+"""
+Детерминированный синтетический набор данных для нагрузочных тестов и бенчмарков.
+Строки генерируются векторно на NumPy из одного seed и вставляются через executemany
+пачками в больших транзакциях, в обход ORM и сигналов; производные таблицы пересчитываются в конце
+"""
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, replace
+
+from django.core.management.base import CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from example import response_cache, sampling, stats
+from example.models import (
+    Answer, Attempt, ItemStatsRun, Question, QuestionStats, Student, StudentSubjectStats, Subject, Testing
+)
+
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только для генерации данных
+    np = None
+
+DEFAULT_CHUNK_SIZE = 100_000  # попыток на транзакцию
+FIRST_DATE = "2020-01-01"
+DATE_RANGE_DAYS = 5 * 365
+BULK_CACHE_KIB = 256 * 1024  # страничный кеш SQLite на время загрузки и построения индексов
+SUBJECT_SKEW = 0.8  # популярность предметов ~ 1 / rank^SUBJECT_SKEW
+# порядок удаления при --flush: сначала зависимые таблицы
+MODELS = [Testing, StudentSubjectStats, QuestionStats, ItemStatsRun, Attempt, Answer, Question, Student, Subject]
+
+SUBJECT_WORDS = [
+    "Алгебра", "Геометрия", "Физика", "Химия", "Биология", "История", "География", "Литература",
+    "Информатика", "Экономика", "Статистика", "Философия", "Астрономия", "Право", "Психология",
+]
+QUESTION_WORDS = [
+    "какой", "метод", "используется", "для", "определения", "значения", "функции", "таблицы", "запроса",
+    "закон", "формула", "энергии", "скорости", "реакции", "элемента", "клетки", "события", "периода",
+    "уравнение", "решение", "структура", "процесс", "система", "модель", "алгоритм", "данных", "индекса",
+    "оператор", "результат", "условие", "граница", "площадь", "объем", "масса", "сила", "частота",
+]
+FIRST_NAMES = [
+    "Иван", "Павел", "Сергей", "Андрей", "Дмитрий", "Алексей", "Максим", "Никита", "Михаил", "Егор",
+    "Анна", "Мария", "Екатерина", "Ольга", "Галина", "Дарья", "Полина", "Алина", "Ирина", "Софья",
+]
+LAST_NAMES = [
+    "Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов", "Новиков",
+    "Федоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семенов", "Егоров", "Павлов", "Козлов",
+    "Степанов", "Николаев", "Орлов", "Андреев", "Макаров", "Никитин", "Захаров", "Баранов", "Яковлев",
+]
+
+
+@dataclass(frozen=True)
+class DatasetConfig:
+    """
+    Размеры и распределения набора; одинаковый конфиг дает одинаковые данные
+    """
+    subjects: int = 10
+    students: int = 1000
+    questions_per_subject: float = 30  # среднее, распределение Пуассона
+    min_answers: int = 2
+    max_answers: int = 5
+    attempts_per_student: float = 5  # среднее, не меньше одной попытки
+    questions_per_attempt: int = 10
+    seed: int = 1
+
+
+PRESETS = {
+    "tiny": DatasetConfig(subjects=3, students=20, questions_per_subject=5, attempts_per_student=2,
+                          questions_per_attempt=3),
+    "small": DatasetConfig(),
+    "medium": DatasetConfig(subjects=100, students=50_000, questions_per_subject=40, attempts_per_student=8),
+    # ~10M попыток и ~50M строк Testing
+    "production": DatasetConfig(subjects=1000, students=1_000_000, questions_per_subject=50,
+                                attempts_per_student=10, questions_per_attempt=5),
+}
+
+
+def get_config(preset: str = "small", **overrides) -> DatasetConfig:
+    overrides = {name: value for name, value in overrides.items() if value is not None}
+    return replace(PRESETS[preset], **overrides)
+
+
+class Writer:
+    """
+    Многострочные вставки с явными id и учетом скорости
+    """
+    def __init__(self, progress=None):
+        self.progress = progress
+        self.counts = {}
+        self.started = time.perf_counter()
+
+    def insert(self, model, columns: list[str], *arrays) -> None:
+        table = connection.ops.quote_name(model._meta.db_table)
+        placeholders = ", ".join(["%s"] * len(columns))
+        rows = list(zip(*(array.tolist() if hasattr(array, "tolist") else array for array in arrays)))
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(rows)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def report(self) -> None:
+        if self.progress is not None:
+            seconds = time.perf_counter() - self.started
+            self.progress(self.counts, round(self.total / seconds) if seconds else None)
+
+
+def words(rng, vocabulary: list[str], count: int, low: int, high: int) -> list[str]:
+    """
+    count строк из low..high случайных слов словаря
+    """
+    vocabulary = np.array(vocabulary)
+    lengths = rng.integers(low, high + 1, count)
+    picks = rng.integers(0, len(vocabulary), lengths.sum())
+    texts = np.split(vocabulary[picks], np.cumsum(lengths)[:-1])
+    return [" ".join(text) for text in texts]
+
+
+def check_empty(flush: bool) -> None:
+    if flush:
+        with connection.cursor() as cursor:
+            for model in MODELS:
+                cursor.execute(f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)}")
+        return
+    filled = [model.__name__ for model in MODELS if model.objects.exists()]
+    if filled:
+        raise CommandError(f"Таблицы не пустые ({', '.join(filled)}), используйте --flush")
+
+
+@contextmanager
+def bulk_load_mode():
+    """
+    SQLite: на время загрузки без fsync, без проверки внешних ключей (данные согласованы по построению)
+    и без вторичных индексов - они строятся один раз в конце, это в разы быстрее поддержки на каждой вставке
+    """
+    if connection.vendor != "sqlite" or connection.in_atomic_block:  # PRAGMA foreign_keys в транзакции не меняется
+        yield
+        return
+    tables = [model._meta.db_table for model in MODELS]
+    with connection.cursor() as cursor:
+        synchronous = cursor.execute("PRAGMA synchronous").fetchone()[0]
+        cursor.execute(
+            f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+            f"AND tbl_name IN ({', '.join(['%s'] * len(tables))})",
+            tables,
+        )
+        indexes = cursor.fetchall()
+        cache_size = cursor.execute("PRAGMA cache_size").fetchone()[0]
+        cursor.execute("PRAGMA synchronous = OFF")
+        cursor.execute("PRAGMA foreign_keys = OFF")
+        cursor.execute(f"PRAGMA cache_size = {-BULK_CACHE_KIB}")
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for _, sql in indexes:
+                cursor.execute(sql)
+            cursor.execute("PRAGMA foreign_keys = ON")
+            cursor.execute(f"PRAGMA synchronous = {int(synchronous)}")
+            cursor.execute(f"PRAGMA cache_size = {int(cache_size)}")
+
+
+def generate(config: DatasetConfig, chunk_size: int = DEFAULT_CHUNK_SIZE, flush: bool = False,
+             rebuild_stats: bool = True, progress=None) -> dict:
+    """
+    Заполняет пустую базу набором по конфигу, возвращает число строк по таблицам и скорость вставки
+    """
+    if np is None:
+        raise CommandError("Для генерации данных нужен numpy: pip install numpy")
+    if config.min_answers < 2 or config.max_answers < config.min_answers:
+        raise CommandError("У вопроса должно быть не меньше двух вариантов ответа")
+
+    rng = np.random.default_rng(config.seed)
+    writer = Writer(progress)
+    with bulk_load_mode():
+        with transaction.atomic():
+            check_empty(flush)
+            catalog = _write_catalog(rng, config, writer)
+        writer.report()
+        _write_students_and_attempts(rng, config, catalog, writer, chunk_size)
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), MODELS):
+            cursor.execute(sql)
+
+    insert_seconds = time.perf_counter() - writer.started
+    if rebuild_stats:
+        for _ in stats.rebuild():
+            pass
+    # вставка в обход ORM не шлет сигналы - сбрасываем кеши вручную
+    sampling.invalidate_subjects()
+    sampling.invalidate_questions()
+    response_cache.invalidate_model(Subject)
+    response_cache.invalidate_model(Question)
+    return {
+        "config": asdict(config),
+        "rows": writer.counts,
+        "seconds": round(time.perf_counter() - writer.started, 2),
+        "insert_rows_per_sec": round(writer.total / insert_seconds) if insert_seconds else None,
+    }
+
+
+def _write_catalog(rng, config: DatasetConfig, writer: Writer) -> dict:
+    """
+    Предметы, вопросы и варианты ответов; вопросы предмета и ответы вопроса идут подряд по id
+    """
+    subject_ids = np.arange(1, config.subjects + 1)
+    titles = [f"{SUBJECT_WORDS[num % len(SUBJECT_WORDS)]} {num + 1}" for num in range(config.subjects)]
+    writer.insert(Subject, ["id", "title"], subject_ids, titles)
+
+    question_counts = np.maximum(rng.poisson(config.questions_per_subject, config.subjects), 1)
+    question_starts = np.concatenate([[0], np.cumsum(question_counts)[:-1]])  # индекс первого вопроса предмета
+    total_questions = int(question_counts.sum())
+    question_ids = np.arange(1, total_questions + 1)
+    texts = [f"{text.capitalize()}?" for text in words(rng, QUESTION_WORDS, total_questions, 4, 12)]
+    writer.insert(Question, ["id", "text", "subject_id"], question_ids, texts, np.repeat(subject_ids, question_counts))
+
+    answer_counts = rng.integers(config.min_answers, config.max_answers + 1, total_questions)
+    answer_starts = np.concatenate([[0], np.cumsum(answer_counts)[:-1]])
+    correct_offsets = rng.integers(0, answer_counts)
+    total_answers = int(answer_counts.sum())
+    offsets = np.arange(total_answers) - np.repeat(answer_starts, answer_counts)
+    is_correct = offsets == np.repeat(correct_offsets, answer_counts)
+    texts = words(rng, QUESTION_WORDS, total_answers, 1, 5)
+    writer.insert(Answer, ["id", "text", "question_id", "is_correct"],
+                  np.arange(1, total_answers + 1), texts, np.repeat(question_ids, answer_counts), is_correct)
+
+    popularity = 1 / np.arange(1, config.subjects + 1) ** SUBJECT_SKEW
+    return {
+        "question_counts": question_counts,
+        "question_starts": question_starts,
+        "answer_counts": answer_counts,
+        "answer_starts": answer_starts,
+        "correct_offsets": correct_offsets,
+        "difficulty": rng.normal(0, 1, total_questions),
+        "popularity": popularity / popularity.sum(),
+    }
+
+
+def _write_students_and_attempts(rng, config: DatasetConfig, catalog: dict, writer: Writer, chunk_size: int) -> None:
+    """
+    Студенты, их попытки и ответы пачками; вероятность правильного ответа - логистическая
+    функция от разницы способности студента и сложности вопроса
+    """
+    students_per_chunk = max(1, int(chunk_size / max(config.attempts_per_student, 1)))
+    columns = np.arange(config.questions_per_attempt)
+    first_date = np.datetime64(FIRST_DATE)
+    next_attempt_id = next_testing_id = 1
+
+    for first_student in range(1, config.students + 1, students_per_chunk):
+        size = min(students_per_chunk, config.students + 1 - first_student)
+        student_ids = np.arange(first_student, first_student + size)
+        first_names = rng.integers(0, len(FIRST_NAMES), size)
+        last_names = rng.integers(0, len(LAST_NAMES), size)
+        # у женских имен (вторая половина списка) фамилия с окончанием "а"
+        names = [f"{LAST_NAMES[last]}{'а' if first >= len(FIRST_NAMES) // 2 else ''} {FIRST_NAMES[first]}"
+                 for first, last in zip(first_names.tolist(), last_names.tolist())]
+        ability = rng.normal(0, 1, size)
+
+        attempts_per_student = 1 + rng.poisson(max(config.attempts_per_student - 1, 0), size)
+        attempt_students = np.repeat(np.arange(size), attempts_per_student)
+        attempts = len(attempt_students)
+        subjects = rng.choice(config.subjects, attempts, p=catalog["popularity"])
+        dates = (first_date + rng.integers(0, DATE_RANGE_DAYS, attempts)).astype(str)
+
+        # вопросы попытки - подряд идущие вопросы предмета со случайного места, без повторов
+        available = catalog["question_counts"][subjects]
+        asked = np.minimum(available, config.questions_per_attempt)
+        start = rng.integers(0, available)
+        question_index = catalog["question_starts"][subjects][:, None] + (start[:, None] + columns) % available[:, None]
+        mask = columns < asked[:, None]
+
+        chance = 1 / (1 + np.exp(catalog["difficulty"][question_index] - ability[attempt_students][:, None]))
+        correct = (rng.random(question_index.shape) < chance) & mask
+        answer_counts = catalog["answer_counts"][question_index]
+        correct_offsets = catalog["correct_offsets"][question_index]
+        wrong_offsets = (correct_offsets + 1 + rng.integers(0, answer_counts - 1)) % answer_counts
+        answer_index = catalog["answer_starts"][question_index] + np.where(correct, correct_offsets, wrong_offsets)
+        # результат как ROUND() в grading.score_subquery(): округление половины вверх
+        results = (200 * correct.sum(axis=1) + asked) // (2 * asked)
+
+        attempt_ids = np.arange(next_attempt_id, next_attempt_id + attempts)
+        testing_count = int(mask.sum())
+        with transaction.atomic():
+            writer.insert(Student, ["id", "name"], student_ids, names)
+            writer.insert(Attempt, ["id", "student_id", "subject_id", "date", "result"],
+                          attempt_ids, student_ids[attempt_students], subjects + 1, dates, results)
+            writer.insert(Testing, ["id", "attempt_id", "question_id", "answer_id"],
+                          np.arange(next_testing_id, next_testing_id + testing_count),
+                          np.broadcast_to(attempt_ids[:, None], mask.shape)[mask],
+                          question_index[mask] + 1, answer_index[mask] + 1)
+        next_attempt_id += attempts
+        next_testing_id += testing_count
+        writer.report()
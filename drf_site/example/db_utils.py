@@ -95,9 +95,17 @@ INSERT INTO example_testing (id,attempt_id,question_id,answer_id) VALUES
 
 
 def fill_db():
+    from example import response_cache, sampling
+    from example.models import Subject, Question
+
     with connection.cursor() as cursor:
         cursor.executescript(insert_queries)
 
+    # вставка в обход ORM не шлет сигналы - сбрасываем кеши вручную
+    sampling.invalidate_subjects()
+    response_cache.invalidate_model(Subject)
+    response_cache.invalidate_model(Question)
+
 
 if __name__ == "__main__":
     fill_db()
@@ -0,0 +1,110 @@
+"""
+Потоковая выгрузка попыток и результатов тестирования в CSV для отчетности: строки читаются
+пачками по первичному ключу (WHERE id > последний ORDER BY id LIMIT n), поэтому ни запрос,
+ни ответ не держат таблицу в памяти. since_id и since_date - для инкрементальной выгрузки
+"""
+import csv
+import io
+import zlib
+from collections.abc import Iterable, Iterator
+from datetime import date
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+from example.models import Attempt, Testing
+
+CHUNK_SIZE = getattr(settings, "EXPORT_CHUNK_SIZE", 5000)  # строк в одном запросе к базе
+GZIP_LEVEL = 6
+
+# имя -> (queryset, колонки CSV: имя -> поле для values_list())
+EXPORTS = {
+    "attempts": (
+        Attempt.objects.all(),
+        {
+            "id": "id",
+            "date": "date",
+            "student_id": "student_id",
+            "student_name": "student__name",
+            "subject_id": "subject_id",
+            "subject_title": "subject__title",
+            "result": "result",
+        },
+    ),
+    "testings": (
+        Testing.objects.all(),
+        {
+            "id": "id",
+            "attempt_id": "attempt_id",
+            "student_id": "attempt__student_id",
+            "date": "attempt__date",
+            "question_id": "question_id",
+            "answer_id": "answer_id",
+            "is_correct": "answer__is_correct",
+        },
+    ),
+}
+# поле даты для since_date
+DATE_FIELDS = {"attempts": "date", "testings": "attempt__date"}
+
+
+def export_queryset(kind: str, since_id: int | None = None, since_date: date | None = None) -> QuerySet:
+    """
+    Кортежи в порядке колонок EXPORTS[kind], без сортировки - ее добавляет iter_chunks()
+    """
+    queryset, columns = EXPORTS[kind]
+    if since_id is not None:
+        queryset = queryset.filter(pk__gt=since_id)
+    if since_date is not None:
+        queryset = queryset.filter(**{f"{DATE_FIELDS[kind]}__gte": since_date})
+    return queryset.values_list(*columns.values())
+
+
+def iter_chunks(queryset: QuerySet, chunk_size: int = CHUNK_SIZE) -> Iterator[list[tuple]]:
+    """
+    Keyset по id вместо одного курсора на всю таблицу: каждая пачка - короткий запрос,
+    долгая выгрузка не держит транзакцию чтения (и не мешает checkpoint WAL в SQLite).
+    id - первая колонка каждой выгрузки
+    """
+    last_id = None
+    while True:
+        chunk = queryset if last_id is None else queryset.filter(pk__gt=last_id)
+        rows = list(chunk.order_by("pk")[:chunk_size])
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+def iter_csv(kind: str, chunks: Iterable[list[tuple]]) -> Iterator[bytes]:
+    """
+    Заголовок и по куску CSV на пачку строк
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORTS[kind][1])
+    yield buffer.getvalue().encode()
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+
+
+def iter_gzip(parts: Iterable[bytes], level: int = GZIP_LEVEL) -> Iterator[bytes]:
+    """
+    Сжатие на лету: один поток gzip на весь ответ, пустые куски не отправляются
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 - заголовок и контрольная сумма gzip
+    for part in parts:
+        compressed = compressor.compress(part)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_csv(kind: str, since_id: int | None = None, since_date: date | None = None,
+               compress: bool = False) -> Iterator[bytes]:
+    parts = iter_csv(kind, iter_chunks(export_queryset(kind, since_id, since_date)))
+    return iter_gzip(parts) if compress else parts
@@ -0,0 +1,38 @@
+"""
+Счетчики поколений в кеше Django: способ сбросить данные, закешированные в памяти процесса
+или в самом кеше. Сброс виден всем воркерам только при общем кеше (REDIS_URL, settings.SHARED_CACHE);
+с LocMemCache по умолчанию счетчики свои в каждом процессе и сбрасывают только его данные
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+KEY_PREFIX = "example:generation:"
+
+
+def get_generation(name: str) -> int:
+    key = KEY_PREFIX + name
+    generation = cache.get(key)
+    if generation is None:  # ключ вытеснен или еще не создан - новое уникальное значение
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def _incr(name: str) -> None:
+    key = KEY_PREFIX + name
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_generation(*names: str) -> None:
+    """
+    Сдвигает поколения сразу и еще раз после коммита, чтобы воркер,
+    успевший перечитать незакоммиченное состояние, перечитал его еще раз
+    """
+    for name in names:
+        _incr(name)
+    transaction.on_commit(lambda: [_incr(name) for name in names])
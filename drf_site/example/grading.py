@@ -0,0 +1,102 @@
+"""
+Подсчет Attempt.result по строкам Testing: процент правильных ответов попытки.
+Все функции обновляют результаты одним UPDATE с коррелированным подзапросом на пачку попыток
+"""
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Q, QuerySet, Subquery
+from django.db.models.functions import Cast, Coalesce, Round
+
+from example import item_stats, stats
+from example.models import Answer, Attempt, Question, Subject, Testing
+
+DEFAULT_CHUNK_SIZE = 5000
+# модель -> путь от Testing к ней: удаление ее строк каскадом удаляет ответы попыток
+DELETE_PATHS = {Testing: "pk", Answer: "answer", Question: "question", Subject: "question__subject"}
+
+
+def score_subquery() -> Subquery:
+    """
+    Процент правильных ответов для OuterRef("pk") попытки
+    """
+    correct = Count("pk", filter=Q(answer__is_correct=True))
+    score = Round(Cast(correct, FloatField()) * 100 / Count("pk"))
+    scores = (
+        Testing.objects.filter(attempt=OuterRef("pk"))
+        .order_by()
+        .values("attempt")
+        .annotate(score=Cast(score, IntegerField()))
+        .values("score")
+    )
+    return Subquery(scores, output_field=IntegerField())
+
+
+def grade_queryset(attempts: QuerySet) -> int:
+    """
+    Пересчитывает результат попыток из queryset'а, попытки без ответов не меняются
+    """
+    updated = attempts.update(result=Coalesce(score_subquery(), F("result")))
+    if updated:
+        stats.refresh_for_attempts(attempts)  # update() не шлет сигналы
+        item_stats.mark_stale(Testing.objects.filter(attempt__in=attempts))  # в суммах вопросов старый результат
+    return updated
+
+
+def grade_attempts(attempt_ids: Iterable[int], chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    ids = sorted(set(attempt_ids))
+    updated = 0
+    for start in range(0, len(ids), chunk_size):
+        updated += grade_queryset(Attempt.objects.filter(pk__in=ids[start:start + chunk_size]))
+    return updated
+
+
+def grade_attempt(attempt_id: int) -> int:
+    return grade_attempts([attempt_id])
+
+
+def grade_for_answers(answer_ids: Iterable[int]) -> int:
+    """
+    Пересчет попыток, в которых выбирались ответы answer_ids (после смены Answer.is_correct)
+    """
+    affected = Testing.objects.filter(answer_id__in=list(answer_ids)).values("attempt_id")
+    return grade_queryset(Attempt.objects.filter(pk__in=Subquery(affected)))
+
+
+def iter_grade_chunks(attempts: QuerySet | None = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      since_id: int = 0) -> Iterator[tuple[int, int]]:
+    """
+    Пересчет истории пачками по первичному ключу. Отдает (последний id пачки, обновлено строк)
+    """
+    attempts = Attempt.objects.all() if attempts is None else attempts
+    last_id = since_id
+    while True:
+        ids = list(attempts.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:chunk_size])
+        if not ids:
+            return
+        last_id = ids[-1]
+        yield last_id, grade_queryset(Attempt.objects.filter(pk__in=ids))
+
+
+def grade_subject(subject_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    attempts = Attempt.objects.filter(subject_id=subject_id)
+    return sum(updated for _, updated in iter_grade_chunks(attempts, chunk_size))
+
+
+@contextmanager
+def regrade_after_delete(queryset: QuerySet):
+    """
+    Пересчет попыток, у которых удаление queryset'а (вместе с каскадом) забирает ответы: id попыток
+    собираются одним запросом до удаления, пересчет - один UPDATE на пачку после. Сигнала post_delete
+    на Testing нет, поэтому каскад удаляет ответы одним DELETE без запросов на строку;
+    попытки, удаленные тем же каскадом, UPDATE уже не находит
+    """
+    path = DELETE_PATHS[queryset.model]
+    with transaction.atomic():
+        affected = Testing.objects.filter(**{f"{path}__in": queryset.values("pk")})
+        attempt_ids = set(affected.values_list("attempt_id", flat=True).distinct())
+        item_stats.mark_stale(affected)  # удаленные строки остались бы в суммах вопросов
+        yield
+        if attempt_ids:
+            grade_attempts(attempt_ids)
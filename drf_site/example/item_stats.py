@@ -0,0 +1,204 @@
+"""
+Пакетный расчет статистики вопросов на NumPy. Строки Testing с Answer.is_correct и Attempt.result
+читаются пачками по первичному ключу, агрегируются векторно и прибавляются к суммам в QuestionStats.
+Следующий запуск начинает с последнего учтенного Testing, поэтому учитываются только новые ответы.
+Если учтенные строки меняются (пересчет результата попытки, удаление ответов), grading помечает
+их вопросы stale, и запуск считает такие вопросы заново до границы
+"""
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.db.models import QuerySet, Subquery
+from django.utils import timezone
+
+from example import response_cache
+from example.models import ItemStatsRun, Question, QuestionStats, Testing
+
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только для пакетного расчета
+    np = None
+
+DEFAULT_CHUNK_SIZE = 200_000
+WRITE_BATCH_SIZE = 2000
+SUM_FIELDS = "responses", "correct", "result_sum", "result_sq_sum", "correct_result_sum"
+ROW_DTYPE = [("id", "i8"), ("question", "i8"), ("answer", "i8"), ("correct", "?"), ("result", "f8")]
+
+
+def mark_stale(testings: QuerySet) -> int:
+    """
+    Помечает stale вопросы строк testings, уже учтенных в суммах (id не больше границы последнего запуска).
+    Один UPDATE; новые строки за границей не помечаются - их посчитает следующий запуск
+    """
+    boundary = ItemStatsRun.objects.order_by("-pk").values("last_testing_id")[:1]
+    counted = testings.filter(pk__lte=Subquery(boundary)).values("question_id")
+    return QuestionStats.objects.filter(question_id__in=counted, stale=False).update(stale=True)
+
+
+def load_chunk(after_id: int, chunk_size: int, testings: QuerySet | None = None):
+    """
+    Пачка строк как структурированный массив, без промежуточного списка кортежей
+    """
+    testings = Testing.objects.all() if testings is None else testings
+    rows = (
+        testings.filter(pk__gt=after_id)
+        .order_by("pk")
+        .values_list("pk", "question_id", "answer_id", "answer__is_correct", "attempt__result")[:chunk_size]
+    )
+    return np.fromiter(rows.iterator(chunk_size=10000), dtype=ROW_DTYPE)
+
+
+def aggregate_chunk(rows) -> tuple:
+    """
+    Суммы по вопросам и число выборов каждого ответа в пачке
+    """
+    questions, inverse = np.unique(rows["question"], return_inverse=True)
+    correct = rows["correct"].astype("f8")
+    result = rows["result"]
+    size = len(questions)
+    sums = {
+        "responses": np.bincount(inverse, minlength=size).astype("f8"),
+        "correct": np.bincount(inverse, weights=correct, minlength=size),
+        "result_sum": np.bincount(inverse, weights=result, minlength=size),
+        "result_sq_sum": np.bincount(inverse, weights=result * result, minlength=size),
+        "correct_result_sum": np.bincount(inverse, weights=result * correct, minlength=size),
+    }
+    answers, first, counts = np.unique(rows["answer"], return_index=True, return_counts=True)
+    return questions, sums, (rows["question"][first], answers, counts)
+
+
+def derive(sums: dict) -> tuple:
+    """
+    Доля правильных ответов и точечно-бисериальная корреляция r = (M1 - M0) / s * sqrt(p * q)
+    """
+    n, n_correct = sums["responses"], sums["correct"]
+    n_wrong = n - n_correct
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = n_correct / n
+        mean = sums["result_sum"] / n
+        std = np.sqrt(np.maximum(sums["result_sq_sum"] / n - mean * mean, 0))
+        mean_correct = sums["correct_result_sum"] / n_correct
+        mean_wrong = (sums["result_sum"] - sums["correct_result_sum"]) / n_wrong
+        r = (mean_correct - mean_wrong) / std * np.sqrt(p * (1 - p))
+    defined = (n_correct > 0) & (n_wrong > 0) & (std > 0)
+    return np.where(n > 0, p, np.nan), np.where(defined, r, np.nan)
+
+
+def merge_chunk(questions, sums: dict, answer_counts: tuple) -> None:
+    """
+    Прибавляет суммы пачки к сохраненным и пересчитывает производные показатели
+    """
+    ids = [int(question_id) for question_id in questions]
+    existing = {}
+    for start in range(0, len(ids), WRITE_BATCH_SIZE):
+        existing.update(QuestionStats.objects.in_bulk(ids[start:start + WRITE_BATCH_SIZE], field_name="question_id"))
+
+    totals = {name: sums[name] + np.array([getattr(existing.get(pk), name, 0) for pk in ids], dtype="f8")
+              for name in SUM_FIELDS}
+    difficulty, discrimination = derive(totals)
+
+    counts = {pk: dict(getattr(existing.get(pk), "answer_counts", None) or {}) for pk in ids}
+    for question_id, answer_id, count in zip(*answer_counts):
+        question_counts = counts[int(question_id)]
+        question_counts[str(answer_id)] = question_counts.get(str(answer_id), 0) + int(count)
+
+    objects = [
+        QuestionStats(
+            question_id=pk,
+            responses=int(totals["responses"][position]),
+            correct=int(totals["correct"][position]),
+            result_sum=float(totals["result_sum"][position]),
+            result_sq_sum=float(totals["result_sq_sum"][position]),
+            correct_result_sum=float(totals["correct_result_sum"][position]),
+            answer_counts=counts[pk],
+            difficulty=None if np.isnan(difficulty[position]) else round(float(difficulty[position]), 4),
+            discrimination=None if np.isnan(discrimination[position]) else round(float(discrimination[position]), 4),
+        )
+        for position, pk in enumerate(ids)
+    ]
+    QuestionStats.objects.bulk_create(
+        objects,
+        batch_size=WRITE_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["question"],
+        update_fields=[*SUM_FIELDS, "answer_counts", "difficulty", "discrimination", "updated_at"],
+    )
+
+
+def recompute_stale(last_id: int, chunk_size: int) -> list[int]:
+    """
+    Суммы вопросов stale считаются заново по строкам до границы last_id: пачка вопросов сбрасывается
+    и пересчитывается в одной транзакции, прерванный пересчет не оставляет неполных сумм
+    """
+    stale = list(QuestionStats.objects.filter(stale=True).order_by("question_id").values_list("question_id", flat=True))
+    for start in range(0, len(stale), WRITE_BATCH_SIZE):
+        ids = stale[start:start + WRITE_BATCH_SIZE]
+        testings = Testing.objects.filter(question_id__in=ids, pk__lte=last_id)
+        with transaction.atomic():
+            QuestionStats.objects.filter(question_id__in=ids).delete()
+            after_id = 0
+            while True:
+                rows = load_chunk(after_id, chunk_size, testings)
+                if not len(rows):
+                    break
+                merge_chunk(*aggregate_chunk(rows))
+                after_id = int(rows["id"][-1])
+    return stale
+
+
+def start_run(full: bool, force: bool) -> ItemStatsRun:
+    """
+    Журнал нового запуска. Два запуска с одной границей посчитали бы строки дважды, поэтому
+    при незавершенном запуске - ошибка; force закрывает незавершенные (процесс прервали)
+    """
+    with transaction.atomic():
+        list(ItemStatsRun.objects.select_for_update().order_by("-pk")[:1])  # параллельный запуск ждет здесь
+        unfinished = ItemStatsRun.objects.filter(finished_at__isnull=True)
+        if unfinished.exists():
+            if not force:
+                raise CommandError("Предыдущий запуск не завершен. Если его процесс прерван, используйте --force")
+            unfinished.update(finished_at=timezone.now())
+        previous = ItemStatsRun.objects.order_by("-pk").first()
+        last_id = 0 if full or previous is None else previous.last_testing_id
+        return ItemStatsRun.objects.create(full=full, last_testing_id=last_id)
+
+
+def run(chunk_size: int = DEFAULT_CHUNK_SIZE, full: bool = False, progress=None, force: bool = False) -> ItemStatsRun:
+    """
+    Пересчитывает вопросы stale и учитывает строки Testing после прошлого запуска;
+    full=True пересчитывает все с нуля
+    """
+    if np is None:
+        raise CommandError("Для расчета статистики вопросов нужен numpy: pip install numpy")
+
+    run_log = start_run(full, force)
+    try:
+        last_id = run_log.last_testing_id
+        if full:
+            QuestionStats.objects.all().delete()
+            touched = set()
+        else:
+            touched = set(recompute_stale(last_id, chunk_size))
+
+        while True:
+            rows = load_chunk(last_id, chunk_size)
+            if not len(rows):
+                break
+            questions, sums, answer_counts = aggregate_chunk(rows)
+            last_id = int(rows["id"][-1])
+            with transaction.atomic():  # суммы и граница сохраняются вместе, прерванный запуск можно продолжить
+                merge_chunk(questions, sums, answer_counts)
+                run_log.last_testing_id = last_id
+                run_log.rows += len(rows)
+                run_log.save(update_fields=["last_testing_id", "rows"])
+            touched.update(int(question_id) for question_id in questions)
+            if progress is not None:
+                progress(run_log)
+    finally:
+        run_log.finished_at = timezone.now()
+        run_log.save(update_fields=["finished_at"])
+
+    if len(touched) > WRITE_BATCH_SIZE:
+        response_cache.invalidate_model(Question)
+    elif touched:
+        response_cache.invalidate_objects(Question, touched)
+    return run_log
@@ -0,0 +1,62 @@
+import importlib
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from example import dataset
+from example.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = "Запуск бенчмарков из example.benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", choices=sorted(BENCHMARKS))
+        parser.add_argument("--iterations", type=int, help="По умолчанию - свое значение у каждого бенчмарка")
+        parser.add_argument("--concurrency", type=int, nargs="+",
+                            help="Уровни конкурентности для бенчмарков concurrency и sqlite")
+        parser.add_argument("--output", help="Файл для сохранения результата в JSON")
+        parser.add_argument("--dataset", choices=sorted(dataset.PRESETS),
+                            help="Перед запуском заменить данные в базе набором generate_data с этим пресетом")
+        parser.add_argument("--noinput", "--no-input", action="store_false", dest="interactive",
+                            help="Не спрашивать подтверждение перед заменой данных (--dataset)")
+        parser.add_argument("--baseline", help="JSON прошлого запуска: регрессия относительно него завершает команду ошибкой")
+        parser.add_argument("--tolerance", type=float, default=0.5, help="Допустимый рост задержки и размера ответа")
+
+    def confirm_flush(self, interactive: bool) -> None:
+        """
+        --dataset удаляет все данные настроенной базы: только при DEBUG и после подтверждения
+        """
+        database = settings.DATABASES["default"]["NAME"]
+        if not settings.DEBUG:
+            raise CommandError("--dataset удаляет данные из базы и доступен только при DEBUG = True")
+        if interactive:
+            answer = input(f"Все данные в базе {database} будут заменены набором данных. Введите 'yes' для продолжения: ")
+            if answer != "yes":
+                raise CommandError("Отменено")
+
+    def handle(self, *args, **options):
+        module = importlib.import_module(BENCHMARKS[options["name"]])
+        generated = None
+        if options["dataset"]:
+            self.confirm_flush(options["interactive"])
+            generated = dataset.generate(dataset.get_config(options["dataset"]), flush=True)
+        options.pop("interactive")
+        result = module.run(**{name: value for name, value in options.items() if value is not None})
+        if generated is not None:
+            result = {"dataset": {"preset": options["dataset"], **generated}, **result}
+        text = json.dumps(result, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(text)
+        self.stdout.write(text)
+
+        if options["baseline"]:
+            if not hasattr(module, "compare"):
+                raise CommandError(f"Бенчмарк {options['name']} не поддерживает сравнение с базовой линией")
+            with open(options["baseline"], encoding="utf-8") as file:
+                regressions = module.compare(result, json.load(file), options["tolerance"])
+            if regressions:
+                raise CommandError("Регрессия производительности:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("Регрессий относительно базовой линии нет"))
@@ -0,0 +1,38 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from example import export
+
+
+class Command(BaseCommand):
+    help = "Потоковая выгрузка попыток или результатов тестирования в CSV (колонки - в example/export.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=list(export.EXPORTS))
+        parser.add_argument("--output", required=True, help="Файл CSV (с --gzip - .csv.gz)")
+        parser.add_argument("--since-id", type=int, help="Только строки с id больше указанного")
+        parser.add_argument("--since-date", help="Только попытки с этой даты (YYYY-MM-DD)")
+        parser.add_argument("--gzip", action="store_true", help="Сжатие gzip на лету")
+
+    def handle(self, *args, **options):
+        try:
+            since_date = date.fromisoformat(options["since_date"]) if options["since_date"] else None
+        except ValueError:
+            raise CommandError("--since-date - дата в формате YYYY-MM-DD")
+
+        stats = {"rows": 0, "last_id": options["since_id"]}
+
+        def counted(chunks):
+            for rows in chunks:
+                stats["rows"] += len(rows)
+                stats["last_id"] = rows[-1][0]
+                yield rows
+
+        kind = options["kind"]
+        parts = export.iter_csv(kind, counted(export.iter_chunks(export.export_queryset(kind, options["since_id"], since_date))))
+        with open(options["output"], "wb") as file:
+            for part in export.iter_gzip(parts) if options["gzip"] else parts:
+                file.write(part)
+        # last_id - since_id следующей инкрементальной выгрузки
+        self.stdout.write(self.style.SUCCESS(f"{stats['rows']} строк, last_id={stats['last_id']}"))
@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from example import dataset
+
+
+class Command(BaseCommand):
+    help = ("Заполняет базу детерминированным синтетическим набором данных. "
+            "Например: generate_data --preset production (1000 предметов, 1M студентов, ~50M Testing)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--preset", choices=sorted(dataset.PRESETS), default="small")
+        parser.add_argument("--subjects", type=int)
+        parser.add_argument("--students", type=int)
+        parser.add_argument("--questions-per-subject", type=float)
+        parser.add_argument("--attempts-per-student", type=float)
+        parser.add_argument("--questions-per-attempt", type=int)
+        parser.add_argument("--seed", type=int)
+        parser.add_argument("--chunk-size", type=int, default=dataset.DEFAULT_CHUNK_SIZE, help="Попыток на транзакцию")
+        parser.add_argument("--flush", action="store_true", help="Удалить существующие данные перед генерацией")
+        parser.add_argument("--skip-stats", action="store_true", help="Не пересчитывать StudentSubjectStats")
+
+    def handle(self, *args, **options):
+        config = dataset.get_config(
+            options["preset"],
+            subjects=options["subjects"],
+            students=options["students"],
+            questions_per_subject=options["questions_per_subject"],
+            attempts_per_student=options["attempts_per_student"],
+            questions_per_attempt=options["questions_per_attempt"],
+            seed=options["seed"],
+        )
+        summary = dataset.generate(
+            config,
+            chunk_size=options["chunk_size"],
+            flush=options["flush"],
+            rebuild_stats=not options["skip_stats"],
+            progress=lambda counts, rate: self.stdout.write(
+                f"{', '.join(f'{name}: {count}' for name, count in counts.items())} ({rate} строк/с)"
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS(json.dumps(summary, ensure_ascii=False, indent=2)))
@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from example import question_import
+
+
+class Command(BaseCommand):
+    help = "Потоковый импорт вопросов с ответами из CSV или JSONL (форматы описаны в example/question_import.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=question_import.FORMATS, help="По умолчанию - по расширению файла")
+        parser.add_argument("--batch-size", type=int, default=question_import.BATCH_SIZE, help="Вопросов на транзакцию")
+
+    def handle(self, *args, **options):
+        try:
+            fmt = options["format"] or question_import.detect_format(options["path"])
+            with open(options["path"], "rb") as file:
+                question_import.check_encoding(file)
+            with open(options["path"], encoding="utf-8-sig", newline="") as file:
+                report = question_import.import_questions(
+                    question_import.read_records(file, fmt),
+                    batch_size=options["batch_size"],
+                    progress=lambda report: self.stdout.write(
+                        f"{report['rows']} строк, {report['questions']} вопросов, "
+                        f"{report['error_count']} ошибок ({report['rows_per_sec']} строк/с)"
+                    ),
+                )
+        except question_import.ImportFormatError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(json.dumps(report, ensure_ascii=False, indent=2)))
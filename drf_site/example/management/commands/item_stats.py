@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from example import item_stats
+
+
+class Command(BaseCommand):
+    help = "Считает статистику вопросов (сложность, дискриминативность, выбор вариантов) по новым ответам"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=item_stats.DEFAULT_CHUNK_SIZE)
+        parser.add_argument("--full", action="store_true", help="Пересчитать всю историю с нуля")
+        parser.add_argument("--force", action="store_true", help="Запустить, даже если предыдущий запуск не завершен")
+
+    def handle(self, *args, **options):
+        run = item_stats.run(
+            chunk_size=options["chunk_size"],
+            full=options["full"],
+            force=options["force"],
+            progress=lambda run: self.stdout.write(f"Обработано {run.rows} строк (Testing до id {run.last_testing_id})"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Готово: {run.rows} строк"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from example import search
+
+
+class Command(BaseCommand):
+    help = "Пересоздает FTS5 индексы вопросов и ответов (и триггеры синхронизации, если их нет)"
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Полнотекстовый индекс поддерживается только для SQLite")
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS("Поисковый индекс перестроен"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from example import stats
+
+
+class Command(BaseCommand):
+    help = "Перестраивает статистику студентов по предметам пачками и сверяет ее с живым агрегатом"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=stats.DEFAULT_CHUNK_SIZE, help="Студентов в пачке")
+        parser.add_argument("--check", action="store_true", help="Только сверка, без перестройки")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        if not options["check"]:
+            total = 0
+            for written in stats.rebuild(chunk_size):
+                total += written
+                self.stdout.write(f"Записано {total} строк статистики")
+
+        mismatches = 0
+        for mismatch in stats.check(chunk_size):
+            mismatches += 1
+            self.stderr.write(f"Расхождение: {mismatch}")
+        if mismatches:
+            raise CommandError(f"Найдено расхождений: {mismatches}")
+        self.stdout.write(self.style.SUCCESS("Статистика совпадает с попытками"))
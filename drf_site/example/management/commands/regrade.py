@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from example import grading
+from example.models import Attempt
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает Attempt.result по ответам из Testing пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=grading.DEFAULT_CHUNK_SIZE)
+        parser.add_argument("--subject", type=int, help="Только попытки по предмету")
+        parser.add_argument("--since-id", type=int, default=0, help="Продолжить с попытки после этого id")
+
+    def handle(self, *args, **options):
+        attempts = Attempt.objects.all()
+        if options["subject"] is not None:
+            attempts = attempts.filter(subject_id=options["subject"])
+
+        total = 0
+        for last_id, updated in grading.iter_grade_chunks(attempts, options["chunk_size"], options["since_id"]):
+            total += updated
+            self.stdout.write(f"Пересчитано {total} попыток (последний id {last_id})")
+        self.stdout.write(self.style.SUCCESS(f"Готово: {total} попыток"))
@@ -0,0 +1,127 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from example import profiling, timing
+
+logger = logging.getLogger("example.timing")
+
+SAMPLE_RATE = getattr(settings, "REQUEST_TIMING_SAMPLE_RATE", 1.0)  # доля запросов с замерами
+SLOW_REQUEST_MS = getattr(settings, "REQUEST_TIMING_SLOW_MS", None)  # None - не логировать
+SLOW_QUERIES = getattr(settings, "REQUEST_TIMING_SLOW_QUERIES", 5)  # сколько SQL запросов попадает в лог
+
+
+class ServerTimingMiddleware:
+    """
+    Заголовок Server-Timing (db, serialize, render, total) и строка JSON в лог для медленных запросов.
+    Для потоковых ответов учитывается только время до первого байта
+    """
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if SAMPLE_RATE < 1 and random.random() >= SAMPLE_RATE:
+            return self.get_response(request)
+
+        metrics = timing.RequestTiming(SLOW_QUERIES if SLOW_REQUEST_MS is not None else 0)
+        token = timing.activate(metrics)
+        try:
+            with ExitStack() as stack:
+                self.wrap_queries(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            timing.deactivate(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if SAMPLE_RATE < 1 and random.random() >= SAMPLE_RATE:
+            return await self.get_response(request)
+
+        metrics = timing.RequestTiming(SLOW_QUERIES if SLOW_REQUEST_MS is not None else 0)
+        token = timing.activate(metrics)
+        # соединения с базой живут в потоке sync_to_async запроса, а не в event loop -
+        # обертка ставится и снимается в том же потоке, где async ORM выполняет SQL
+        stack = ExitStack()
+        try:
+            await sync_to_async(self.wrap_queries)(stack, metrics)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            timing.deactivate(token)
+        return self.finish(request, response, metrics)
+
+    @staticmethod
+    def wrap_queries(stack: ExitStack, metrics: timing.RequestTiming) -> None:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics.query_wrapper))
+
+    def finish(self, request, response, metrics: timing.RequestTiming):
+        response["Server-Timing"] = metrics.header()
+        if SLOW_REQUEST_MS is not None and metrics.total * 1000 >= SLOW_REQUEST_MS:
+            logger.warning(json.dumps({
+                "method": request.method,
+                "path": request.get_full_path(),
+                "status": response.status_code,
+                "total_ms": round(metrics.total * 1000, 3),
+                "db_ms": round(metrics.db * 1000, 3),
+                "queries": metrics.queries,
+                **{f"{name}_ms": round(seconds * 1000, 3) for name, seconds in metrics.spans.items()},
+                "slow_queries": metrics.slowest(),
+            }, ensure_ascii=False))
+        return response
+
+    def process_template_response(self, request, response):
+        """
+        Ответы DRF рендерятся после view: время между этим вызовом и post-render callback
+        """
+        metrics = timing.current()
+        if metrics is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: metrics.add("render", time.perf_counter() - started))
+        return response
+
+
+class ProfilerMiddleware:
+    """
+    Запуск запроса сотрудника под профайлером (см. example.profiling); запросы без флага не затрагиваются
+    """
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        mode = profiling.requested_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        user = profiling.staff_user(request)
+        if user is None:
+            return self.get_response(request)
+        return profiling.profile_request(request, self.get_response, mode, user)
+
+    async def __acall__(self, request):
+        mode = profiling.requested_mode(request)
+        if mode is None:
+            return await self.get_response(request)
+        user = await sync_to_async(profiling.staff_user)(request)
+        if user is None:
+            return await self.get_response(request)
+        return await profiling.aprofile_request(request, self.get_response, mode, user)
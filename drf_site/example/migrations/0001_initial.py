@@ -0,0 +1,93 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Question',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField(verbose_name='Текст вопроса')),
+            ],
+            options={
+                'verbose_name': 'Вопросы',
+                'verbose_name_plural': 'Вопросы',
+            },
+        ),
+        migrations.CreateModel(
+            name='Student',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Фамилия и имя')),
+            ],
+            options={
+                'verbose_name': 'Студенты',
+                'verbose_name_plural': 'Студенты',
+            },
+        ),
+        migrations.CreateModel(
+            name='Subject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255, verbose_name='Тема')),
+            ],
+            options={
+                'verbose_name': 'Задания',
+                'verbose_name_plural': 'Задания',
+            },
+        ),
+        migrations.CreateModel(
+            name='Answer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField(verbose_name='Ответ')),
+                ('is_correct', models.BooleanField(verbose_name='Результат')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='example.question', verbose_name='Вопрос')),
+            ],
+            options={
+                'verbose_name': 'Ответы',
+                'verbose_name_plural': 'Ответы',
+            },
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='subject',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='example.subject', verbose_name='Предмет'),
+        ),
+        migrations.CreateModel(
+            name='Attempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('result', models.PositiveSmallIntegerField(verbose_name='Результат')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='example.student', verbose_name='Студент')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='example.subject', verbose_name='Предмет')),
+            ],
+            options={
+                'verbose_name': 'Попытки',
+                'verbose_name_plural': 'Попытки',
+            },
+        ),
+        migrations.CreateModel(
+            name='Testing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='example.answer', verbose_name='Ответ')),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='example.attempt', verbose_name='Попытка')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='example.question', verbose_name='Вопрос')),
+            ],
+            options={
+                'verbose_name': 'Тестирование',
+                'verbose_name_plural': 'Тестирование',
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('example', '0002_attempt_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSubjectStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt_count', models.PositiveIntegerField(default=0, verbose_name='Количество попыток')),
+                ('result_sum', models.PositiveBigIntegerField(default=0, verbose_name='Сумма результатов')),
+                ('best_result', models.PositiveSmallIntegerField(default=0, verbose_name='Лучший результат')),
+                ('last_attempt_date', models.DateField(null=True, verbose_name='Дата последней попытки')),
+            ],
+            options={
+                'verbose_name': 'Статистика',
+                'verbose_name_plural': 'Статистика',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(fields=['student', 'subject'], name='attempt_student_subject_idx'),
+        ),
+        migrations.AddField(
+            model_name='studentsubjectstats',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='example.student', verbose_name='Студент'),
+        ),
+        migrations.AddField(
+            model_name='studentsubjectstats',
+            name='subject',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='example.subject', verbose_name='Предмет'),
+        ),
+        migrations.AddConstraint(
+            model_name='studentsubjectstats',
+            constraint=models.UniqueConstraint(fields=('student', 'subject'), name='stats_student_subject_unique'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('example', '0003_student_subject_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemStatsRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='Начало')),
+                ('last_testing_id', models.PositiveBigIntegerField(default=0, verbose_name='Последний учтенный Testing')),
+                ('rows', models.PositiveBigIntegerField(default=0, verbose_name='Обработано строк')),
+                ('full', models.BooleanField(default=False, verbose_name='Полный пересчет')),
+            ],
+            options={
+                'verbose_name': 'Запуски статистики вопросов',
+                'verbose_name_plural': 'Запуски статистики вопросов',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('responses', models.PositiveBigIntegerField(default=0, verbose_name='Ответов')),
+                ('correct', models.PositiveBigIntegerField(default=0, verbose_name='Правильных ответов')),
+                ('result_sum', models.FloatField(default=0)),
+                ('result_sq_sum', models.FloatField(default=0)),
+                ('correct_result_sum', models.FloatField(default=0)),
+                ('answer_counts', models.JSONField(default=dict, verbose_name='Выбор вариантов ответа')),
+                ('difficulty', models.FloatField(null=True, verbose_name='Доля правильных ответов')),
+                ('discrimination', models.FloatField(null=True, verbose_name='Дискриминативность')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='item_stats', to='example.question', verbose_name='Вопрос')),
+            ],
+            options={
+                'verbose_name': 'Статистика вопросов',
+                'verbose_name_plural': 'Статистика вопросов',
+            },
+        ),
+    ]
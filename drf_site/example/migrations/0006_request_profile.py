@@ -0,0 +1,35 @@
+# Generated by Django 5.0 on 2026-10-18 07:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('example', '0005_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.TextField(verbose_name='Адрес')),
+                ('status', models.PositiveSmallIntegerField(verbose_name='Статус')),
+                ('duration_ms', models.FloatField(verbose_name='Длительность, мс')),
+                ('stats', models.BinaryField(verbose_name='pstats')),
+                ('summary', models.TextField(verbose_name='Сводка')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Профили запросов',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
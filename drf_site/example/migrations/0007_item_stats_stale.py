@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-18 08:22
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def close_previous_runs(apps, schema_editor):
+    """
+    Прошлые запуски завершены: иначе новый запуск принял бы их за идущие
+    """
+    ItemStatsRun = apps.get_model('example', 'ItemStatsRun')
+    ItemStatsRun.objects.update(finished_at=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('example', '0006_request_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemstatsrun',
+            name='finished_at',
+            field=models.DateTimeField(null=True, verbose_name='Окончание'),
+        ),
+        migrations.AddField(
+            model_name='questionstats',
+            name='stale',
+            field=models.BooleanField(default=False, verbose_name='Требует пересчета'),
+        ),
+        migrations.RunPython(close_previous_runs, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,36 @@
+from django.conf import settings
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 
-class Subject(models.Model):
+class RegradeOnDeleteQuerySet(models.QuerySet):
+    """
+    delete() пересчитывает результаты попыток, у которых каскадом удаляются ответы (Testing)
+    """
+    def delete(self):
+        from example import grading  # grading импортирует модели
+
+        with grading.regrade_after_delete(self):
+            return super().delete()
+
+
+class RegradeOnDeleteModel(models.Model):
+    """
+    То же для удаления одного объекта (API, админка)
+    """
+    objects = RegradeOnDeleteQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def delete(self, *args, **kwargs):
+        from example import grading
+
+        with grading.regrade_after_delete(type(self)._default_manager.filter(pk=self.pk)):
+            return super().delete(*args, **kwargs)
+
+
+class Subject(RegradeOnDeleteModel):
     """
     Модель представляющая вопросы
     """
@@ -46,9 +74,13 @@ class Attempt(models.Model):
     class Meta:
         verbose_name = "Попытки"
         verbose_name_plural = "Попытки"
+        indexes = [
+            models.Index(fields=["date", "id"], name="attempt_date_id_idx"),  # для keyset пагинации
+            models.Index(fields=["student", "subject"], name="attempt_student_subject_idx"),  # для статистики
+        ]
 
 
-class Question(models.Model):
+class Question(RegradeOnDeleteModel):
     """
     Модель вопросов
     """
@@ -63,7 +95,7 @@ class Question(models.Model):
         return self.text[:30] + '...'
 
 
-class Answer(models.Model):
+class Answer(RegradeOnDeleteModel):
     """
     Модель ответов
     """
@@ -79,7 +111,7 @@ class Answer(models.Model):
         return self.text[:30] + '...'
 
 
-class Testing(models.Model):
+class Testing(RegradeOnDeleteModel):
     """
     Модель тестирования
     """
@@ -90,3 +122,88 @@ class Testing(models.Model):
     class Meta:
         verbose_name = "Тестирование"
         verbose_name_plural = "Тестирование"
+
+
+class StudentSubjectStats(models.Model):
+    """
+    Статистика попыток студента по предмету, обновляется при изменении попыток
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, verbose_name=_('Студент'))
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, verbose_name=_('Предмет'))
+    attempt_count = models.PositiveIntegerField(_('Количество попыток'), default=0)
+    result_sum = models.PositiveBigIntegerField(_('Сумма результатов'), default=0)
+    best_result = models.PositiveSmallIntegerField(_('Лучший результат'), default=0)
+    last_attempt_date = models.DateField(_('Дата последней попытки'), null=True)
+
+    # колонки, из которых считаются свойства: по ним план сериализатора строит only()
+    property_columns = {"average_result": ("result_sum", "attempt_count")}
+
+    class Meta:
+        verbose_name = "Статистика"
+        verbose_name_plural = "Статистика"
+        constraints = [
+            models.UniqueConstraint(fields=["student", "subject"], name="stats_student_subject_unique"),
+        ]
+
+    @property
+    def average_result(self) -> float:
+        return round(self.result_sum / self.attempt_count, 2) if self.attempt_count else 0.0
+
+
+class QuestionStats(models.Model):
+    """
+    Психометрика вопроса: доля правильных ответов, точечно-бисериальная корреляция с результатом попытки
+    и популярность вариантов ответа. Хранятся суммы, поэтому новые ответы добавляются без пересчета истории
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name="item_stats",
+                                    verbose_name=_('Вопрос'))
+    responses = models.PositiveBigIntegerField(_('Ответов'), default=0)
+    correct = models.PositiveBigIntegerField(_('Правильных ответов'), default=0)
+    result_sum = models.FloatField(default=0)
+    result_sq_sum = models.FloatField(default=0)
+    correct_result_sum = models.FloatField(default=0)
+    answer_counts = models.JSONField(_('Выбор вариантов ответа'), default=dict)
+    difficulty = models.FloatField(_('Доля правильных ответов'), null=True)
+    discrimination = models.FloatField(_('Дискриминативность'), null=True)
+    # учтенные ответы изменились (пересчет результата, удаление): следующий запуск считает вопрос заново
+    stale = models.BooleanField(_('Требует пересчета'), default=False)
+    updated_at = models.DateTimeField(_('Обновлено'), auto_now=True)
+
+    class Meta:
+        verbose_name = "Статистика вопросов"
+        verbose_name_plural = "Статистика вопросов"
+
+
+class ItemStatsRun(models.Model):
+    """
+    Запуск расчета статистики вопросов: last_testing_id - граница уже учтенных ответов,
+    finished_at пуст, пока запуск идет (или если процесс прервали)
+    """
+    started_at = models.DateTimeField(_('Начало'), auto_now_add=True)
+    finished_at = models.DateTimeField(_('Окончание'), null=True)
+    last_testing_id = models.PositiveBigIntegerField(_('Последний учтенный Testing'), default=0)
+    rows = models.PositiveBigIntegerField(_('Обработано строк'), default=0)
+    full = models.BooleanField(_('Полный пересчет'), default=False)
+
+    class Meta:
+        verbose_name = "Запуски статистики вопросов"
+        verbose_name_plural = "Запуски статистики вопросов"
+
+
+class RequestProfile(models.Model):
+    """
+    Профиль запроса сотрудника (?profile=store): статистика cProfile в формате pstats и текстовая сводка
+    """
+    created_at = models.DateTimeField(_('Создан'), auto_now_add=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, verbose_name=_('Пользователь'))
+    method = models.CharField(_('Метод'), max_length=10)
+    path = models.TextField(_('Адрес'))
+    status = models.PositiveSmallIntegerField(_('Статус'))
+    duration_ms = models.FloatField(_('Длительность, мс'))
+    stats = models.BinaryField(_('pstats'))
+    summary = models.TextField(_('Сводка'))
+
+    class Meta:
+        verbose_name = "Профили запросов"
+        verbose_name_plural = "Профили запросов"
+        ordering = ["-id"]
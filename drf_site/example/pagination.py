@@ -0,0 +1,188 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) пагинация: страница выбирается условием WHERE по ключу сортировки,
+    без OFFSET и без COUNT(*). Курсор непрозрачный - base64 от последнего ключа страницы
+    """
+    ordering = "id",  # поля ключа, последнее должно быть уникальным
+    page_size = 5
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+
+        values, self.reverse = self.decode_cursor(request)
+        ordering = self.get_ordering(self.reverse)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.build_keyset_filter(ordering, values))
+
+        rows = list(queryset[:self.page_size + 1])  # +1 строка, чтобы узнать есть ли следующая страница
+        self.has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        self.has_cursor = values is not None
+        self.has_next = self.has_more if not self.reverse else self.has_cursor
+        self.has_previous = self.has_cursor if not self.reverse else self.has_more
+        self.first_key = self.get_key(rows[0]) if rows else None
+        self.last_key = self.get_key(rows[-1]) if rows else None
+        return rows
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def get_ordering(self, reverse: bool = False) -> list:
+        if not reverse:
+            return list(self.ordering)
+        return [name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering]
+
+    @staticmethod
+    def build_keyset_filter(ordering: list, values: list) -> Q:
+        """
+        (a, b) > (x, y) раскрывается в a > x OR (a = x AND b > y) с учетом направлений сортировки
+        """
+        condition = Q()
+        for position, name in enumerate(ordering):
+            field = name.lstrip("-")
+            lookup = "lt" if name.startswith("-") else "gt"
+            step = Q(**{f"{field}__{lookup}": values[position]})
+            for prev_name, prev_value in zip(ordering[:position], values):
+                step &= Q(**{prev_name.lstrip("-"): prev_value})
+            condition |= step
+        return condition
+
+    def get_key(self, instance) -> list:
+        return [getattr(instance, name.lstrip("-")) for name in self.ordering]
+
+    def encode_cursor(self, key: list, reverse: bool) -> str:
+        payload = {"k": [str(value) for value in key]}  # обратно приводится через field.to_python
+        if reverse:
+            payload["r"] = 1
+        raw = base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, raw.rstrip("="))
+
+    def decode_cursor(self, request) -> tuple:
+        raw = request.query_params.get(self.cursor_query_param)
+        if not raw:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+            fields = [self.model._meta.get_field(name.lstrip("-")) for name in self.ordering]
+            values = [field.to_python(value) for field, value in zip(fields, payload["k"], strict=True)]
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError, FieldDoesNotExist):
+            raise NotFound(self.invalid_cursor_message)
+        return values, bool(payload.get("r"))
+
+    def get_next_link(self):
+        if not self.has_next or self.last_key is None:
+            return None
+        return self.encode_cursor(self.last_key, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_key is None:  # пустая страница после курсора - возвращаемся к началу
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.first_key, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Курсор страницы",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Размер страницы",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+class AttemptKeysetPagination(KeysetPagination):
+    """
+    Попытки: от новых к старым по (date, id)
+    """
+    ordering = "-date", "-id"
+
+
+class TestingKeysetPagination(KeysetPagination):
+    """
+    Результаты тестирования по id
+    """
+    ordering = "id",
+
+
+class AsyncPageNumberMixin:
+    """
+    apaginate_queryset() для PageNumberPagination в async view: COUNT(*) через acount(),
+    строки страницы - срезом queryset'а через async for
+    """
+    async def apaginate_queryset(self: PageNumberPagination, queryset: QuerySet, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        # Paginator над range(count) проверяет номер страницы без запросов, границы страницы - в ее object_list
+        paginator = self.django_paginator_class(range(await queryset.acount()), page_size)
+        page_number = self.get_page_number(request, paginator)
+        try:
+            page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        bounds = page.object_list
+        rows = [row async for row in queryset[bounds.start:bounds.stop]]
+        self.page = Page(rows, page.number, paginator)
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return rows
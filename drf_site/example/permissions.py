@@ -1,9 +1,20 @@
 from rest_framework import permissions
 
 
+def is_staff_user(user) -> bool:
+    """
+    Сотрудник: изменения через API и профилирование запросов
+    """
+    return bool(user and user.is_staff)
+
+
 class IsAdminOrReadOnly(permissions.BasePermission):
+    """
+    Чтение - всем, изменения - сотрудникам. view.read_methods - методы, которые у этого view
+    только читают (например POST со списком id, не помещающимся в адрес)
+    """
     def has_permission(self, request, view):
-        if request.method in permissions.SAFE_METHODS:
+        if request.method in permissions.SAFE_METHODS or request.method in getattr(view, "read_methods", ()):
             return True
 
-        return bool(request.user and request.user.is_staff)
+        return is_staff_user(request.user)
@@ -0,0 +1,168 @@
+"""
+Профилирование запроса по требованию сотрудника: ?profile=<режим> или заголовок X-Profile: <режим>.
+pstats - файл cProfile в ответе, collapsed - стеки семплирующего профайлера (формат flamegraph.pl),
+store - запрос отвечает как обычно, профиль сохраняется в RequestProfile и открывается в админке
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from example.models import RequestProfile
+from example.permissions import is_staff_user
+
+MODES = "pstats", "collapsed", "store"
+SAMPLE_INTERVAL = getattr(settings, "PROFILER_SAMPLE_INTERVAL", 0.001)  # секунды между снимками стека
+MAX_STORED = getattr(settings, "PROFILER_MAX_STORED", 100)  # старые профили удаляются
+SUMMARY_LINES = 40
+
+# интервал переключения GIL общий для процесса: исходный восстанавливает последний активный семплер
+_switch_lock = threading.Lock()
+_switch_users = 0
+_switch_interval = None
+
+
+def requested_mode(request) -> str | None:
+    mode = request.GET.get("profile") or request.META.get("HTTP_X_PROFILE")
+    return mode if mode in MODES else None
+
+
+def staff_user(request):
+    """
+    Сотрудник по тому же правилу, что в IsAdminOrReadOnly: пользователь сессии
+    или аутентификация DRF (Basic, JWT); None для всех остальных
+    """
+    user = getattr(request, "user", None)
+    if is_staff_user(user):
+        return user
+    authenticators = [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    try:
+        user = Request(request, authenticators=authenticators).user
+    except APIException:
+        return None
+    return user if is_staff_user(user) else None
+
+
+class StackSampler:
+    """
+    Семплирующий профайлер: поток снимает стек потока запроса через sys._current_frames()
+    """
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_filename}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        # иначе поток семплера получает GIL раз в 5 мс (интервал переключения по умолчанию)
+        global _switch_users, _switch_interval
+        with _switch_lock:
+            if not _switch_users:
+                _switch_interval = sys.getswitchinterval()
+            _switch_users += 1
+            sys.setswitchinterval(min(sys.getswitchinterval(), self.interval))
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        global _switch_users
+        self.stopped.set()
+        self.thread.join()
+        with _switch_lock:
+            _switch_users -= 1
+            if not _switch_users:
+                sys.setswitchinterval(_switch_interval)
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def summary(profiler: cProfile.Profile) -> str:
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(SUMMARY_LINES)
+    return stream.getvalue()
+
+
+def attachment(content, content_type: str, extension: str) -> HttpResponse:
+    response = HttpResponse(content, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="profile-{int(time.time())}.{extension}"'
+    return response
+
+
+def profile_request(request, get_response, mode: str, user):
+    started = time.perf_counter()
+    if mode == "collapsed":
+        with StackSampler(threading.get_ident()) as sampler:
+            get_response(request)
+        return attachment(sampler.collapsed(), "text/plain; charset=utf-8", "collapsed.txt")
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        response = get_response(request)
+    finally:
+        profiler.disable()
+    return finish(request, response, profiler, mode, user, started)
+
+
+async def aprofile_request(request, get_response, mode: str, user):
+    """
+    profile_request() для ASGI: профилируется поток event loop. SQL выполняется в потоке
+    sync_to_async и виден только как ожидание; в профиль попадают и соседние запросы воркера
+    """
+    started = time.perf_counter()
+    if mode == "collapsed":
+        with StackSampler(threading.get_ident()) as sampler:
+            await get_response(request)
+        return attachment(sampler.collapsed(), "text/plain; charset=utf-8", "collapsed.txt")
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        response = await get_response(request)
+    finally:
+        profiler.disable()
+    return await sync_to_async(finish)(request, response, profiler, mode, user, started)
+
+
+def finish(request, response, profiler: cProfile.Profile, mode: str, user, started: float):
+    profiler.create_stats()
+    if mode == "pstats":
+        return attachment(marshal.dumps(profiler.stats), "application/octet-stream", "prof")
+
+    record = RequestProfile.objects.create(
+        user=user,
+        method=request.method,
+        path=request.get_full_path(),
+        status=response.status_code,
+        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+        stats=marshal.dumps(profiler.stats),
+        summary=summary(profiler),
+    )
+    stale = RequestProfile.objects.order_by("-pk").values_list("pk", flat=True)[MAX_STORED:]
+    RequestProfile.objects.filter(pk__in=list(stale)).delete()
+    response["X-Profile-Id"] = str(record.pk)
+    return response
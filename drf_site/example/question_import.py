@@ -0,0 +1,248 @@
+"""
+Потоковый импорт банка вопросов из CSV или JSONL: строки читаются по одной, вопросы и ответы
+вставляются пачками bulk_create, каждая пачка - своя транзакция. Ошибки строк попадают в отчет
+и не прерывают импорт, память не зависит от размера файла.
+
+CSV - вопрос на строку, номера правильных ответов в correct через ";":
+    subject,question,answer_1,answer_2,answer_3,correct
+JSONL - объект на строку:
+    {"subject": "...", "question": "...", "answers": [{"text": "...", "is_correct": true}, ...]}
+"""
+import csv
+import json
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from example import response_cache, sampling
+from example.models import Answer, Question, Subject
+
+FORMATS = "csv", "jsonl"
+BATCH_SIZE = getattr(settings, "QUESTION_IMPORT_BATCH_SIZE", 1000)  # вопросов на транзакцию
+MAX_REPORTED_ERRORS = 100  # остальные ошибки только считаются
+SUBJECT_MAX_LENGTH = Subject._meta.get_field("title").max_length
+
+
+class ImportFormatError(ValueError):
+    """
+    Файл нельзя разобрать целиком (нет обязательных колонок, неизвестный формат)
+    """
+
+
+class RowError(ValueError):
+    """
+    Ошибка одной строки, импорт продолжается
+    """
+
+
+@dataclass
+class Record:
+    line: int
+    subject: str
+    question: str
+    answers: list[tuple[str, bool]]
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    questions: int = 0
+    answers: int = 0
+    subjects_created: int = 0
+    error_count: int = 0
+    errors: list[dict] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+
+    def error(self, line: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> dict:
+        seconds = time.perf_counter() - self.started
+        return {
+            "rows": self.rows,
+            "questions": self.questions,
+            "answers": self.answers,
+            "subjects_created": self.subjects_created,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(self.rows / seconds, 1) if seconds else None,
+        }
+
+
+def detect_format(name: str) -> str:
+    if name.lower().endswith(".csv"):
+        return "csv"
+    if name.lower().endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ImportFormatError(f"Неизвестный формат файла {name}, укажите csv или jsonl")
+
+
+def make_record(line: int, subject, question, answers: list[tuple[str, bool]]) -> Record:
+    if not isinstance(subject or "", str) or not isinstance(question or "", str):
+        raise RowError("subject и question должны быть строками")
+    subject = (subject or "").strip()
+    question = (question or "").strip()
+    if not subject:
+        raise RowError("Не указан предмет")
+    if len(subject) > SUBJECT_MAX_LENGTH:
+        raise RowError(f"Название предмета длиннее {SUBJECT_MAX_LENGTH} символов")
+    if not question:
+        raise RowError("Нет текста вопроса")
+    if not answers:
+        raise RowError("Нет вариантов ответа")
+    if not any(is_correct for _, is_correct in answers):
+        raise RowError("Нет правильного ответа")
+    return Record(line, subject, question, answers)
+
+
+def csv_records(lines: Iterable[str]) -> Iterator[tuple[int, Record | RowError]]:
+    reader = csv.DictReader(lines)
+    columns = reader.fieldnames or []
+    if not {"subject", "question"} <= set(columns):
+        raise ImportFormatError("В CSV нужны колонки subject, question, answer_<n> и correct")
+    answer_columns = []
+    for name in columns:
+        number = name.removeprefix("answer_")
+        if name.startswith("answer_") and number.isdigit():
+            answer_columns.append((name, int(number)))
+
+    for row in reader:
+        line = reader.line_num
+        try:
+            correct = {int(number) for number in (row.get("correct") or "").split(";") if number.strip()}
+            answers = [(row[name].strip(), number in correct) for name, number in answer_columns if (row[name] or "").strip()]
+            yield line, make_record(line, row["subject"], row["question"], answers)
+        except RowError as exc:
+            yield line, exc
+        except ValueError:
+            yield line, RowError("correct - номера ответов через ;")
+
+
+def jsonl_records(lines: Iterable[str]) -> Iterator[tuple[int, Record | RowError]]:
+    for line, text in enumerate(lines, start=1):
+        if not text.strip():
+            continue
+        try:
+            item = json.loads(text)
+            if not isinstance(item, dict) or not isinstance(item.get("answers", []), list):
+                raise RowError("Ожидается объект с subject, question и списком answers")
+            answers = [
+                (answer.get("text"), answer.get("is_correct") is True)
+                for answer in item.get("answers", []) if isinstance(answer, dict)
+            ]
+            if any(not isinstance(answer_text, str) for answer_text, _ in answers):
+                raise RowError("Текст ответа должен быть строкой")
+            answers = [(answer_text.strip(), is_correct) for answer_text, is_correct in answers]
+            if any(not answer_text for answer_text, _ in answers):
+                raise RowError("Пустой текст ответа")
+            yield line, make_record(line, item.get("subject"), item.get("question"), answers)
+        except RowError as exc:
+            yield line, exc
+        except json.JSONDecodeError as exc:
+            yield line, RowError(f"Некорректный JSON: {exc.msg}")
+        except (AttributeError, TypeError) as exc:  # неожиданная структура строки не прерывает импорт
+            yield line, RowError(f"Некорректная строка: {exc}")
+
+
+def check_encoding(lines: Iterable[bytes], encoding: str = "utf-8-sig") -> None:
+    """
+    Проход по файлу до вставки: ошибка кодировки в середине файла иначе прервала бы импорт
+    после уже закоммиченных пачек
+    """
+    for line, raw in enumerate(lines, start=1):
+        try:
+            raw.decode(encoding)
+        except UnicodeDecodeError:
+            raise ImportFormatError(f"Строка {line}: файл должен быть в кодировке UTF-8")
+
+
+def read_records(lines: Iterable[str], fmt: str) -> Iterator[tuple[int, Record | RowError]]:
+    if fmt == "csv":
+        return csv_records(lines)
+    if fmt == "jsonl":
+        return jsonl_records(lines)
+    raise ImportFormatError(f"Неизвестный формат {fmt}, поддерживаются {', '.join(FORMATS)}")
+
+
+def insert(batch: list[Record], subjects: dict[str, int]) -> tuple[int, int, dict[str, int]]:
+    """
+    Вставка пачки в транзакции вызывающего: новые предметы создаются тут же и откатываются вместе
+    с вопросами. Возвращает число вопросов, ответов и созданные предметы (название -> id)
+    """
+    created = {}
+    for record in batch:
+        if record.subject not in subjects and record.subject not in created:
+            created[record.subject] = Subject.objects.create(title=record.subject).pk
+    questions = Question.objects.bulk_create(
+        Question(subject_id=subjects.get(record.subject) or created[record.subject], text=record.question)
+        for record in batch
+    )
+    answers = Answer.objects.bulk_create(
+        Answer(question_id=question.pk, text=text, is_correct=is_correct)
+        for question, record in zip(questions, batch) for text, is_correct in record.answers
+    )
+    return len(questions), len(answers), created
+
+
+def write_batch(batch: list[Record], subjects: dict[str, int], report: ImportReport) -> None:
+    """
+    id созданных предметов попадают в subjects только после коммита - после отката
+    в словаре не остается несуществующих предметов
+    """
+    try:
+        with transaction.atomic():
+            inserted = [insert(batch, subjects)]
+    except DatabaseError:
+        # пачка не вставилась целиком - по одной строке, чтобы пропустить только плохие
+        inserted = []
+        for record in batch:
+            try:
+                with transaction.atomic():
+                    inserted.append(insert([record], subjects))
+            except DatabaseError as exc:
+                report.error(record.line, str(exc))
+                continue
+            subjects.update(inserted[-1][2])
+    for questions, answers, created in inserted:
+        subjects.update(created)
+        report.questions += questions
+        report.answers += answers
+        report.subjects_created += len(created)
+
+
+def import_questions(records: Iterable[tuple[int, Record | RowError]], batch_size: int = BATCH_SIZE,
+                     progress: Callable[[dict], None] | None = None) -> dict:
+    """
+    Вставляет вопросы и ответы, новые предметы создаются по названию; возвращает отчет
+    """
+    report = ImportReport()
+    subjects = {}
+    for pk, title in Subject.objects.order_by("-pk").values_list("pk", "title").iterator():
+        subjects[title] = pk  # при одинаковых названиях - самый ранний предмет
+
+    batch = []
+    for line, record in records:
+        report.rows += 1
+        if isinstance(record, RowError):
+            report.error(line, str(record))
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            write_batch(batch, subjects, report)
+            batch = []
+            if progress is not None:
+                progress(report.as_dict())
+    if batch:
+        write_batch(batch, subjects, report)
+
+    # bulk_create не отправляет post_save - сбрасываем то же, что сбрасывают сигналы Question/Answer
+    if report.questions:
+        sampling.invalidate_questions()
+        response_cache.invalidate_model(Question)
+    return report.as_dict()
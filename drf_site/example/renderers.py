@@ -0,0 +1,46 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON: одна запись на строку
+    """
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+    encoder_class = JSONEncoder
+
+    def dumps(self, item) -> bytes:
+        return json.dumps(item, cls=self.encoder_class, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, dict) and isinstance(data.get("data"), list):
+            data = data["data"]
+        items = data if isinstance(data, list) else [data]
+        return b"".join(self.dumps(item) for item in items)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    text/csv для потоковой выгрузки (example/export.py): данные идут в StreamingHttpResponse мимо рендера,
+    через render() проходят только ошибки - строками "поле,сообщение"
+    """
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for key, value in (data.items() if isinstance(data, dict) else [("detail", data)]):
+            writer.writerow([key, "; ".join(map(str, value)) if isinstance(value, list) else value])
+        return buffer.getvalue().encode(self.charset)
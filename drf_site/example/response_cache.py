@@ -0,0 +1,150 @@
+"""
+Кеширование готовых JSON ответов каталога (предметы, вопросы) с ETag/Last-Modified.
+Ключ строится из URL и поколений моделей, поэтому 304 и ответ из кеша не требуют запросов к базе
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Model
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from example.generations import bump_generation, get_generation
+
+KEY_PREFIX = "example:response:"
+TIMEOUT = 60 * 60 * 24
+
+
+def model_generation(model: type[Model]) -> str:
+    """
+    Меняется при любом изменении строк модели - от него зависят списки
+    """
+    return f"model:{model._meta.label_lower}"
+
+
+def model_epoch(model: type[Model]) -> str:
+    """
+    Меняется только при массовых изменениях в обход save() - от него зависят все детальные ответы
+    """
+    return f"model:{model._meta.label_lower}:epoch"
+
+
+def object_generation(model: type[Model], pk) -> str:
+    return f"model:{model._meta.label_lower}:{pk}"
+
+
+def invalidate_objects(model: type[Model], pks) -> None:
+    bump_generation(model_generation(model), *[object_generation(model, pk) for pk in pks])
+
+
+def invalidate_model(model: type[Model]) -> None:
+    bump_generation(model_generation(model), model_epoch(model))
+
+
+def build_key(request, generations: list[str]) -> str:
+    params = sorted(request.query_params.lists())
+    parts = [request.path, repr(params)] + [f"{name}={get_generation(name)}" for name in generations]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def not_modified(request, etag: str, last_modified: float | None) -> bool:
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+    if_modified_since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+    return bool(last_modified and if_modified_since and int(last_modified) <= if_modified_since)
+
+
+def lookup(view, request, kwargs, detail: bool) -> tuple[str, str, HttpResponse | None]:
+    """
+    Ключ кеша, ETag и готовый ответ (304 или ответ из кеша); None - нужно выполнить view
+    """
+    model = view.queryset.model
+    if detail:
+        pk = kwargs.get(view.lookup_url_kwarg or view.lookup_field)
+        try:
+            pk = model._meta.pk.to_python(pk)  # /subject/01/ и /subject/1/ - одно поколение объекта
+        except ValidationError:
+            pass  # view ответит 404, ответ не кешируется
+        generations = [model_epoch(model), object_generation(model, pk)]
+    else:
+        generations = [model_generation(model)]
+    digest = build_key(request, generations)
+    key, etag = KEY_PREFIX + digest, quote_etag(digest)
+
+    if request.META.get("HTTP_IF_NONE_MATCH") and not_modified(request, etag, None):
+        return key, etag, not_modified_response(etag)
+    entry = cache.get(key)
+    if entry is None:
+        return key, etag, None
+    if not_modified(request, etag, entry["last_modified"]):
+        return key, etag, not_modified_response(etag)
+    return key, etag, entry_response(entry, etag)
+
+
+def not_modified_response(etag: str) -> HttpResponse:
+    response = HttpResponseNotModified()
+    response["ETag"] = etag
+    return response
+
+
+def make_entry(response) -> dict:
+    response.render()
+    return {
+        "content": response.content,
+        "content_type": response["Content-Type"],
+        "last_modified": time.time(),
+    }
+
+
+def entry_response(entry: dict, etag: str) -> HttpResponse:
+    response = HttpResponse(entry["content"], content_type=entry["content_type"])
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(entry["last_modified"])
+    return response
+
+
+def cache_response(detail: bool = False):
+    """
+    Декоратор GET метода view (обычного или async). detail=True - ответ зависит только от объекта из URL
+    """
+    def decorator(method):
+        if iscoroutinefunction(method):
+            @wraps(method)
+            async def async_wrapper(self, request, *args, **kwargs):
+                if request.accepted_renderer.format != "json":
+                    return await method(self, request, *args, **kwargs)
+
+                # у бэкендов кеша Django aget() - тот же sync_to_async, поэтому поколения
+                # и запись читаются за один переход в поток, а не за один на каждый ключ
+                key, etag, response = await sync_to_async(lookup)(self, request, kwargs, detail)
+                if response is not None:
+                    return response
+                response = self.finalize_response(request, await method(self, request, *args, **kwargs), *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                entry = make_entry(response)
+                await cache.aset(key, entry, TIMEOUT)
+                return entry_response(entry, etag)
+            return async_wrapper
+
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.accepted_renderer.format != "json":  # browsable API зависит от пользователя
+                return method(self, request, *args, **kwargs)
+
+            key, etag, response = lookup(self, request, kwargs, detail)
+            if response is not None:
+                return response
+            response = self.finalize_response(request, method(self, request, *args, **kwargs), *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = make_entry(response)
+            cache.set(key, entry, TIMEOUT)
+            return entry_response(entry, etag)
+        return wrapper
+    return decorator
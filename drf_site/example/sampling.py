@@ -0,0 +1,104 @@
+"""
+Случайная выборка предметов и вопросов без ORDER BY RANDOM(): id хранятся в памяти процесса
+и сбрасываются по счетчикам поколений в кеше Django
+"""
+import random
+import threading
+from array import array
+from bisect import bisect_left
+
+from asgiref.sync import sync_to_async
+from django.db.models import QuerySet
+
+from example.generations import bump_generation, get_generation
+from example.models import Question, Subject
+
+SUBJECTS = "sampling:subjects"
+QUESTIONS = "sampling:questions"
+
+
+class IdIndex:
+    """
+    id предметов и id вопросов по предметам, вопросы предмета загружаются при первом обращении
+    """
+    def __init__(self, subjects_generation: int, questions_generation: int):
+        self.subjects_generation = subjects_generation
+        self.questions_generation = questions_generation
+        self.subject_ids = array("q", Subject.objects.order_by("pk").values_list("pk", flat=True))
+        self.questions: dict[int, array] = {}
+        self.lock = threading.Lock()
+
+    def is_current(self, subjects_generation: int, questions_generation: int) -> bool:
+        return (self.subjects_generation, self.questions_generation) == (subjects_generation, questions_generation)
+
+    def has_subject(self, subject_id: int) -> bool:
+        position = bisect_left(self.subject_ids, subject_id)
+        return position < len(self.subject_ids) and self.subject_ids[position] == subject_id
+
+    def subject_questions(self, subject_id: int) -> array:
+        ids = self.questions.get(subject_id)
+        if ids is None:
+            with self.lock:
+                ids = self.questions.get(subject_id)
+                if ids is None:
+                    ids = array("q", Question.objects.filter(subject_id=subject_id).values_list("pk", flat=True))
+                    self.questions[subject_id] = ids
+        return ids
+
+
+_index: IdIndex | None = None
+_lock = threading.Lock()
+
+
+def get_index() -> IdIndex:
+    global _index
+    generations = get_generation(SUBJECTS), get_generation(QUESTIONS)
+    index = _index
+    if index is not None and index.is_current(*generations):
+        return index
+    with _lock:
+        if _index is None or not _index.is_current(*generations):
+            _index = IdIndex(*generations)
+        return _index
+
+
+def invalidate_subjects():
+    bump_generation(SUBJECTS, QUESTIONS)
+
+
+def invalidate_questions():
+    bump_generation(QUESTIONS)
+
+
+def random_subject_id() -> int | None:
+    subject_ids = get_index().subject_ids
+    return random.choice(subject_ids) if subject_ids else None
+
+
+def sample_question_ids(subject_id: int, count: int) -> list[int]:
+    ids = get_index().subject_questions(subject_id)
+    return random.sample(ids, min(count, len(ids)))
+
+
+def sample_questions(subject_id: int, count: int, queryset: QuerySet | None = None) -> list[Question]:
+    """
+    count случайных вопросов предмета вместе с ответами: запрос за вопросами и запрос за ответами
+    """
+    ids = sample_question_ids(subject_id, count)
+    if not ids:
+        return []
+    queryset = Question.objects.prefetch_related("answer_set") if queryset is None else queryset
+    by_id = {question.pk: question for question in queryset.filter(pk__in=ids)}
+    return [by_id[pk] for pk in ids if pk in by_id]
+
+
+async def asample_questions(subject_id: int, count: int, queryset: QuerySet | None = None) -> list[Question]:
+    """
+    sample_questions() для async view: id из индекса в памяти, вопросы и ответы через async ORM
+    """
+    ids = await sync_to_async(sample_question_ids)(subject_id, count)  # индекс может дочитывать id из базы
+    if not ids:
+        return []
+    queryset = Question.objects.prefetch_related("answer_set") if queryset is None else queryset
+    by_id = {question.pk: question async for question in queryset.filter(pk__in=ids)}
+    return [by_id[pk] for pk in ids if pk in by_id]
@@ -0,0 +1,112 @@
+"""
+Полнотекстовый поиск по Question.text и Answer.text через SQLite FTS5.
+Индексы - external content таблицы, их синхронизируют триггеры (см. миграцию 0005_search_index),
+поэтому в индекс попадают и записи в обход ORM. На других базах используется icontains
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+QUESTION_FTS = "example_question_fts"
+ANSWER_FTS = "example_answer_fts"
+TABLES = {"example_question": QUESTION_FTS, "example_answer": ANSWER_FTS}
+ANSWER_WEIGHT = 0.5  # совпадение в тексте ответа ранжируется ниже совпадения в вопросе
+MAX_TOKENS = 16
+
+_available = None
+
+
+def is_available() -> bool:
+    global _available
+    if connection.vendor != "sqlite":
+        return False
+    if not _available:  # отрицательный результат не запоминаем - таблицы могут появиться после migrate
+        _available = set(TABLES.values()) <= set(connection.introspection.table_names(include_views=True))
+    return _available
+
+
+def build_match(query: str) -> str | None:
+    """
+    Пользовательский ввод -> выражение MATCH: все слова как префиксы через AND, без синтаксиса FTS5
+    """
+    tokens = re.findall(r"\w+", query.lower())[:MAX_TOKENS]
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def matching_ids_sql(fts: str) -> str:
+    return f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s"
+
+
+def question_filter(query: str) -> Q:
+    """
+    Вопросы, в тексте которых есть все слова запроса
+    """
+    match = build_match(query)
+    if match is None:
+        return Q()
+    return Q(pk__in=RawSQL(matching_ids_sql(QUESTION_FTS), [match]))
+
+
+def answer_filter(query: str) -> Q:
+    match = build_match(query)
+    if match is None:
+        return Q()
+    return Q(pk__in=RawSQL(matching_ids_sql(ANSWER_FTS), [match]))
+
+
+def search_questions(query: str, limit: int = 20) -> list[tuple[int, float]]:
+    """
+    (question_id, rank) по убыванию релевантности: совпадения в вопросе и в его ответах
+    """
+    match = build_match(query)
+    if match is None:
+        return []
+    sql = f"""
+        SELECT question_id, MIN(rank) AS best FROM (
+            SELECT rowid AS question_id, bm25({QUESTION_FTS}) AS rank
+            FROM {QUESTION_FTS} WHERE {QUESTION_FTS} MATCH %s
+            UNION ALL
+            SELECT answer.question_id, bm25({ANSWER_FTS}) * {ANSWER_WEIGHT} AS rank
+            FROM {ANSWER_FTS} JOIN example_answer AS answer ON answer.id = {ANSWER_FTS}.rowid
+            WHERE {ANSWER_FTS} MATCH %s
+        )
+        GROUP BY question_id
+        ORDER BY best, question_id
+        LIMIT %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, match, limit])
+        return [(question_id, -rank) for question_id, rank in cursor.fetchall()]  # bm25 - чем меньше, тем лучше
+
+
+def create_statements(table: str, fts: str) -> list[str]:
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(text, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, text) VALUES ('delete', old.id, old.text); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF text ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, text) VALUES ('delete', old.id, old.text); "
+        f"INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text); END",
+    ]
+
+
+def rebuild() -> None:
+    """
+    Создает недостающие таблицы и триггеры (ALTER таблицы в SQLite пересоздает ее без триггеров)
+    и перестраивает индексы из исходных таблиц
+    """
+    with connection.cursor() as cursor:
+        for table, fts in TABLES.items():
+            for statement in create_statements(table, fts):
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('optimize')")
+    global _available
+    _available = True
@@ -1,8 +1,17 @@
 import io
+from dataclasses import dataclass, field
+from functools import lru_cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import Model as DjangoModel, Prefetch, QuerySet
 from rest_framework import serializers
 from rest_framework.parsers import JSONParser
 from rest_framework.renderers import JSONRenderer
-from example.models import Subject, Student, Testing, Attempt, Question
+from example import grading
+from example.models import (
+    Subject, Student, Testing, Attempt, Question, Answer,
+    StudentSubjectStats, QuestionStats
+)
 
 
 class SubjectSerializer(serializers.ModelSerializer):
@@ -29,10 +38,64 @@ class StudentSerializer(serializers.Serializer):
         return instance
 
 
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField, который берет объект из заранее загруженного словаря в context["prefetched"]
+    """
+    def to_internal_value(self, data):
+        prefetched = self.context.get("prefetched", {}).get(self.queryset.model)
+        if prefetched is None:
+            return super().to_internal_value(data)
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            return prefetched[int(data)]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
+class TestingListSerializer(serializers.ListSerializer):
+    """
+    Пакетная отправка результатов: один IN запрос на каждую FK модель и один bulk_create
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.context.setdefault("prefetched", {}).update(self.prefetch_related_objects(data))
+        return super().to_internal_value(data)
+
+    def prefetch_related_objects(self, data: list) -> dict:
+        prefetched = {}
+        for name, serializer_field in self.child.fields.items():
+            if not isinstance(serializer_field, PrefetchedPrimaryKeyRelatedField):
+                continue
+            ids = set()
+            for item in data:
+                try:
+                    ids.add(int(item[name]))
+                except (TypeError, ValueError, KeyError, IndexError):
+                    continue  # ошибку вернет валидация конкретного элемента
+            prefetched[serializer_field.queryset.model] = serializer_field.get_queryset().in_bulk(ids)
+        return prefetched
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        with transaction.atomic():
+            instances = model.objects.bulk_create([model(**attrs) for attrs in validated_data])
+            grading.grade_attempts({instance.attempt_id for instance in instances})  # bulk_create не шлет сигналы
+        return instances
+
+
 class TestingSerializer(serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
     class Meta:
         model = Testing
         fields = "__all__"
+        list_serializer_class = TestingListSerializer
 
 
 class AttemptSerializer(serializers.ModelSerializer):
@@ -50,6 +113,260 @@ class QuestionSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class QuestionStatsSerializer(serializers.ModelSerializer):
+    distractors = serializers.SerializerMethodField()
+
+    class Meta:
+        model = QuestionStats
+        fields = "responses", "difficulty", "discrimination", "distractors", "updated_at"
+
+    def get_distractors(self, stats: QuestionStats) -> list:
+        """
+        Доля выбора каждого варианта ответа
+        """
+        return [
+            {"answer": int(answer_id), "count": count, "share": round(count / stats.responses, 4)}
+            for answer_id, count in sorted(stats.answer_counts.items(), key=lambda item: int(item[0]))
+        ] if stats.responses else []
+
+
+class QuestionDetailSerializer(QuestionSerializer):
+    stats = QuestionStatsSerializer(source="item_stats", read_only=True)
+
+    class Meta(QuestionSerializer.Meta):
+        pass
+
+
+class StudentSubjectStatsSerializer(serializers.ModelSerializer):
+    average_result = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = StudentSubjectStats
+        fields = "student", "subject", "attempt_count", "average_result", "best_result", "last_attempt_date"
+
+
+class QuizAnswerSerializer(serializers.ModelSerializer):
+    """
+    Вариант ответа в квизе - без is_correct
+    """
+    class Meta:
+        model = Answer
+        fields = "id", "text"
+
+
+class QuizQuestionSerializer(serializers.ModelSerializer):
+    answers = QuizAnswerSerializer(source="answer_set", many=True, read_only=True)
+
+    class Meta:
+        model = Question
+        fields = "id", "text", "answers"
+
+
+class QuestionAnswerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Answer
+        fields = "id", "text", "is_correct"
+
+
+class QuestionWithAnswersSerializer(serializers.ModelSerializer):
+    """
+    Вопрос вместе с вариантами ответов. answer_set загружается одним Prefetch через optimize_queryset()
+    """
+    answers = QuestionAnswerSerializer(source="answer_set", many=True, read_only=True)
+
+    class Meta:
+        model = Question
+        fields = "id", "text", "subject", "answers"
+
+
+class QuestionBatchSerializer(QuizQuestionSerializer):
+    """
+    Вопрос для клиента квиза в пакетном запросе: с названием предмета, ответы без is_correct
+    """
+    subject_title = serializers.ReadOnlyField(source="subject.title")
+
+    class Meta(QuizQuestionSerializer.Meta):
+        fields = "id", "text", "subject", "subject_title", "answers"
+
+
+#####################################
+### eager loading for serializers ###
+#####################################
+
+
+@dataclass
+class QueryPlan:
+    """
+    План загрузки queryset'а для сериализатора: select_related, prefetch_related и only()
+    """
+    select_related: set = field(default_factory=set)
+    prefetch: list = field(default_factory=list)
+    only: set | None = field(default_factory=set)  # None - ограничить колонки нельзя
+
+    def add_only(self, name: str) -> None:
+        if self.only is not None:
+            self.only.add(name)
+
+    def apply(self, queryset: QuerySet) -> QuerySet:
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*self.prefetch)
+        if self.only:
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+
+def _relation(model: type[DjangoModel], name: str):
+    """
+    Поле модели по имени атрибута, в том числе обратная связь по accessor (answer_set)
+    """
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        pass
+    for rel in model._meta.related_objects:
+        if rel.get_accessor_name() == name:
+            return rel
+    return None
+
+
+def _plan_source(plan: QueryPlan, model: type[DjangoModel], source_attrs: list, prefix: str = "") -> None:
+    """
+    Разбирает dotted source (например "question.text") и добавляет нужные join'ы и колонки
+    """
+    current, path = model, prefix
+    for attr in source_attrs[:-1]:
+        rel = _relation(current, attr)
+        if rel is None or not rel.is_relation or rel.many_to_many or rel.one_to_many:
+            plan.only = None  # свойство или обратная связь - не угадываем колонки
+            return
+        path = f"{path}{attr}"
+        plan.select_related.add(path)
+        plan.add_only(path)
+        path += "__"
+        current = rel.related_model
+
+    last = _relation(current, source_attrs[-1])
+    columns = getattr(current, "property_columns", {}).get(source_attrs[-1])
+    if last is None and columns is not None:  # свойство модели с объявленными колонками
+        for column in columns:
+            plan.add_only(f"{path}{column}")
+        return
+    if last is None or last.one_to_many or last.many_to_many:
+        plan.only = None
+        return
+    plan.add_only(f"{path}{last.name}")
+
+
+def build_query_plan(fields, model: type[DjangoModel], prefix: str = "", plan: QueryPlan | None = None) -> QueryPlan:
+    """
+    Строит план загрузки по полям сериализатора: dotted source и вложенные сериализаторы
+    """
+    plan = plan or QueryPlan()
+    for serializer_field in fields.values():
+        if serializer_field.write_only:
+            continue
+        source = serializer_field.source
+        if source == "*" or isinstance(serializer_field, serializers.SerializerMethodField):
+            plan.only = None
+            continue
+
+        attrs = source.split(".")
+        nested = getattr(serializer_field, "child", serializer_field)
+        if not isinstance(nested, serializers.BaseSerializer):
+            _plan_source(plan, model, attrs, prefix)
+            continue
+
+        rel = _relation(model, attrs[0]) if len(attrs) == 1 else None
+        if rel is None or not rel.is_relation:
+            plan.only = None
+            continue
+        if rel.many_to_one or rel.one_to_one and not rel.auto_created:  # прямой FK - join
+            path = f"{prefix}{rel.name}"
+            plan.select_related.add(path)
+            plan.add_only(path)
+            build_query_plan(nested.fields, rel.related_model, f"{path}__", plan)
+        else:  # обратный FK / MTM - отдельный запрос на prefetch
+            nested_plan = build_query_plan(nested.fields, rel.related_model)
+            if rel.one_to_many or rel.one_to_one:
+                nested_plan.add_only(rel.field.name)  # без FK на родителя Django сделает N+1
+            nested_queryset = nested_plan.apply(rel.related_model._default_manager.all())
+            plan.prefetch.append(Prefetch(f"{prefix}{rel.get_accessor_name()}", queryset=nested_queryset))
+            plan.add_only(f"{prefix}{model._meta.pk.name}")
+    return plan
+
+
+@lru_cache(maxsize=None)
+def get_query_plan(serializer_class: type[serializers.BaseSerializer], model: type[DjangoModel]) -> QueryPlan:
+    """
+    План считается один раз на класс сериализатора
+    """
+    return build_query_plan(serializer_class().fields, model)
+
+
+def optimize_queryset(queryset: QuerySet, serializer_class: type[serializers.BaseSerializer]) -> QuerySet:
+    """
+    Применяет к queryset'у select_related/prefetch_related/only() по полям сериализатора
+    """
+    return get_query_plan(serializer_class, queryset.model).apply(queryset)
+
+
+########################
+### sparse fieldsets ###
+########################
+
+
+FIELDSET_CACHE_SIZE = 256  # классов на все сериализаторы, имена полей проверяются до кеша
+
+
+def requested_fields(query_params, serializer_class: type[serializers.BaseSerializer]) -> tuple | None:
+    """
+    Поля из ?fields=a,b и ?exclude=c в порядке полей сериализатора; None - параметров нет
+    """
+    only = [name for name in query_params.get("fields", "").split(",") if name.strip()]
+    exclude = [name for name in query_params.get("exclude", "").split(",") if name.strip()]
+    if not only and not exclude:
+        return None
+    available = [name for name, serializer_field in serializer_class().fields.items() if not serializer_field.write_only]
+    errors = {}
+    for param, names in (("fields", only), ("exclude", exclude)):
+        unknown = [name.strip() for name in names if name.strip() not in available]
+        if unknown:
+            errors[param] = f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}"
+    if errors:
+        raise serializers.ValidationError(errors)
+    only, exclude = {name.strip() for name in only}, {name.strip() for name in exclude}
+    selected = tuple(name for name in available if (not only or name in only) and name not in exclude)
+    if not selected:
+        raise serializers.ValidationError({"fields": "No fields left"})
+    return selected
+
+
+@lru_cache(maxsize=FIELDSET_CACHE_SIZE)
+def sparse_serializer(serializer_class: type[serializers.BaseSerializer], names: tuple) -> type[serializers.BaseSerializer]:
+    """
+    Подкласс сериализатора только с полями names. Отдельный класс на набор полей, поэтому
+    get_query_plan() (select_related, only()) и compile_serializer() (колонки values_list())
+    кешируются и сужают SQL так же, как JSON
+    """
+    def get_fields(self):
+        fields = super(serializer, self).get_fields()
+        return {name: fields[name] for name in names}
+
+    serializer = type(serializer_class.__name__, (serializer_class,), {
+        "get_fields": get_fields,
+        "__module__": serializer_class.__module__,
+        "__qualname__": f"{serializer_class.__qualname__}[{','.join(names)}]",
+    })
+    return serializer
+
+
+def sparse_serializer_class(query_params, serializer_class: type[serializers.BaseSerializer]) -> type[serializers.BaseSerializer]:
+    names = requested_fields(query_params, serializer_class)
+    return serializer_class if names is None else sparse_serializer(serializer_class, names)
+
+
 ##########################################
 ### example work with Serializer class ###
 ##########################################
@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from example import authentication, database, grading, item_stats, response_cache, sampling, stats
+from example.models import Answer, Attempt, Question, Subject, Testing
+
+
+@receiver(connection_created)
+def configure_database_connection(sender, connection, **kwargs):
+    """
+    PRAGMA из SQLITE_PRAGMAS на каждом новом соединении
+    """
+    database.configure_connection(connection)
+
+
+@receiver(post_save, sender=Testing)
+def regrade_testing_attempt(sender, instance: Testing, **kwargs):
+    """
+    Пересчет результата попытки при изменении ее ответов. Удаление пересчитывает
+    RegradeOnDeleteQuerySet: receiver post_delete отключил бы быстрое каскадное удаление Testing
+    """
+    grading.grade_attempt(instance.attempt_id)
+
+
+@receiver(post_save, sender=Answer)
+def regrade_answer_attempts(sender, instance: Answer, created: bool, raw: bool = False, **kwargs):
+    """
+    Смена Answer.is_correct меняет результат всех попыток, где этот ответ выбирался
+    """
+    if not created and not raw:
+        grading.grade_for_answers([instance.pk])
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_subject_ids(sender, **kwargs):
+    sampling.invalidate_subjects()
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_ids(sender, **kwargs):
+    sampling.invalidate_questions()
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_cached_responses(sender, instance, **kwargs):
+    response_cache.invalidate_objects(sender, [instance.pk])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Смена пароля или деактивация сбрасывает кеш аутентификации во всех воркерах
+    """
+    authentication.invalidate_user(instance.pk)
+
+
+@receiver(pre_save, sender=Attempt)
+def remember_attempt_group(sender, instance: Attempt, raw: bool = False, **kwargs):
+    """
+    Запоминает прежнюю пару (студент, предмет), если попытку переносят
+    """
+    instance._stats_previous = None
+    if instance.pk is not None and not raw:
+        instance._stats_previous = Attempt.objects.filter(pk=instance.pk).values_list("student_id", "subject_id").first()
+
+
+@receiver(post_save, sender=Attempt)
+def update_attempt_stats(sender, instance: Attempt, created: bool, raw: bool = False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_stats_previous", None)
+    if created or previous is None:
+        stats.add_attempt(instance)
+    else:
+        stats.refresh_groups({previous, (instance.student_id, instance.subject_id)})
+        item_stats.mark_stale(Testing.objects.filter(attempt=instance))  # результат мог измениться
+
+
+@receiver(pre_delete, sender=Attempt)
+def mark_attempt_item_stats(sender, instance: Attempt, **kwargs):
+    """
+    Ответы попытки удаляются каскадом, их вопросы считаются заново следующим запуском item_stats
+    """
+    item_stats.mark_stale(Testing.objects.filter(attempt=instance))
+
+
+@receiver(post_delete, sender=Attempt)
+def delete_attempt_stats(sender, instance: Attempt, **kwargs):
+    stats.refresh_groups([(instance.student_id, instance.subject_id)])
@@ -0,0 +1,139 @@
+"""
+Поддержка таблицы StudentSubjectStats: новая попытка добавляется приращением,
+изменение и удаление пересчитывают только затронутые пары (студент, предмет)
+"""
+from collections.abc import Iterable, Iterator
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, QuerySet, Sum
+from django.db.models.functions import Coalesce, Greatest
+
+from example.models import Attempt, StudentSubjectStats
+
+DEFAULT_CHUNK_SIZE = 1000
+PAIRS_PER_QUERY = 200  # SQLite ограничивает глубину выражения, OR по парам режется на пачки
+STATS_FIELDS = "attempt_count", "result_sum", "best_result", "last_attempt_date"
+
+
+def add_attempt(attempt: Attempt) -> None:
+    """
+    Новая попытка: приращение счетчиков без агрегации по таблице попыток
+    """
+    updated = StudentSubjectStats.objects.filter(student_id=attempt.student_id, subject_id=attempt.subject_id).update(
+        attempt_count=F("attempt_count") + 1,
+        result_sum=F("result_sum") + attempt.result,
+        best_result=Greatest(F("best_result"), attempt.result),
+        last_attempt_date=Greatest(Coalesce(F("last_attempt_date"), attempt.date), attempt.date),
+    )
+    if not updated:
+        refresh_groups([(attempt.student_id, attempt.subject_id)])
+
+
+def aggregate(attempts: QuerySet) -> QuerySet:
+    """
+    Живой агрегат по попыткам, сгруппированный по (студент, предмет)
+    """
+    return (
+        attempts.order_by()
+        .values("student_id", "subject_id")
+        .annotate(
+            attempt_count=Count("pk"),
+            result_sum=Sum("result"),
+            best_result=Max("result"),
+            last_attempt_date=Max("date"),
+        )
+    )
+
+
+def _pairs_filter(pairs: set) -> Q:
+    condition = Q()
+    for student_id, subject_id in pairs:
+        condition |= Q(student_id=student_id, subject_id=subject_id)
+    return condition
+
+
+def _write(rows: Iterable[dict]) -> int:
+    objects = [StudentSubjectStats(**row) for row in rows]
+    StudentSubjectStats.objects.bulk_create(
+        objects,
+        update_conflicts=True,
+        unique_fields=["student", "subject"],
+        update_fields=list(STATS_FIELDS),
+    )
+    return len(objects)
+
+
+def refresh_groups(pairs: Iterable[tuple[int, int]]) -> None:
+    """
+    Пересчет статистики для пар (student_id, subject_id); пустые группы удаляются
+    """
+    pairs = sorted(set(pairs))
+    for start in range(0, len(pairs), PAIRS_PER_QUERY):
+        chunk = set(pairs[start:start + PAIRS_PER_QUERY])
+        rows = list(aggregate(Attempt.objects.filter(_pairs_filter(chunk))))
+        _write(rows)
+        empty = chunk - {(row["student_id"], row["subject_id"]) for row in rows}
+        if empty:
+            StudentSubjectStats.objects.filter(_pairs_filter(empty)).delete()
+
+
+def refresh_for_attempts(attempts: QuerySet) -> None:
+    """
+    Пересчет групп попыток из queryset'а (после update() в обход сигналов)
+    """
+    pairs = attempts.order_by().values_list("student_id", "subject_id").distinct()
+    refresh_groups(pairs)
+
+
+def _student_chunks(chunk_size: int) -> Iterator[tuple[int, int]]:
+    """
+    Диапазоны id студентов, в которых есть попытки
+    """
+    last_id = 0
+    while True:
+        ids = list(
+            Attempt.objects.filter(student_id__gt=last_id).order_by("student_id")
+            .values_list("student_id", flat=True).distinct()[:chunk_size]
+        )
+        if not ids:
+            return
+        yield ids[0], ids[-1]
+        last_id = ids[-1]
+
+
+def rebuild(chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[int]:
+    """
+    Полная перестройка таблицы пачками студентов, отдает число записанных строк по пачкам
+    """
+    previous_id = 0
+    for first_id, last_id in _student_chunks(chunk_size):
+        rows = list(aggregate(Attempt.objects.filter(student_id__gte=first_id, student_id__lte=last_id)))
+        with transaction.atomic():
+            # строки студентов диапазона (и пропущенных без попыток) заменяются целиком
+            StudentSubjectStats.objects.filter(student_id__gt=previous_id, student_id__lte=last_id).delete()
+            written = _write(rows)
+        previous_id = last_id
+        yield written
+    StudentSubjectStats.objects.filter(student_id__gt=previous_id).delete()
+
+
+def check(chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Сверка таблицы с живым агрегатом, отдает расхождения
+    """
+    def normalize(row: dict) -> tuple:
+        return tuple(row[name] for name in STATS_FIELDS)
+
+    previous_id = 0
+    for first_id, last_id in _student_chunks(chunk_size):
+        live = {(row["student_id"], row["subject_id"]): normalize(row)
+                for row in aggregate(Attempt.objects.filter(student_id__gte=first_id, student_id__lte=last_id))}
+        stored = {(row["student_id"], row["subject_id"]): normalize(row)
+                  for row in StudentSubjectStats.objects.filter(student_id__gt=previous_id, student_id__lte=last_id)
+                  .values("student_id", "subject_id", *STATS_FIELDS)}
+        for pair in sorted(live.keys() | stored.keys()):
+            if live.get(pair) != stored.get(pair):
+                yield {"student_id": pair[0], "subject_id": pair[1], "live": live.get(pair), "stored": stored.get(pair)}
+        previous_id = last_id
+    for row in StudentSubjectStats.objects.filter(student_id__gt=previous_id).values("student_id", "subject_id", *STATS_FIELDS):
+        yield {"student_id": row["student_id"], "subject_id": row["subject_id"], "live": None, "stored": normalize(row)}
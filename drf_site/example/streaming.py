@@ -0,0 +1,114 @@
+"""
+Потоковая выгрузка queryset'а без сборки всего списка в памяти: строки читаются
+через .iterator(chunk_size=...) и сериализуются по одной
+"""
+import json
+from collections.abc import AsyncIterator, Iterator
+
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from rest_framework.request import Request
+from rest_framework.serializers import BaseSerializer
+from rest_framework.utils.encoders import JSONEncoder
+
+from example.renderers import NDJSONRenderer
+
+CHUNK_SIZE = 2000
+ROWS_PER_WRITE = 200  # строк в одном куске ответа
+
+
+def stream_format(request: Request) -> str | None:
+    """
+    "ndjson" для Accept: application/x-ndjson или ?stream=ndjson, "json" для ?stream=1, иначе None
+    """
+    if request.accepted_renderer.format == NDJSONRenderer.format:
+        return "ndjson"
+    stream = request.query_params.get("stream", "").lower()
+    if stream == "ndjson":
+        return "ndjson"
+    if stream in ("1", "true", "json"):
+        return "json"
+    return None
+
+
+def iter_rows(queryset: QuerySet, serializer_class: type[BaseSerializer], chunk_size: int = CHUNK_SIZE) -> Iterator:
+    serializer = serializer_class()  # один сериализатор на весь поток
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        yield serializer.to_representation(instance)
+
+
+def iter_ndjson(rows: Iterator) -> Iterator[bytes]:
+    encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    buffer = []
+    for row in rows:
+        buffer.append(encoder.encode(row))
+        if len(buffer) >= ROWS_PER_WRITE:
+            yield ("\n".join(buffer) + "\n").encode()
+            buffer = []
+    if buffer:
+        yield ("\n".join(buffer) + "\n").encode()
+
+
+def iter_json_array(rows: Iterator, key: str = "data") -> Iterator[bytes]:
+    """
+    {"data": [...]} - та же форма, что и у обычного ответа, но по кускам
+    """
+    encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    yield f"{{{json.dumps(key)}:[".encode()
+    buffer, first = [], True
+    for row in rows:
+        buffer.append(encoder.encode(row))
+        if len(buffer) >= ROWS_PER_WRITE:
+            yield (("" if first else ",") + ",".join(buffer)).encode()
+            buffer, first = [], False
+    if buffer:
+        yield (("" if first else ",") + ",".join(buffer)).encode()
+    yield b"]}"
+
+
+def stream_queryset(queryset: QuerySet, serializer_class: type[BaseSerializer], fmt: str) -> StreamingHttpResponse:
+    rows = iter_rows(queryset, serializer_class)
+    if fmt == "ndjson":
+        return StreamingHttpResponse(iter_ndjson(rows), content_type=NDJSONRenderer.media_type)
+    return StreamingHttpResponse(iter_json_array(rows), content_type="application/json")
+
+
+async def aiter_batches(queryset: QuerySet, serializer_class: type[BaseSerializer],
+                        chunk_size: int = CHUNK_SIZE) -> AsyncIterator[list]:
+    """
+    iter_rows() для async view: строки через aiterator(), сериализованные пачками по ROWS_PER_WRITE
+    """
+    serializer = serializer_class()
+    batch = []
+    async for instance in queryset.aiterator(chunk_size=chunk_size):
+        batch.append(serializer.to_representation(instance))
+        if len(batch) >= ROWS_PER_WRITE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def aiter_ndjson(batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    async for rows in batches:
+        yield b"".join(iter_ndjson(rows))
+
+
+async def aiter_json_array(batches: AsyncIterator[list], key: str = "data") -> AsyncIterator[bytes]:
+    encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    yield f"{{{json.dumps(key)}:[".encode()
+    first = True
+    async for rows in batches:
+        yield (("" if first else ",") + ",".join(encoder.encode(row) for row in rows)).encode()
+        first = False
+    yield b"]}"
+
+
+def astream_queryset(queryset: QuerySet, serializer_class: type[BaseSerializer], fmt: str) -> StreamingHttpResponse:
+    """
+    stream_queryset() с асинхронным итератором: под ASGI ответ отдается без потока на весь запрос
+    """
+    batches = aiter_batches(queryset, serializer_class)
+    if fmt == "ndjson":
+        return StreamingHttpResponse(aiter_ndjson(batches), content_type=NDJSONRenderer.media_type)
+    return StreamingHttpResponse(aiter_json_array(batches), content_type="application/json")
@@ -1,3 +1,1216 @@
-from django.test import TestCase
+import base64
+import json
+import re
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from io import StringIO
+
+from django.contrib import admin
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from example import admin_performance, authentication, dataset, middleware, grading, item_stats, search, stats
+from example.models import (
+    Subject, Student, Attempt, Question, Answer, Testing,
+    StudentSubjectStats, QuestionStats, ItemStatsRun, RequestProfile
+)
+from example.compiled import compile_serializer
+from example.serializers import (
+    AnswerSerializer, AttemptSerializer, QuestionSerializer, QuizQuestionSerializer,
+    SubjectSerializer, TestingSerializer, get_query_plan
+)
+
+
+def create_rows(count: int, start: int = 0) -> None:
+    """
+    Создает count цепочек Subject -> Question -> Answer -> Attempt -> Testing
+    """
+    for num in range(start, start + count):
+        subject = Subject.objects.create(title=f"Тема {num}")
+        student = Student.objects.create(name=f"Студент {num}")
+        question = Question.objects.create(text=f"Вопрос {num}", subject=subject)
+        answer = Answer.objects.create(text=f"Ответ {num}", is_correct=bool(num % 2), question=question)
+        attempt = Attempt.objects.create(student=student, subject=subject, date=date(2020, 1, 1), result=50)
+        Testing.objects.create(attempt=attempt, question=question, answer=answer)
+
+
+class EagerLoadingTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def count_queries(self, url: str) -> int:
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_answer_plan(self):
+        plan = get_query_plan(AnswerSerializer, Answer)
+        self.assertEqual(plan.select_related, {"question"})
+        self.assertEqual(plan.only, {"text", "is_correct", "question", "question__text"})
+
+    def test_query_count_is_constant(self):
+        for url in ("/api/v1/answers/", "/api/v1/testings/?page_size=100", "/api/v1/attempts/?page_size=100"):
+            create_rows(3)
+            small = self.count_queries(url)
+            create_rows(20, start=100)
+            self.assertEqual(small, self.count_queries(url), url)
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        create_rows(12)
+
+    def walk(self, url: str) -> list:
+        ids = []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                data = self.client.get(url).json()
+            self.assertFalse(any("COUNT(" in query["sql"] for query in ctx.captured_queries))
+            ids.extend(row["id"] for row in data["results"])
+            url = data["next"]
+        return ids
+
+    def test_testings_walk_by_id(self):
+        ids = self.walk("/api/v1/testings/?page_size=5")
+        self.assertEqual(ids, sorted(Testing.objects.values_list("id", flat=True)))
+
+    def test_attempts_stable_under_inserts(self):
+        first = self.client.get("/api/v1/attempts/?page_size=5").json()
+        Attempt.objects.update(date=date(2020, 1, 1))
+        create_rows(3, start=50)  # новые строки не сдвигают уже выданные страницы
+        rest = self.walk(first["next"])
+        expected = list(Attempt.objects.filter(id__lte=12).order_by("-date", "-id").values_list("id", flat=True))
+        self.assertEqual([row["id"] for row in first["results"]] + rest, expected)
+
+        previous = self.client.get(self.client.get(first["next"]).json()["previous"]).json()
+        self.assertEqual(previous["results"], first["results"])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get("/api/v1/testings/?cursor=broken").status_code, 404)
+
+
+class BulkTestingTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        create_rows(5)
+
+    def payload(self) -> list:
+        return [{"attempt": testing.attempt_id, "question": testing.question_id, "answer": testing.answer_id}
+                for testing in Testing.objects.all()]
+
+    def test_bulk_create(self):
+        data = self.payload()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post("/api/v1/testings/", data, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()), len(data))
+        self.assertEqual(Testing.objects.count(), 2 * len(data))
+        inserts = [query for query in ctx.captured_queries if query["sql"].startswith('INSERT INTO "example_testing"')]
+        self.assertEqual(len(inserts), 1)
+        # 3 IN запроса + транзакция + INSERT + UPDATE результатов + пересчет статистики (3 запроса)
+        # + пометка stale для статистики вопросов
+        self.assertLessEqual(len(ctx.captured_queries), 11)
+
+    def test_bulk_errors_per_item(self):
+        data = self.payload()
+        data[1]["answer"] = 10 ** 6
+        data[3]["question"] = "abc"
+        response = self.client.post("/api/v1/testings/", data, format="json")
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertIn("answer", errors[1])
+        self.assertIn("question", errors[3])
+        self.assertEqual(Testing.objects.count(), len(data))
+
+
+class GradingTestCase(TestCase):
+    def setUp(self):
+        subject = Subject.objects.create(title="Тема")
+        student = Student.objects.create(name="Студент")
+        self.attempt = Attempt.objects.create(student=student, subject=subject, date=date(2020, 1, 1), result=0)
+        self.answers = []
+        for num in range(3):
+            question = Question.objects.create(text=f"Вопрос {num}", subject=subject)
+            self.answers.append(Answer.objects.create(text="Ответ", is_correct=num < 2, question=question))
+        Testing.objects.bulk_create(
+            Testing(attempt=self.attempt, question=answer.question, answer=answer) for answer in self.answers
+        )
+
+    def result(self) -> int:
+        self.attempt.refresh_from_db()
+        return self.attempt.result
+
+    def test_grade_attempt(self):
+        grading.grade_attempt(self.attempt.pk)
+        self.assertEqual(self.result(), 67)
+
+    def test_grade_after_answer_changes(self):
+        self.answers[2].is_correct = True
+        self.answers[2].save()
+        self.assertEqual(self.result(), 100)
+
+        admin = User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(admin)
+        self.client.post("/admin/example/answer/", {
+            "action": "set_incorrect_answer", "_selected_action": [self.answers[0].pk]
+        })
+        self.assertEqual(self.result(), 67)
+
+    def test_grade_after_bulk_submission(self):
+        data = [{"attempt": self.attempt.pk, "question": answer.question_id, "answer": answer.pk}
+                for answer in self.answers[:2]]
+        APIClient().post("/api/v1/testings/", data, format="json")
+        self.assertEqual(self.result(), 80)
+
+    def test_regrade_after_deletes(self):
+        Testing.objects.get(answer=self.answers[2]).delete()
+        self.assertEqual(self.result(), 100)
+        Testing.objects.create(attempt=self.attempt, question=self.answers[2].question, answer=self.answers[2])
+        self.assertEqual(self.result(), 67)
+        self.answers[0].delete()  # каскад удаляет ответ попытки
+        self.assertEqual(self.result(), 50)
+        Question.objects.filter(pk=self.answers[1].question_id).delete()
+        self.assertEqual(self.result(), 0)
+
+    def test_attempt_delete_query_count_is_fixed(self):
+        student, subject = Student.objects.first(), Subject.objects.first()
+        counts = []
+        for size in (3, 20):
+            attempt = Attempt.objects.create(student=student, subject=subject, date=date(2020, 1, 1), result=0)
+            Testing.objects.bulk_create(
+                Testing(attempt=attempt, question=answer.question, answer=answer)
+                for answer in self.answers * (size // 3 + 1)
+            )
+            with CaptureQueriesContext(connection) as captured:
+                attempt.delete()
+            counts.append(len(captured))
+        self.assertEqual(counts[0], counts[1], counts)
+        self.assertFalse(Testing.objects.filter(attempt_id=attempt.pk).exists())
+
+    def test_regrade_command(self):
+        out = StringIO()
+        call_command("regrade", chunk_size=1, stdout=out)
+        self.assertEqual(self.result(), 67)
+        self.assertIn("1", out.getvalue())
+
+
+class QuizTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.subject = Subject.objects.create(title="Тема")
+        for num in range(30):
+            question = Question.objects.create(text=f"Вопрос {num}", subject=self.subject)
+            Answer.objects.bulk_create(Answer(text=f"Ответ {i}", is_correct=i == 0, question=question) for i in range(3))
+
+    def test_quiz_in_two_queries(self):
+        url = f"/api/v1/subject/{self.subject.pk}/quiz/?n=10"
+        self.client.get(url)  # прогрев индекса id
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(url).json()
+        self.assertLessEqual(len(ctx.captured_queries), 2)
+        self.assertFalse(any("RANDOM" in query["sql"].upper() for query in ctx.captured_queries))
+        self.assertEqual(len(data["questions"]), 10)
+        self.assertEqual(len({question["id"] for question in data["questions"]}), 10)
+        self.assertTrue(all(len(question["answers"]) == 3 for question in data["questions"]))
+        self.assertNotIn("is_correct", data["questions"][0]["answers"][0])
+
+    def test_unknown_subject(self):
+        self.assertEqual(self.client.get("/api/v1/subject/999/quiz/").status_code, 404)
+
+    def test_invalid_quiz_size(self):
+        response = self.client.get(f"/api/v1/subject/{self.subject.pk}/quiz/?n=abc")
+        self.assertEqual((response.status_code, response.json()), (400, {"n": "Must be an integer"}))
+        self.assertEqual(self.client.get("/api/v1/subject/999/quiz/?n=abc").status_code, 400)
+
+    def test_random_subject_any_ids(self):
+        Subject.objects.all().delete()
+        subject = Subject.objects.create(pk=1000, title="Другая тема")
+        data = self.client.get("/api/v1/subject/get_random/").json()
+        self.assertEqual(data["random_subject"]["title"], subject.title)
+
+
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.subjects = [Subject.objects.create(title=f"Тема {num}") for num in range(3)]
+        self.question = Question.objects.create(text="Вопрос", subject=self.subjects[0])
+
+    def test_cached_and_not_modified(self):
+        for url in ("/api/v1/subject/", f"/api/v1/subject/{self.subjects[0].pk}/",
+                    f"/api/v1/questions/{self.question.pk}/"):
+            first = self.client.get(url, HTTP_ACCEPT="application/json")
+            self.assertEqual(first.status_code, 200)
+            with CaptureQueriesContext(connection) as ctx:
+                cached = self.client.get(url, HTTP_ACCEPT="application/json")
+                conditional = self.client.get(url, HTTP_ACCEPT="application/json", HTTP_IF_NONE_MATCH=first["ETag"])
+            self.assertEqual(len(ctx.captured_queries), 0, url)
+            self.assertEqual(cached.content, first.content)
+            self.assertEqual(conditional.status_code, 304)
+            self.assertIn("Last-Modified", cached)
+
+    def test_invalidation_is_per_object(self):
+        url_first = f"/api/v1/subject/{self.subjects[0].pk}/"
+        url_second = f"/api/v1/subject/{self.subjects[1].pk}/"
+        etags = {url: self.client.get(url, HTTP_ACCEPT="application/json")["ETag"]
+                 for url in ("/api/v1/subject/", url_first, url_second)}
+
+        self.subjects[0].title = "Новая тема"
+        self.subjects[0].save()
+
+        response = self.client.get(url_first, HTTP_ACCEPT="application/json", HTTP_IF_NONE_MATCH=etags[url_first])
+        self.assertEqual(response.json()["title"], "Новая тема")
+        listing = self.client.get("/api/v1/subject/", HTTP_ACCEPT="application/json")
+        self.assertNotEqual(listing["ETag"], etags["/api/v1/subject/"])
+        unchanged = self.client.get(url_second, HTTP_ACCEPT="application/json", HTTP_IF_NONE_MATCH=etags[url_second])
+        self.assertEqual(unchanged.status_code, 304)
+
+    def test_padded_pk_shares_object_generation(self):
+        subject = self.subjects[0]
+        padded = f"/api/v1/subject/0{subject.pk}/"
+        self.assertEqual(self.client.get(padded, HTTP_ACCEPT="application/json").json()["title"], subject.title)
+        self.client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+        self.client.patch(f"/api/v1/subject/{subject.pk}/", {"title": "Новая тема"}, format="json")
+        self.assertEqual(self.client.get(padded, HTTP_ACCEPT="application/json").json()["title"], "Новая тема")
+        self.assertEqual(self.client.get("/api/v1/subject/abc/", HTTP_ACCEPT="application/json").status_code, 404)
+
+
+class StreamingTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        create_rows(7)
+
+    def test_stream_matches_regular_response(self):
+        for url in ("/api/v1/answers/", "/api/v1/students/"):
+            expected = self.client.get(url, HTTP_ACCEPT="application/json").json()["data"]
+
+            response = self.client.get(url + "?stream=1")
+            self.assertTrue(response.streaming)
+            self.assertEqual(json.loads(b"".join(response.streaming_content))["data"], expected)
+
+            response = self.client.get(url, HTTP_ACCEPT="application/x-ndjson")
+            self.assertEqual(response["Content-Type"], "application/x-ndjson")
+            lines = b"".join(response.streaming_content).decode().splitlines()
+            self.assertEqual([json.loads(line) for line in lines], expected)
+
+
+class CompiledSerializerTestCase(TestCase):
+    cases = (
+        (SubjectSerializer, Subject),
+        (AttemptSerializer, Attempt),
+        (TestingSerializer, Testing),
+        (QuestionSerializer, Question),
+    )
+
+    def setUp(self):
+        self.client = APIClient()
+        create_rows(6)
+        Question.objects.create(text="Вопрос \"с кавычками\" и юникодом ✓\n", subject=Subject.objects.first())
+
+    def test_parity(self):
+        renderer = JSONRenderer()
+        for serializer_class, model in self.cases:
+            compiled = compile_serializer(serializer_class)
+            self.assertIsNotNone(compiled, serializer_class)
+            queryset = model.objects.order_by("pk")
+            expected = renderer.render(serializer_class(queryset, many=True).data)
+            self.assertEqual(renderer.render(compiled.serialize(compiled.values(queryset))), expected)
+
+    def test_list_endpoints(self):
+        renderer = JSONRenderer()
+        for url, serializer_class, queryset in (
+            ("/api/v1/testings/?page_size=100", TestingSerializer, Testing.objects.order_by("id")),
+            ("/api/v1/attempts/?page_size=100", AttemptSerializer, Attempt.objects.order_by("-date", "-id")),
+        ):
+            response = self.client.get(url, HTTP_ACCEPT="application/json")
+            expected = renderer.render(serializer_class(queryset, many=True).data)
+            self.assertEqual(renderer.render(response.json()["results"]), expected)
+
+    def test_not_compilable(self):
+        self.assertIsNone(compile_serializer(QuizQuestionSerializer))
+
+
+class CachedAuthenticationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user("student", password="secret-password")
+        authentication.credentials_cache.clear()
+        authentication.users_cache.clear()
+        enabled = mock.patch.object(authentication, "CACHE_ENABLED", True)  # как с REDIS_URL
+        enabled.start()
+        self.addCleanup(enabled.stop)
+
+    def post_attempt(self, **headers):
+        subject = Subject.objects.create(title="Тема")
+        student = Student.objects.create(name="Студент")
+        data = {"student": student.pk, "subject": subject.pk, "date": "2020-01-01", "result": 0}
+        return self.client.post("/api/v1/attempts/", data, format="json", **headers)
+
+    def test_basic_checks_password_once(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Basic " + base64.b64encode(b"student:secret-password").decode())
+        with mock.patch("django.contrib.auth.base_user.check_password", wraps=check_password) as checked:
+            self.assertEqual(self.post_attempt().status_code, 201)
+            self.assertEqual(self.post_attempt().status_code, 201)
+        self.assertEqual(checked.call_count, 1)
+
+        self.user.set_password("new-password")
+        self.user.save()
+        self.assertEqual(self.post_attempt().status_code, 401)
+
+    def test_jwt_user_cache(self):
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(self.post_attempt().status_code, 201)
+        with CaptureQueriesContext(connection) as ctx:
+            self.post_attempt()
+        self.assertFalse(any("auth_user" in query["sql"] for query in ctx.captured_queries))
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.post_attempt().status_code, 401)
+
+    def test_disabled_without_shared_cache(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Basic " + base64.b64encode(b"student:secret-password").decode())
+        with mock.patch.object(authentication, "CACHE_ENABLED", False), \
+                mock.patch("django.contrib.auth.base_user.check_password", wraps=check_password) as checked:
+            self.assertEqual(self.post_attempt().status_code, 201)
+            self.assertEqual(self.post_attempt().status_code, 201)
+        self.assertEqual(checked.call_count, 2)
+        self.assertEqual(len(authentication.credentials_cache.data), 0)
+
+
+class StudentSubjectStatsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.subjects = [Subject.objects.create(title=f"Тема {num}") for num in range(2)]
+        self.student = Student.objects.create(name="Студент")
+
+    def attempt(self, result: int, day: int = 1, subject: int = 0) -> Attempt:
+        return Attempt.objects.create(student=self.student, subject=self.subjects[subject],
+                                      date=date(2020, 1, day), result=result)
+
+    def assert_consistent(self):
+        self.assertEqual(list(stats.check()), [])
+
+    def test_incremental_updates(self):
+        first = self.attempt(40, day=1)
+        second = self.attempt(80, day=5)
+        row = StudentSubjectStats.objects.get()
+        self.assertEqual((row.attempt_count, row.average_result, row.best_result), (2, 60.0, 80))
+        self.assertEqual(row.last_attempt_date, date(2020, 1, 5))
+
+        second.subject = self.subjects[1]
+        second.save()
+        self.assert_consistent()
+        first.delete()
+        self.assert_consistent()
+        self.assertEqual(StudentSubjectStats.objects.count(), 1)
+
+        Attempt.objects.update(result=10)  # update() в обход сигналов
+        call_command("rebuild_stats", stdout=StringIO())
+        self.assertEqual(StudentSubjectStats.objects.get().best_result, 10)
+
+    def test_api(self):
+        self.attempt(50)
+        self.attempt(70, subject=1)
+        data = self.client.get(f"/api/v1/students/{self.student.pk}/stats/").json()
+        self.assertEqual([row["best_result"] for row in data["results"]], [50, 70])
+        data = self.client.get(f"/api/v1/stats/?subject={self.subjects[1].pk}").json()
+        self.assertEqual(len(data["results"]), 1)
+        self.assertEqual(data["results"][0]["average_result"], 70.0)
+
+    def test_sparse_fieldset_narrows_sql(self):
+        from example.serializers import StudentSubjectStatsSerializer
+
+        self.attempt(50)
+        self.attempt(70, day=3)
+        plan = get_query_plan(StudentSubjectStatsSerializer, StudentSubjectStats)
+        self.assertIn("result_sum", plan.only)
+        with CaptureQueriesContext(connection) as captured:
+            data = self.client.get("/api/v1/stats/?fields=student").json()
+        sql = captured[-1]["sql"]
+        self.assertIn('"student_id"', sql)
+        self.assertNotIn('"result_sum"', sql)
+        self.assertEqual(data["results"], [{"student": self.student.pk}])
+        with CaptureQueriesContext(connection) as captured:
+            data = self.client.get("/api/v1/stats/?fields=average_result").json()
+        self.assertNotIn('"best_result"', captured[-1]["sql"])
+        self.assertEqual(data["results"], [{"average_result": 60.0}])
+
+
+class ItemStatsTestCase(TestCase):
+    def setUp(self):
+        self.subject = Subject.objects.create(title="Тема")
+        self.question = Question.objects.create(text="Вопрос", subject=self.subject)
+        self.answers = [Answer.objects.create(text=f"Ответ {num}", is_correct=num == 0, question=self.question)
+                        for num in range(3)]
+
+    def answer(self, results_and_answers):
+        student = Student.objects.create(name="Студент")
+        for result, answer in results_and_answers:
+            attempt = Attempt.objects.create(student=student, subject=self.subject, date=date(2020, 1, 1), result=0)
+            Testing.objects.create(attempt=attempt, question=self.question, answer=self.answers[answer])
+            Attempt.objects.filter(pk=attempt.pk).update(result=result)  # итог попытки по всем вопросам теста
+
+    def test_statistics_and_incremental_run(self):
+        self.answer([(90, 0), (80, 0), (30, 1), (20, 2)])
+        item_stats.run(chunk_size=3)
+        self.answer([(70, 0), (40, 1)])
+        item_stats.run(chunk_size=3)
+        incremental = QuestionStats.objects.values("responses", "correct", "difficulty", "discrimination",
+                                                   "answer_counts").get()
+        self.assertEqual(ItemStatsRun.objects.last().rows, 2)
+
+        item_stats.run(full=True)
+        full = QuestionStats.objects.values("responses", "correct", "difficulty", "discrimination",
+                                            "answer_counts").get()
+        self.assertEqual(incremental, full)
+        self.assertEqual(full["responses"], 6)
+        self.assertAlmostEqual(full["difficulty"], 0.5)
+        self.assertGreater(full["discrimination"], 0.8)
+
+        data = APIClient().get(f"/api/v1/questions/{self.question.pk}/", HTTP_ACCEPT="application/json").json()
+        self.assertEqual(data["stats"]["responses"], 6)
+        self.assertEqual([row["count"] for row in data["stats"]["distractors"]], [3, 2, 1])
+
+    def test_counted_rows_changes_are_recomputed(self):
+        other = Question.objects.create(text="Другой вопрос", subject=self.subject)
+        other_answer = Answer.objects.create(text="Ответ", is_correct=True, question=other)
+        self.answer([(90, 0), (30, 1), (20, 2)])
+        item_stats.run()
+
+        # смена правильного ответа пересчитывает попытки, уже учтенные в суммах
+        self.answers[1].is_correct = True
+        self.answers[1].save()
+        self.assertTrue(QuestionStats.objects.get().stale)
+        # старая попытка получает еще ответ, одна строка удаляется
+        attempt = Testing.objects.get(answer=self.answers[0]).attempt
+        Testing.objects.create(attempt=attempt, question=other, answer=other_answer)
+        Testing.objects.filter(answer=self.answers[2]).delete()
+        item_stats.run()
+        fields = "question_id", "responses", "correct", "result_sum", "answer_counts", "stale"
+        incremental = list(QuestionStats.objects.order_by("question_id").values(*fields))
+
+        item_stats.run(full=True)
+        full = list(QuestionStats.objects.order_by("question_id").values(*fields))
+        self.assertEqual(incremental, full)
+        self.assertEqual((full[0]["responses"], full[0]["correct"]), (2, 2))
+
+        Attempt.objects.get(pk=attempt.pk).delete()
+        self.assertTrue(QuestionStats.objects.get(question=self.question).stale)
+
+    def test_concurrent_run_is_refused(self):
+        self.answer([(90, 0)])
+        ItemStatsRun.objects.create(last_testing_id=0)  # запуск, который идет в другом процессе
+        with self.assertRaisesMessage(CommandError, "--force"):
+            item_stats.run()
+        self.assertFalse(QuestionStats.objects.exists())
+        self.assertEqual(item_stats.run(force=True).rows, 1)
+        self.assertFalse(ItemStatsRun.objects.filter(finished_at__isnull=True).exists())
+
+
+class SearchTestCase(TestCase):
+    def setUp(self):
+        self.subject = Subject.objects.create(title="География")
+        self.capital = Question.objects.create(text="Столица Франции?", subject=self.subject)
+        self.river = Question.objects.create(text="Самая длинная река?", subject=self.subject)
+        Answer.objects.create(text="Париж", is_correct=True, question=self.capital)
+        Answer.objects.create(text="Амазонка", is_correct=True, question=self.river)
+
+    def search(self, query: str) -> list[int]:
+        data = APIClient().get("/api/v1/questions/search/", {"q": query}, HTTP_ACCEPT="application/json").json()
+        return [row["id"] for row in data["results"]]
+
+    def test_question_and_answer_text(self):
+        self.assertTrue(search.is_available())
+        self.assertEqual(self.search("столиц"), [self.capital.pk])
+        self.assertEqual(self.search("амазонка"), [self.river.pk])
+        self.assertEqual(self.search("столица париж"), [])
+        self.assertEqual(APIClient().get("/api/v1/questions/search/", {"q": "  "}).status_code, 400)
+
+    def test_index_follows_updates(self):
+        Question.objects.filter(pk=self.capital.pk).update(text="Столица Италии?")  # триггеры работают и без ORM
+        self.assertEqual(self.search("франции"), [])
+        self.assertEqual(self.search("италии"), [self.capital.pk])
+        self.river.delete()
+        self.assertEqual(self.search("амазонка"), [])
+
+    def test_rebuild_and_admin(self):
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(self.search("река"), [self.river.pk])
+
+        admin = User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(admin)
+        response = self.client.get("/admin/example/question/", {"q": "франции"})
+        self.assertEqual([question.pk for question in response.context["cl"].result_list], [self.capital.pk])
+        response = self.client.get("/admin/example/answer/", {"q": "длинная"})
+        self.assertEqual([answer.text for answer in response.context["cl"].result_list], ["Амазонка"])
+
+
+class AdminChangelistTestCase(TestCase):
+    def setUp(self):
+        admin_user = User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(admin_user)
+        self.model_admins = [model_admin for model, model_admin in admin.site._registry.items()
+                             if model._meta.app_label == "example"]
+
+    def changelist_queries(self, model_admin, params=None) -> int:
+        opts = model_admin.model._meta
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/admin/{opts.app_label}/{opts.model_name}/", params or {})
+        self.assertEqual(response.status_code, 200, opts.model_name)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_page(self):
+        create_rows(2)
+        list(stats.rebuild())
+        small = {model_admin: self.changelist_queries(model_admin) for model_admin in self.model_admins}
+        create_rows(10, start=2)
+        list(stats.rebuild())
+        for model_admin in self.model_admins:
+            with self.subTest(model_admin=model_admin):
+                self.assertEqual(self.changelist_queries(model_admin), small[model_admin])
+                self.assertLessEqual(small[model_admin], 12)
+
+    def test_related_id_filter(self):
+        create_rows(3)
+        question = Question.objects.last()
+        response = self.client.get("/admin/example/testing/", {"question__id__exact": question.pk})
+        self.assertEqual([row.question_id for row in response.context["cl"].result_list], [question.pk])
+        self.assertContains(response, 'name="question__id__exact"')
+
+    def test_estimated_count(self):
+        create_rows(8)
+        Answer.objects.filter(pk=Answer.objects.first().pk).delete()
+        with mock.patch.object(admin_performance, "EXACT_COUNT_LIMIT", 2):
+            # без фильтров - по максимальному ключу, с фильтрами - счет останавливается на limit + 1
+            self.assertEqual(admin_performance.EstimatedCountPaginator(Answer.objects.order_by("pk"), 10).count, 8)
+            self.assertEqual(admin_performance.estimate_count(Answer.objects.filter(is_correct=False)), 3)
+        self.assertEqual(admin_performance.estimate_count(Answer.objects.all()), 7)
+
+    def test_pages_past_count_limit(self):
+        create_rows(8)
+        Answer.objects.update(is_correct=False)
+        filtered = Answer.objects.filter(is_correct=False).order_by("pk")
+        with mock.patch.object(admin_performance, "EXACT_COUNT_LIMIT", 2):
+            first = admin_performance.EstimatedCountPaginator(filtered, 2)
+            self.assertEqual((first.count, first.num_pages, first.count_is_lower_bound), (3, 2, True))
+            third = admin_performance.EstimatedCountPaginator(filtered, 2, page_number=3)
+            self.assertEqual((third.num_pages, len(third.page(3))), (4, 2))  # проба нашла строки дальше
+            last = admin_performance.EstimatedCountPaginator(filtered, 2, page_number=4)
+            self.assertEqual((last.count, last.count_is_lower_bound), (8, False))
+
+            with mock.patch.object(admin.site._registry[Answer], "list_per_page", 2):
+                response = self.client.get("/admin/example/answer/", {"is_correct__exact": 0, "p": 3})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context["cl"].result_list), 2)
+            self.assertContains(response, "больше 6")
+
+
+class DatasetTestCase(TestCase):
+    def generate(self, **overrides) -> dict:
+        return dataset.generate(dataset.get_config("tiny", **overrides), flush=True)
+
+    def test_deterministic_and_consistent(self):
+        summary = self.generate()
+        self.assertEqual(summary["rows"]["Student"], 20)
+        self.assertEqual(summary["rows"]["Testing"], Testing.objects.count())
+        rows = list(Testing.objects.order_by("pk").values_list("attempt_id", "question_id", "answer_id"))
+
+        # у каждого вопроса ровно один правильный ответ, ответ принадлежит вопросу из предмета попытки
+        self.assertFalse(Question.objects.exclude(answer__is_correct=True).exists())
+        self.assertEqual(Answer.objects.filter(is_correct=True).count(), Question.objects.count())
+        self.assertFalse(Testing.objects.exclude(answer__question=F("question")).exists())
+        self.assertFalse(Testing.objects.exclude(question__subject=F("attempt__subject")).exists())
+        results = dict(Attempt.objects.values_list("pk", "result"))
+        grading.grade_queryset(Attempt.objects.all())
+        self.assertEqual(dict(Attempt.objects.values_list("pk", "result")), results)
+        self.assertFalse(list(stats.check()))
+
+        self.generate()
+        self.assertEqual(list(Testing.objects.order_by("pk").values_list("attempt_id", "question_id", "answer_id")), rows)
+        self.generate(seed=2)
+        self.assertNotEqual(list(Testing.objects.order_by("pk").values_list("attempt_id", "question_id", "answer_id")), rows)
+
+    def test_command_requires_flush(self):
+        create_rows(1)
+        with self.assertRaises(CommandError):
+            call_command("generate_data", "--preset", "tiny", stdout=StringIO())
+        call_command("generate_data", "--preset", "tiny", "--students", "5", "--flush", stdout=StringIO())
+        self.assertEqual(Student.objects.count(), 5)
+
+
+class EndpointBenchmarkTestCase(TestCase):
+    def test_every_api_route_is_covered(self):
+        from django.urls import get_resolver
+        from example.benchmarks import endpoints
+
+        def routes(patterns, prefix=""):
+            for pattern in patterns:
+                route = prefix + str(pattern.pattern)
+                if hasattr(pattern, "url_patterns"):
+                    yield from routes(pattern.url_patterns, route)
+                else:
+                    yield "/" + route
+
+        covered = {template.split("?")[0] for template in endpoints.ENDPOINTS.values()}
+        for route in routes(get_resolver().url_patterns):
+            if not route.startswith("/api/") or "auth/" in route or "(?P<format>" in route:
+                continue  # формы входа djoser/DRF и суффиксы формата роутера
+            generic = re.sub(r"<int:pk>|\(\?P<pk>\[\^/.\]\+\)", "{x}", route).replace("^", "").replace("$", "")
+            with self.subTest(route=route):
+                self.assertTrue(
+                    route in endpoints.SKIPPED or generic == "/api/v1/"
+                    or any(re.sub(r"\{\w+\}", "{x}", url) == generic for url in covered),
+                    route,
+                )
+
+    def test_run_and_compare(self):
+        from example.benchmarks import endpoints
+
+        dataset.generate(dataset.get_config("tiny"), flush=True)
+        existing = User.objects.create_user(endpoints.BENCHMARK_USERNAME, password="password")
+        result = endpoints.run(iterations=2, endpoints=["subject-list", "question-detail", "attempts"])
+        self.assertEqual(set(result["endpoints"]), {"subject-list", "question-detail", "attempts"})
+        self.assertTrue(all(row["status"] == 200 and row["bytes"] for row in result["endpoints"].values()))
+        # временный пользователь удален, учетная запись с тем же именем осталась без изменений
+        self.assertEqual(list(User.objects.filter(username__startswith=endpoints.BENCHMARK_USERNAME)), [existing])
+        self.assertFalse(User.objects.get(pk=existing.pk).is_staff)
+        self.assertEqual(endpoints.compare(result, result), [])
+
+        budget = json.loads(json.dumps(result))
+        budget["endpoints"]["attempts"]["queries"] -= 1
+        self.assertEqual(len(endpoints.compare(result, budget)), 1)
+
+        del budget["endpoints"]["subject-list"]
+        self.assertIn("subject-list: нет в базовой линии", endpoints.compare(result, budget))
+
+    def test_dataset_flag_is_guarded(self):
+        from django.test import override_settings
+
+        create_rows(1)
+        with self.assertRaisesMessage(CommandError, "DEBUG"):  # тесты идут с DEBUG = False, как production
+            call_command("benchmark", "search", "--dataset", "tiny", "--noinput", stdout=StringIO())
+        with override_settings(DEBUG=True), mock.patch("builtins.input", return_value="no"):
+            with self.assertRaisesMessage(CommandError, "Отменено"):
+                call_command("benchmark", "search", "--dataset", "tiny", stdout=StringIO())
+        self.assertEqual(Subject.objects.get().title, "Тема 0")
+
+
+class ServerTimingTestCase(TestCase):
+    def setUp(self):
+        create_rows(3)
+
+    def metrics(self, response) -> dict:
+        return {item.split(";")[0].strip(): item for item in response["Server-Timing"].split(",")}
+
+    def test_header(self):
+        response = APIClient().get("/api/v1/attempts/", HTTP_ACCEPT="application/json")
+        metrics = self.metrics(response)
+        self.assertEqual(set(metrics), {"db", "serialize", "render", "total"})
+        self.assertIn('desc="', metrics["db"])
+
+        response = APIClient().get(f"/api/v1/questions/{Question.objects.first().pk}/", HTTP_ACCEPT="application/json")
+        self.assertIn("serialize", self.metrics(response))
+
+    def test_serializers_are_not_patched(self):
+        from rest_framework import serializers
+
+        APIClient().get("/api/v1/answers/", HTTP_ACCEPT="application/json")
+        for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+            self.assertFalse(hasattr(serializer_class.to_representation, "__wrapped__"))
+        response = APIClient().get(f"/api/v1/subject/{Subject.objects.first().pk}/", HTTP_ACCEPT="application/json")
+        self.assertIn("serialize", self.metrics(response))
+
+    def test_sampling_and_slow_log(self):
+        with mock.patch.object(middleware, "SAMPLE_RATE", 0):
+            self.assertFalse(APIClient().get("/api/v1/attempts/").has_header("Server-Timing"))
+
+        with mock.patch.object(middleware, "SLOW_REQUEST_MS", 0), \
+                self.assertLogs("example.timing", level="WARNING") as logs:
+            APIClient().get("/api/v1/attempts/", HTTP_ACCEPT="application/json")
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line["path"], "/api/v1/attempts/")
+        self.assertEqual(line["queries"], len(line["slow_queries"]))
+        self.assertTrue(all("SELECT" in query["sql"] for query in line["slow_queries"]))
+
+
+class ProfilerTestCase(TestCase):
+    def setUp(self):
+        create_rows(2)
+        self.staff = User.objects.create_user("staff", password="password", is_staff=True)
+        self.user = User.objects.create_user("user", password="password")
+
+    def client_for(self, user) -> APIClient:
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        return client
+
+    def test_staff_only(self):
+        response = self.client_for(self.user).get("/api/v1/subject/?profile=pstats")
+        self.assertEqual(response["Content-Type"], "application/json")
+        response = APIClient().get("/api/v1/subject/", HTTP_X_PROFILE="store")
+        self.assertFalse(response.has_header("X-Profile-Id"))
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_download_modes(self):
+        import marshal
+
+        response = self.client_for(self.staff).get("/api/v1/subject/?profile=pstats")
+        self.assertIn("attachment", response["Content-Disposition"])
+        stats = marshal.loads(response.content)
+        self.assertTrue(any(name == "list" for _, _, name in stats))
+
+        response = self.client_for(self.staff).get("/api/v1/attempts/", HTTP_X_PROFILE="collapsed")
+        self.assertTrue(response["Content-Disposition"].endswith('.collapsed.txt"'))
+        for line in response.content.decode().splitlines():  # "файл:функция;файл:функция число"
+            self.assertRegex(line, r"^[^;]+:[^;]+(;[^;]+:[^;]+)* \d+$")
+
+    def test_overlapping_samplers_restore_switch_interval(self):
+        import sys
+        import threading
+
+        from example.profiling import StackSampler
+
+        original = sys.getswitchinterval()
+        first = StackSampler(threading.get_ident(), interval=0.002)
+        second = StackSampler(threading.get_ident(), interval=0.001)
+        first.__enter__()
+        second.__enter__()
+        first.__exit__(None, None, None)  # выходит не в порядке входа, как параллельные запросы
+        self.assertEqual(sys.getswitchinterval(), 0.001)
+        second.__exit__(None, None, None)
+        self.assertEqual(sys.getswitchinterval(), original)
+
+    def test_store_and_admin(self):
+        response = self.client_for(self.staff).get("/api/v1/subject/?profile=store")
+        self.assertEqual(response.status_code, 200)
+        profile = RequestProfile.objects.get(pk=response["X-Profile-Id"])
+        self.assertEqual((profile.path, profile.user), ("/api/v1/subject/?profile=store", self.staff))
+        self.assertIn("function calls", profile.summary)
+
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "password"))
+        self.assertContains(self.client.get(f"/admin/example/requestprofile/{profile.pk}/change/"), "function calls")
+        response = self.client.get(f"/admin/example/requestprofile/{profile.pk}/download/")
+        self.assertEqual(response.content, bytes(profile.stats))
+
+
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        create_rows(7)
+        for answer in Answer.objects.all():
+            Answer.objects.create(text=f"{answer.text} второй", is_correct=False, question=answer.question)
+        self.subject = Subject.objects.first()
+        self.question = Question.objects.first()
+
+    def urls(self) -> list[str]:
+        return [
+            "/api/v1/subject/", "/api/v1/subject/?page=2&page_size=3", f"/api/v1/subject/{self.subject.pk}/",
+            f"/api/v1/questions/{self.question.pk}/", "/api/v1/answers/", "/api/v1/students/",
+        ]
+
+    def test_same_responses_as_sync_views(self):
+        client = APIClient()
+        for url in self.urls():
+            async_url = url.replace("/api/v1/", "/api/v1/async/")
+            with self.subTest(url=url):
+                expected = client.get(url, HTTP_ACCEPT="application/json")
+                response = client.get(async_url, HTTP_ACCEPT="application/json")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), json.loads(expected.content.replace(b"/api/v1/", b"/api/v1/async/")))
+
+    async def test_under_asgi(self):
+        for url in self.urls():
+            response = await self.async_client.get(url.replace("/api/v1/", "/api/v1/async/"),
+                                                   headers={"accept": "application/json"})
+            self.assertEqual(response.status_code, 200, url)
+
+        response = await self.async_client.get("/api/v1/async/subject/", headers={"accept": "application/json"})
+        self.assertIn("ETag", response)
+        self.assertIn("db;", response["Server-Timing"])
+        response = await self.async_client.get("/api/v1/async/subject/",
+                                               headers={"accept": "application/json", "if-none-match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+        response = await self.async_client.get(f"/api/v1/async/subject/{self.subject.pk}/quiz/?n=3")
+        self.assertEqual(len(response.json()["questions"]), 1)
+        self.assertEqual(len(response.json()["questions"][0]["answers"]), 2)
+        self.assertEqual((await self.async_client.get("/api/v1/async/subject/999/quiz/")).status_code, 404)
+        response = await self.async_client.get(f"/api/v1/async/subject/{self.subject.pk}/quiz/?n=abc")
+        self.assertEqual((response.status_code, response.json()), (400, {"n": "Must be an integer"}))
+        self.assertEqual((await self.async_client.get("/api/v1/async/subject/999/")).status_code, 404)
+        self.assertEqual((await self.async_client.get("/api/v1/async/subject/?page=9")).status_code, 404)
+
+    async def test_profiler_under_asgi(self):
+        staff = await User.objects.acreate(username="staff", is_staff=True)
+        headers = {"accept": "application/json", "authorization": f"Bearer {AccessToken.for_user(staff)}"}
+        response = await self.async_client.get("/api/v1/async/students/?profile=store", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        profile = await RequestProfile.objects.aget(pk=response["X-Profile-Id"])
+        self.assertEqual(profile.user_id, staff.pk)
+
+    async def test_async_streaming(self):
+        for url in ("/api/v1/answers/", "/api/v1/students/"):
+            expected = (await self.async_client.get(url, headers={"accept": "application/json"})).json()["data"]
+            async_url = url.replace("/api/v1/", "/api/v1/async/")
+
+            response = await self.async_client.get(async_url + "?stream=1")
+            content = b"".join([chunk async for chunk in response.streaming_content])
+            self.assertEqual(json.loads(content)["data"], expected)
+
+            response = await self.async_client.get(async_url, headers={"accept": "application/x-ndjson"})
+            lines = b"".join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+            self.assertEqual([json.loads(line) for line in lines], expected)
+
+
+class ConcurrencyBenchmarkTestCase(TransactionTestCase):
+    """
+    Запросы идут через ASGIHandler/WSGIHandler в отдельных потоках - данные должны быть закоммичены
+    """
+    databases = {"default", "replica"}
+
+    def test_run(self):
+        from example.benchmarks import concurrency
+
+        create_rows(3)
+        result = concurrency.run(iterations=4, concurrency=[2], routes=["subject-detail", "answers"])
+        self.assertEqual(set(result["routes"]), {"subject-detail", "answers"})
+        for route in result["routes"].values():
+            self.assertEqual(set(route), set(concurrency.MODES))
+            self.assertTrue(all(level["2"]["errors"] == 0 and level["2"]["requests_per_sec"] for level in route.values()))
+
+
+class DatabaseProfileTestCase(TransactionTestCase):
+    databases = {"default", "replica"}
+
+    def test_pragmas_and_routing(self):
+        from django.db import connections, transaction
+
+        self.assertEqual(Subject.objects.all().db, "replica")
+        with transaction.atomic():
+            self.assertEqual(Subject.objects.all().db, "default")  # свои незакоммиченные записи видны
+        self.assertEqual(Subject.objects.create(title="Тема")._state.db, "default")
+
+        with connections["replica"].cursor() as cursor:
+            self.assertEqual(cursor.execute("PRAGMA query_only").fetchone()[0], 1)
+        with connections["default"].cursor() as cursor:
+            self.assertEqual(cursor.execute("PRAGMA query_only").fetchone()[0], 0)
+            self.assertEqual(cursor.execute("PRAGMA busy_timeout").fetchone()[0], 5000)
+
+    def test_benchmark(self):
+        from example.benchmarks import sqlite
+
+        create_rows(3)
+        result = sqlite.run(iterations=20, concurrency=[2])
+        for profile in sqlite.PROFILES:
+            level = result["profiles"][profile]["2"]
+            self.assertEqual((level["errors"], level["reads"] + level["writes"]), (0, 20))
+        self.assertEqual(Testing.objects.count(), 3)  # нагрузка пишет только в копию базы
+
+
+class QuestionImportTestCase(TestCase):
+    csv_text = (
+        "subject,question,answer_1,answer_2,answer_3,correct\n"
+        "Тема,Сколько будет 2+2?,3,4,,2\n"
+        "Физика,Единица силы,Ньютон,Джоуль,Ватт,1\n"
+        "Физика,Без правильного ответа,А,Б,,\n"
+        "Физика,Плохой номер,А,Б,,x\n"
+        "Физика,\"Вопрос, с запятой\",А,Б,,1;2\n"
+    )
+
+    def setUp(self):
+        self.subject = Subject.objects.create(title="Тема")
+
+    def test_command_csv(self):
+        import tempfile
+
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", encoding="utf-8-sig", delete=False) as file:
+            file.write(self.csv_text)
+        out = StringIO()
+        call_command("import_questions", file.name, "--batch-size", "2", stdout=out)
+        report = json.loads(out.getvalue()[out.getvalue().index("{"):])
+
+        self.assertEqual((report["rows"], report["questions"], report["answers"]), (5, 3, 7))
+        self.assertEqual(report["subjects_created"], 1)
+        self.assertEqual([error["line"] for error in report["errors"]], [4, 5])
+        self.assertEqual(Question.objects.get(text="Сколько будет 2+2?").subject, self.subject)
+        self.assertEqual(Answer.objects.filter(question__text="Вопрос, с запятой", is_correct=True).count(), 2)
+        quiz = APIClient().get(f"/api/v1/subject/{self.subject.pk}/quiz/").json()
+        self.assertEqual([question["text"] for question in quiz["questions"]], ["Сколько будет 2+2?"])
+
+    def test_upload_jsonl(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        lines = [
+            {"subject": "Тема", "question": "Вопрос", "answers": [{"text": "Да", "is_correct": True}, {"text": "Нет"}]},
+            "не json",
+            {"subject": "", "question": "Без предмета", "answers": [{"text": "Да", "is_correct": True}]},
+        ]
+        content = "\n".join(line if isinstance(line, str) else json.dumps(line, ensure_ascii=False) for line in lines)
+        client = APIClient()
+        upload = lambda: SimpleUploadedFile("bank.jsonl", content.encode())  # noqa: E731
+
+        client.force_authenticate(User.objects.create_user("user"))
+        self.assertEqual(client.post("/api/v1/questions/import/", {"file": upload()}).status_code, 403)
+
+        client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+        report = client.post("/api/v1/questions/import/", {"file": upload()}).json()
+        self.assertEqual((report["questions"], report["answers"], report["error_count"]), (1, 2, 2))
+        self.assertEqual(client.post("/api/v1/questions/import/", {}).status_code, 400)
+        response = client.post("/api/v1/questions/import/", {"file": SimpleUploadedFile("bank.txt", b"")})
+        self.assertEqual(response.status_code, 400)
+
+    def test_jsonl_rows_with_wrong_types(self):
+        from example import question_import
+
+        lines = [
+            {"subject": "Тема", "question": 42, "answers": [{"text": "Да", "is_correct": True}]},
+            {"subject": ["x"], "question": "Вопрос", "answers": [{"text": "Да", "is_correct": True}]},
+            {"subject": "Тема", "question": "Вопрос", "answers": [{"text": None, "is_correct": True}]},
+            {"subject": "Тема", "question": "Вопрос", "answers": [{"text": "Да", "is_correct": True}]},
+        ]
+        report = question_import.import_questions(question_import.jsonl_records(json.dumps(line) for line in lines))
+        self.assertEqual((report["questions"], report["error_count"]), (1, 3))
+        self.assertFalse(Answer.objects.filter(text="None").exists())
+
+    def test_failed_batch_leaves_no_subjects(self):
+        from django.db import DatabaseError
+
+        from example import question_import
+
+        records = question_import.csv_records(self.csv_text.splitlines())
+        with mock.patch.object(Answer.objects, "bulk_create", side_effect=DatabaseError("сбой")):
+            report = question_import.import_questions(records)
+        self.assertEqual((report["questions"], report["subjects_created"]), (0, 0))
+        self.assertFalse(Subject.objects.filter(title="Физика").exists())
+
+    def test_invalid_encoding_inserts_nothing(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        content = "subject,question,answer_1,correct\nТема,Вопрос,Да,1\n".encode() + b"\xff\xfe,x,y,1\n"
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+        response = client.post("/api/v1/questions/import/", {"file": SimpleUploadedFile("bank.csv", content)})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Строка 3", str(response.json()["file"]))
+        self.assertFalse(Question.objects.exists())
+
+    def test_reported_errors_are_capped(self):
+        from example import question_import
+
+        rows = ((line, question_import.RowError("ошибка")) for line in range(question_import.MAX_REPORTED_ERRORS + 5))
+        report = question_import.import_questions(rows)
+        self.assertEqual(report["error_count"], question_import.MAX_REPORTED_ERRORS + 5)
+        self.assertEqual(len(report["errors"]), question_import.MAX_REPORTED_ERRORS)
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        create_rows(5)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+
+    def read_csv(self, content: bytes) -> list[list[str]]:
+        import csv
+
+        return list(csv.reader(StringIO(content.decode())))
+
+    def test_attempts_in_chunks(self):
+        from example import export
+
+        attempt = Attempt.objects.order_by("pk").first()
+        response = self.client.get("/api/v1/attempts/export/")
+        rows = self.read_csv(b"".join(response.streaming_content))
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(rows[0], list(export.EXPORTS["attempts"][1]))
+        self.assertEqual(rows[1], [str(attempt.pk), str(attempt.date), str(attempt.student_id), attempt.student.name,
+                                   str(attempt.subject_id), attempt.subject.title, str(attempt.result)])
+        self.assertEqual([int(row[0]) for row in rows[1:]], list(Attempt.objects.order_by("pk").values_list("pk", flat=True)))
+
+        with CaptureQueriesContext(connection) as captured:
+            chunks = list(export.iter_chunks(export.export_queryset("attempts"), chunk_size=2))
+        self.assertEqual([len(rows) for rows in chunks], [2, 2, 1])
+        self.assertEqual(len(captured), 3)  # запрос на пачку, связи через join
+
+    def test_testings_incremental_and_gzip(self):
+        import gzip
+
+        since_id = Testing.objects.order_by("pk")[2].pk
+        response = self.client.get("/api/v1/testings/export/", {"since_id": since_id, "compress": "gzip"})
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="testings.csv.gz"')
+        rows = self.read_csv(gzip.decompress(b"".join(response.streaming_content)))
+        self.assertEqual(rows[0][:3], ["id", "attempt_id", "student_id"])
+        self.assertEqual([int(row[0]) for row in rows[1:]],
+                         list(Testing.objects.filter(pk__gt=since_id).order_by("pk").values_list("pk", flat=True)))
+
+        Attempt.objects.filter(pk=Testing.objects.order_by("pk").first().attempt_id).update(date=date(2000, 1, 1))
+        response = self.client.get("/api/v1/testings/export/", {"since_date": "2001-01-01"})
+        self.assertEqual(len(self.read_csv(b"".join(response.streaming_content))), Testing.objects.count())
+
+    def test_validation_and_permissions(self):
+        self.assertEqual(self.client.get("/api/v1/attempts/export/", {"since_id": "x"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/attempts/export/", {"since_date": "вчера"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/attempts/export/", {"compress": "zip"}).status_code, 400)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("user"))
+        self.assertEqual(client.get("/api/v1/attempts/export/").status_code, 403)
+
+    def test_command(self):
+        import gzip
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/attempts.csv.gz"
+            out = StringIO()
+            call_command("export_results", "attempts", "--output", path, "--gzip", stdout=out)
+            with gzip.open(path, "rt") as file:
+                self.assertEqual(len(self.read_csv(file.read().encode())), Attempt.objects.count() + 1)
+        self.assertIn(f"last_id={Attempt.objects.order_by('pk').last().pk}", out.getvalue())
+
+
+class SparseFieldsetTestCase(TestCase):
+    def setUp(self):
+        create_rows(3)
+        self.client = APIClient()
+
+    def get(self, url: str) -> tuple[dict, list[str]]:
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json(), [query["sql"] for query in captured]
+
+    def test_list_narrows_json_and_columns(self):
+        data, queries = self.get("/api/v1/attempts/?fields=id,result")
+        self.assertEqual([list(row) for row in data["results"]], [["id", "result"]] * 3)
+        select = next(sql for sql in queries if "example_attempt" in sql)
+        self.assertNotIn("student_id", select.split("FROM")[0])
+
+        data, _ = self.get("/api/v1/testings/?exclude=attempt,question")
+        self.assertEqual(list(data["results"][0]), ["id", "answer"])
+        full, _ = self.get("/api/v1/testings/")
+        self.assertEqual([{"id": row["id"], "answer": row["answer"]} for row in full["results"]], data["results"])
+
+    def test_detail_skips_text_and_is_cached_per_fieldset(self):
+        question = Question.objects.order_by("pk").first()
+        full, _ = self.get(f"/api/v1/questions/{question.pk}/")
+        data, queries = self.get(f"/api/v1/questions/{question.pk}/?fields=id,subject")
+        self.assertEqual(data, {"id": question.pk, "subject": question.subject_id})
+        self.assertNotIn('"text"', " ".join(queries))
+        self.assertIn("text", full)
+        self.assertEqual(self.get(f"/api/v1/questions/{question.pk}/")[0], full)
+
+        data, _ = self.get(f"/api/v1/questions/search/?q={question.text.split()[0]}&fields=id")
+        self.assertEqual(set(data["results"][0]), {"id", "rank"})
+
+    def test_unknown_field(self):
+        response = self.client.get("/api/v1/attempts/?fields=id,secret")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("secret", response.json()["fields"])
+        self.assertEqual(self.client.get("/api/v1/attempts/?fields=id&exclude=id").status_code, 400)
+
+    def test_writes_keep_all_fields(self):
+        from example.serializers import AttemptSerializer, sparse_serializer_class
+
+        self.assertIs(sparse_serializer_class({}, AttemptSerializer), AttemptSerializer)
+        student, subject = Student.objects.first(), Subject.objects.first()
+        self.client.force_authenticate(User.objects.create_user("user"))
+        response = self.client.post("/api/v1/attempts/?fields=id", {
+            "student": student.pk, "subject": subject.pk, "date": "2024-01-01", "result": 10
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["result"], 10)
+
+
+class QuestionBatchTestCase(TestCase):
+    def setUp(self):
+        create_rows(5)
+        for question in Question.objects.all():
+            Answer.objects.create(text="Еще ответ", is_correct=False, question=question)
+        self.client = APIClient()
+
+    def test_order_missing_and_query_count(self):
+        ids = list(Question.objects.order_by("-pk").values_list("pk", flat=True))
+        absent = ids[0] + 1000
+        for count in (1, 5):
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get("/api/v1/questions/", {"ids": ",".join(map(str, [*ids[:count], absent]))})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(captured), 2)  # вопросы с предметом и prefetch ответов
+        data = response.json()
+        self.assertEqual([question["id"] for question in data["results"]], ids)
+        self.assertEqual(data["missing"], [absent])
+        question = Question.objects.get(pk=ids[0])
+        self.assertEqual(data["results"][0]["subject_title"], question.subject.title)
+        self.assertEqual(sorted(answer["id"] for answer in data["results"][0]["answers"]),
+                         sorted(question.answer_set.values_list("pk", flat=True)))
+        self.assertNotIn("is_correct", data["results"][0]["answers"][0])
+
+    def test_post_is_read_for_everyone(self):
+        ids = list(Question.objects.values_list("pk", flat=True))
+        response = self.client.post("/api/v1/questions/", {"ids": [ids[1], ids[0], ids[1]]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([question["id"] for question in response.json()["results"]], [ids[1], ids[0]])
+        self.assertEqual(self.client.put("/api/v1/questions/", {"ids": ids}, format="json").status_code, 401)
+
+    def test_validation(self):
+        from example.views import QuestionBatchApiView
+
+        too_many = ",".join(map(str, range(1, QuestionBatchApiView.max_batch_size + 2)))
+        for ids in ("", "1,x", too_many, "0", "1,99999999999999999999999"):
+            self.assertEqual(self.client.get("/api/v1/questions/", {"ids": ids}).status_code, 400, ids)
+        for body in ({"ids": [True]}, {"ids": [1.5]}, {"ids": "1,2"}, [1, 2], {"ids": [1, 2 ** 70]}):
+            self.assertEqual(self.client.post("/api/v1/questions/", body, format="json").status_code, 400, body)
+
+
+class SubjectQuestionsTestCase(TestCase):
+    def setUp(self):
+        self.subject = Subject.objects.create(title="Тема")
+        other = Subject.objects.create(title="Другая тема")
+        for num in range(12):
+            question = Question.objects.create(text=f"Вопрос {num}", subject=self.subject)
+            for answer in range(num % 4 + 1):
+                Answer.objects.create(text=f"Ответ {answer}", is_correct=answer == 0, question=question)
+        Question.objects.create(text="Чужой вопрос", subject=other)
+        self.client = APIClient()
+
+    def get(self, query: str = "") -> tuple[dict, int]:
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(f"/api/v1/subject/{self.subject.pk}/questions/{query}")
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(captured)
+
+    def test_query_count_is_fixed_for_any_page_size(self):
+        self.get()  # прогрев: индекс id предметов строится одним запросом при первом обращении
+        counts = set()
+        for page_size in (1, 5, 12, 100):
+            data, queries = self.get(f"?page_size={page_size}")
+            self.assertEqual(len(data["results"]), min(page_size, 12))
+            counts.add(queries)
+        self.assertEqual(counts, {3})  # COUNT, страница вопросов, prefetch ответов
+
+    def test_nested_answers(self):
+        data, _ = self.get("?page_size=100")
+        self.assertEqual(data["count"], 12)
+        questions = Question.objects.filter(subject=self.subject).order_by("pk")
+        self.assertEqual([question["id"] for question in data["results"]], [question.pk for question in questions])
+        first = data["results"][1]
+        self.assertEqual(first["answers"], [
+            {"id": answer.pk, "text": answer.text, "is_correct": answer.is_correct}
+            for answer in Answer.objects.filter(question_id=first["id"]).order_by("pk")
+        ])
+
+        data, _ = self.get("?fields=id,answers")
+        self.assertEqual(list(data["results"][0]), ["id", "answers"])
+        self.assertEqual(self.client.get("/api/v1/subject/0/questions/").status_code, 404)
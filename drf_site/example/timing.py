@@ -0,0 +1,96 @@
+"""
+Замеры одного запроса: число и время SQL запросов, сериализация и рендер.
+Заполняются через ServerTimingMiddleware, вне запроса все функции ничего не делают.
+Сериализацию отмечают сами view (serializer_data(), span("serialize")) - классы DRF не патчатся
+"""
+import heapq
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    """
+    Счетчики запроса; slow_limit самых медленных SQL хранятся в куче
+    """
+    def __init__(self, slow_limit: int = 0):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.spans = {}
+        self.active = set()
+        self.slow_limit = slow_limit
+        self.slow = []  # куча (секунды, sql)
+
+    def query_wrapper(self, execute, sql, params, many, context):
+        """
+        Для connection.execute_wrapper(): без debug курсора и копирования параметров
+        """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db += elapsed
+            if self.slow_limit:
+                if len(self.slow) < self.slow_limit:
+                    heapq.heappush(self.slow, (elapsed, sql))
+                elif elapsed > self.slow[0][0]:
+                    heapq.heapreplace(self.slow, (elapsed, sql))
+
+    def add(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def slowest(self) -> list[dict]:
+        return [{"ms": round(seconds * 1000, 3), "sql": sql[:500]} for seconds, sql in sorted(self.slow, reverse=True)]
+
+    def header(self) -> str:
+        metrics = [f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries"']
+        metrics += [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.spans.items()]
+        metrics.append(f"total;dur={self.total * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+def activate(timing: RequestTiming):
+    return _current.set(timing)
+
+
+def deactivate(token) -> None:
+    _current.reset(token)
+
+
+def current() -> RequestTiming | None:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str):
+    """
+    Время блока без SQL запросов внутри него; вложенные блоки с тем же именем не считаются дважды
+    """
+    timing = _current.get()
+    if timing is None or name in timing.active:
+        yield
+        return
+    timing.active.add(name)
+    started, db_before = time.perf_counter(), timing.db
+    try:
+        yield
+    finally:
+        timing.active.discard(name)
+        timing.add(name, time.perf_counter() - started - (timing.db - db_before))
+
+
+def serializer_data(serializer):
+    """
+    serializer.data под span serialize
+    """
+    with span("serialize"):
+        return serializer.data
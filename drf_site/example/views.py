@@ -1,26 +1,59 @@
-import random
+from datetime import date
+
+from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.forms import model_to_dict
-from drf_spectacular.utils import extend_schema, OpenApiResponse
-from rest_framework import generics, viewsets
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from rest_framework import generics, serializers, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import MultiPartParser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.request import Request
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAdminUser
+from rest_framework.settings import api_settings
 
+from example import export, question_import, sampling, search, timing
+from example.compiled import compile_serializer
+from example.pagination import AttemptKeysetPagination, KeysetPagination, TestingKeysetPagination
 from example.permissions import IsAdminOrReadOnly
+from example.renderers import CSVRenderer, NDJSONRenderer
+from example.response_cache import cache_response
+from example.streaming import stream_format, stream_queryset
 from example.models import (
     Subject, Attempt, Answer,
-    Student, Testing, Question
+    Student, Testing, Question,
+    StudentSubjectStats
 )
 from example.serializers import (
     SubjectSerializer, AnswerSerializer,
     StudentSerializer, TestingSerializer,
-    AttemptSerializer, QuestionSerializer
+    AttemptSerializer, QuestionSerializer,
+    QuizQuestionSerializer, StudentSubjectStatsSerializer,
+    QuestionDetailSerializer, QuestionBatchSerializer, QuestionWithAnswersSerializer,
+    optimize_queryset, sparse_serializer_class
 )
 
 
+FIELDSET_PARAMETERS = [
+    OpenApiParameter("fields", str, description="Только эти поля через запятую, например id,result"),
+    OpenApiParameter("exclude", str, description="Все поля, кроме перечисленных через запятую"),
+]
+
+
+def parse_quiz_size(query_params, default: int, maximum: int) -> int:
+    """
+    Число вопросов квиза из ?n=, в пределах 1..maximum; не число - 400, а не 404 предмета
+    """
+    try:
+        count = int(query_params.get("n", default))
+    except ValueError:
+        raise ValidationError({"n": "Must be an integer"})
+    return max(1, min(count, maximum))
+
+
 class PaginationClass(PageNumberPagination):
     """
     Кастомный класс pagination
@@ -30,14 +63,68 @@ class PaginationClass(PageNumberPagination):
     max_page_size = 1000
 
 
+class EagerLoadingMixin:
+    """
+    Жадная загрузка связей queryset'а по полям сериализатора view
+    """
+    def get_queryset(self):
+        return optimize_queryset(super().get_queryset(), self.get_serializer_class())
+
+
+class SparseFieldsetMixin:
+    """
+    ?fields=a,b и ?exclude=c для GET: класс сериализатора с частью полей, по нему
+    EagerLoadingMixin строит only(), а CompiledListMixin - колонки values_list()
+    """
+    def get_serializer_class(self):
+        serializer_class = super().get_serializer_class()
+        if self.request is None or self.request.method not in ("GET", "HEAD"):
+            return serializer_class  # запись и ответ на нее - всегда со всеми полями
+        return sparse_serializer_class(self.request.query_params, serializer_class)
+
+
+class SerializeTimingMixin:
+    """
+    span serialize для list() и retrieve() generic view: serializer.data читает DRF внутри них.
+    Queryset вычисляется лениво в сериализаторе, время SQL span вычитает
+    """
+    def list(self, request, *args, **kwargs):
+        with timing.span("serialize"):
+            return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        with timing.span("serialize"):
+            return super().retrieve(request, *args, **kwargs)
+
+
+class CompiledListMixin:
+    """
+    list() через скомпилированный сериализатор: кортежи из values_list() вместо экземпляров моделей
+    """
+    def list(self, request, *args, **kwargs):
+        compiled = compile_serializer(self.get_serializer_class())
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = getattr(self.paginator, "ordering", None) or ()  # ключ keyset пагинации читается из строки
+        rows = compiled.values(queryset, extra=tuple(name.lstrip("-") for name in ordering))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(compiled.serialize(page))
+        return Response(compiled.serialize(rows))
+
+
 @extend_schema(description="Полный CRUD для модели Subject")
-class SubjectApiViewSet(viewsets.ModelViewSet):
+class SubjectApiViewSet(CompiledListMixin, SerializeTimingMixin, viewsets.ModelViewSet):
     """
     Viewset для получения всех вопросов
     """
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     pagination_class = PaginationClass
+    quiz_size = 20
+    max_quiz_size = 100
 
     # def get_queryset(self):
     #     return Subject.objects.all()[:2]  # возвращать первые 2 записи
@@ -93,6 +180,7 @@ class SubjectApiViewSet(viewsets.ModelViewSet):
             200: SubjectSerializer
         }
     )
+    @cache_response(detail=True)
     def retrieve(self, *args, **kwargs):
         """Получение одного вопроса"""
         return super().retrieve(*args, **kwargs)
@@ -104,6 +192,7 @@ class SubjectApiViewSet(viewsets.ModelViewSet):
             200: SubjectSerializer
         }
     )
+    @cache_response()
     def list(self, *args, **kwargs):
         """Получение всех вопросов"""
         return super().list(*args, **kwargs)
@@ -120,15 +209,72 @@ class SubjectApiViewSet(viewsets.ModelViewSet):
         """
         Получить рандомный вопрос из базы данных
         """
-        random_int: int = random.choice([num for num in range(1, 4)])
-        random_subject = Subject.objects.get(pk=random_int)
-        return Response({"random_subject": SubjectSerializer(random_subject).data})
+        random_id = sampling.random_subject_id()
+        random_subject = Subject.objects.filter(pk=random_id).first() if random_id is not None else None
+        if random_subject is None:
+            raise NotFound("No subjects")
+        return Response({"random_subject": timing.serializer_data(SubjectSerializer(random_subject))})
+
+    @extend_schema(
+        summary="Get random quiz for subject",
+        parameters=[OpenApiParameter("n", int, description="Количество вопросов (по умолчанию 20)")],
+        responses={
+            400: OpenApiResponse(description="n is not an integer"),
+            404: OpenApiResponse(description="No subject for id"),
+            200: QuizQuestionSerializer(many=True)
+        }
+    )
+    @action(methods=["GET"], detail=True)
+    def quiz(self, request: Request, pk=None) -> Response:
+        """
+        Случайные вопросы предмета с вариантами ответов
+        """
+        try:
+            subject_id = int(pk)
+        except ValueError:
+            raise NotFound("No subject for id")
+        count = parse_quiz_size(request.query_params, self.quiz_size, self.max_quiz_size)
+        if not sampling.get_index().has_subject(subject_id):
+            raise NotFound("No subject for id")
+
+        queryset = optimize_queryset(Question.objects.all(), QuizQuestionSerializer)
+        questions = sampling.sample_questions(subject_id, count, queryset)
+        data = timing.serializer_data(QuizQuestionSerializer(questions, many=True))
+        return Response({"subject": subject_id, "questions": data})
+
+    @extend_schema(
+        summary="Get subject questions with answers",
+        parameters=FIELDSET_PARAMETERS,
+        responses={
+            404: OpenApiResponse(description="No subject for id or invalid page"),
+            200: QuestionWithAnswersSerializer(many=True)
+        }
+    )
+    @action(methods=["GET"], detail=True)
+    def questions(self, request: Request, pk=None) -> Response:
+        """
+        Вопросы предмета с ответами по страницам: COUNT, страница вопросов и один prefetch ответов
+        при любом page_size
+        """
+        try:
+            subject_id = int(pk)
+        except ValueError:
+            raise NotFound("No subject for id")
+        if not sampling.get_index().has_subject(subject_id):
+            raise NotFound("No subject for id")
+
+        serializer_class = sparse_serializer_class(request.query_params, QuestionWithAnswersSerializer)
+        queryset = optimize_queryset(Question.objects.filter(subject_id=subject_id).order_by("pk"), serializer_class)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(timing.serializer_data(serializer_class(page, many=True)))
 
 
 class AnswerApiView(APIView):
     """
     Ответы
     """
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+
     @extend_schema(
         summary="Get all answers",
         responses={
@@ -140,8 +286,11 @@ class AnswerApiView(APIView):
         """
         Получаем все ответы
         """
-        ret = Answer.objects.all()
-        return Response({"data": AnswerSerializer(ret, many=True).data})
+        ret = optimize_queryset(Answer.objects.order_by("pk"), AnswerSerializer)
+        fmt = stream_format(request)
+        if fmt is not None:  # ?stream=1 или Accept: application/x-ndjson - без сборки всего списка в памяти
+            return stream_queryset(ret, AnswerSerializer, fmt)
+        return Response({"data": timing.serializer_data(AnswerSerializer(ret, many=True))})
 
     @extend_schema(
         summary="Add new answer",
@@ -162,13 +311,14 @@ class AnswerApiView(APIView):
             is_correct=request.data["is_correct"],
             question=request.data["question"]
         )
-        return Response({"new_answer": AnswerSerializer(new_answer).data})
+        return Response({"new_answer": timing.serializer_data(AnswerSerializer(new_answer))})
 
 
 class StudentApiView(APIView):
     """
     Студенты
     """
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
 
     @extend_schema(
         summary="Get all students",
@@ -181,8 +331,11 @@ class StudentApiView(APIView):
         """
         Получаем всех студентов
         """
-        ret = Student.objects.all()
-        return Response({"data": StudentSerializer(ret, many=True).data})
+        ret = Student.objects.order_by("pk")
+        fmt = stream_format(request)
+        if fmt is not None:
+            return stream_queryset(ret, StudentSerializer, fmt)
+        return Response({"data": timing.serializer_data(StudentSerializer(ret, many=True))})
 
     @extend_schema(
         summary="Create student",
@@ -199,7 +352,7 @@ class StudentApiView(APIView):
         serializer.is_valid(raise_exception=True)
         serializer.save()
 
-        return Response({"new_student": serializer.data})
+        return Response({"new_student": timing.serializer_data(serializer)})
 
     @extend_schema(
         summary="Update student by id",
@@ -223,17 +376,18 @@ class StudentApiView(APIView):
         serializer = StudentSerializer(data=request.data, instance=instance)
         serializer.is_valid()
         serializer.save()
-        return Response({"update_student": serializer.data})
+        return Response({"update_student": timing.serializer_data(serializer)})
 
 
-class AttemptView(generics.ListCreateAPIView):
+class AttemptView(SparseFieldsetMixin, CompiledListMixin, SerializeTimingMixin, EagerLoadingMixin,
+                  generics.ListCreateAPIView):
     """
     Класс для получения всех попыток и добавления новой
     """
     queryset = Attempt.objects.all()
     serializer_class = AttemptSerializer
     permission_classes = IsAuthenticatedOrReadOnly,  # добавлять только авторизованные или только читать
-    pagination_class = PaginationClass
+    pagination_class = AttemptKeysetPagination  # PaginationClass - постраничная пагинация с COUNT(*)
 
     @extend_schema(
         summary="Create attempt",
@@ -247,6 +401,7 @@ class AttemptView(generics.ListCreateAPIView):
 
     @extend_schema(
         summary="Get all attempts",
+        parameters=FIELDSET_PARAMETERS,
         responses={
             404: OpenApiResponse(description="No attempts"),
             200: AttemptSerializer
@@ -256,16 +411,24 @@ class AttemptView(generics.ListCreateAPIView):
         return super().get(*args, **kwargs)
 
 
-class TestingListApiView(generics.ListCreateAPIView):
+class TestingListApiView(SparseFieldsetMixin, CompiledListMixin, SerializeTimingMixin, EagerLoadingMixin,
+                         generics.ListCreateAPIView):
     """
     Класс для получения всех результатов тестирования и добавления нового результата
     """
     queryset = Testing.objects.all()
     serializer_class = TestingSerializer
-    pagination_class = PaginationClass
+    pagination_class = TestingKeysetPagination  # PaginationClass - постраничная пагинация с COUNT(*)
+    max_batch_size = 1000
+
+    def get_serializer(self, *args, **kwargs):
+        if isinstance(kwargs.get("data"), list):  # пакетная отправка всех ответов попытки одним запросом
+            kwargs.update(many=True, max_length=self.max_batch_size)
+        return super().get_serializer(*args, **kwargs)
 
     @extend_schema(
         summary="Create testing",
+        description="Принимает один объект или список объектов (пакетная вставка в одной транзакции)",
         responses={
             404: OpenApiResponse(description="Validation error"),
             201: TestingSerializer
@@ -276,6 +439,7 @@ class TestingListApiView(generics.ListCreateAPIView):
 
     @extend_schema(
         summary="Get all testings",
+        parameters=FIELDSET_PARAMETERS,
         responses={
             404: OpenApiResponse(description="No testings"),
             200: TestingSerializer
@@ -284,12 +448,13 @@ class TestingListApiView(generics.ListCreateAPIView):
     def get(self, *args, **kwargs):
         return super().get(*args, **kwargs)
 
-class QuestionDetailApiView(generics.RetrieveUpdateDestroyAPIView):
+class QuestionDetailApiView(SparseFieldsetMixin, SerializeTimingMixin, EagerLoadingMixin,
+                            generics.RetrieveUpdateDestroyAPIView):
     """
     Вопросы. Полный CRUD
     """
     queryset = Question.objects.all()
-    serializer_class = QuestionSerializer
+    serializer_class = QuestionDetailSerializer  # вместе со статистикой вопроса
     permission_classes = IsAdminOrReadOnly,
     pagination_class = PaginationClass
 
@@ -315,11 +480,13 @@ class QuestionDetailApiView(generics.RetrieveUpdateDestroyAPIView):
 
     @extend_schema(
         summary="Get all questions",
+        parameters=FIELDSET_PARAMETERS,
         responses={
             404: OpenApiResponse(description="No testing by id"),
             200: QuestionSerializer
         }
     )
+    @cache_response(detail=True)
     def get(self, *args, **kwargs):
         return super().get(*args, **kwargs)
 
@@ -332,3 +499,236 @@ class QuestionDetailApiView(generics.RetrieveUpdateDestroyAPIView):
     )
     def delete(self, *args, **kwargs):
         return super().delete(*args, **kwargs)
+
+
+class QuestionBatchApiView(SparseFieldsetMixin, EagerLoadingMixin, generics.GenericAPIView):
+    """
+    Несколько вопросов с предметом и вариантами ответов за один запрос: ?ids=1,2,3 или POST {"ids": [...]}.
+    Запросов к базе всегда два - вопросы с join предмета и prefetch ответов
+    """
+    queryset = Question.objects.all()
+    serializer_class = QuestionBatchSerializer
+    permission_classes = IsAdminOrReadOnly,
+    read_methods = "POST",  # POST только читает, для длинных списков id
+    max_batch_size = 100
+    max_id = 2 ** 63 - 1
+
+    def parse_ids(self, raw) -> list[int]:
+        """
+        id без повторов в порядке запроса; границы - диапазон INTEGER SQLite,
+        иначе драйвер падает с OverflowError (500 вместо 400)
+        """
+        field = serializers.ListField(
+            child=serializers.IntegerField(min_value=1, max_value=self.max_id),
+            allow_empty=False, max_length=self.max_batch_size,
+        )
+        if isinstance(raw, list) and any(isinstance(item, float) for item in raw):
+            raise ValidationError({"ids": "Ids must be integers"})
+        try:
+            ids = field.run_validation(raw)
+        except ValidationError as exc:
+            raise ValidationError({"ids": exc.detail})
+        return list(dict.fromkeys(ids))
+
+    def batch(self, raw) -> Response:
+        ids = self.parse_ids(raw)
+        questions = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer([questions[pk] for pk in ids if pk in questions], many=True)
+        return Response({"results": timing.serializer_data(serializer), "missing": [pk for pk in ids if pk not in questions]})
+
+    @extend_schema(
+        summary="Get questions by ids",
+        parameters=[
+            OpenApiParameter("ids", str, required=True, description="id вопросов через запятую"),
+            *FIELDSET_PARAMETERS,
+        ],
+        responses={
+            400: OpenApiResponse(description="No ids, invalid id or too many ids"),
+            200: QuestionBatchSerializer(many=True)
+        }
+    )
+    def get(self, request: Request) -> Response:
+        return self.batch([item for item in request.query_params.get("ids", "").split(",") if item.strip()])
+
+    @extend_schema(
+        summary="Get questions by ids (POST body)",
+        request={"application/json": {"type": "object", "properties": {
+            "ids": {"type": "array", "items": {"type": "integer"}}
+        }}},
+        responses={
+            400: OpenApiResponse(description="No ids, invalid id or too many ids"),
+            200: QuestionBatchSerializer(many=True)
+        }
+    )
+    def post(self, request: Request) -> Response:
+        return self.batch(request.data.get("ids") if isinstance(request.data, dict) else None)
+
+
+class StudentSubjectStatsApiView(SparseFieldsetMixin, SerializeTimingMixin, EagerLoadingMixin, generics.ListAPIView):
+    """
+    Статистика студентов по предметам из предрассчитанной таблицы
+    """
+    queryset = StudentSubjectStats.objects.all()
+    serializer_class = StudentSubjectStatsSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        filters = {
+            "student_id": self.kwargs.get("pk", self.request.query_params.get("student")),
+            "subject_id": self.request.query_params.get("subject"),
+        }
+        for name, value in filters.items():
+            if value is not None:
+                if not str(value).isdigit():
+                    raise NotFound(f"Invalid {name}")
+                queryset = queryset.filter(**{name: value})
+        return queryset
+
+    @extend_schema(
+        summary="Get student statistics by subject",
+        parameters=[
+            OpenApiParameter("student", int, description="Фильтр по студенту"),
+            OpenApiParameter("subject", int, description="Фильтр по предмету"),
+            *FIELDSET_PARAMETERS,
+        ],
+        responses={
+            200: StudentSubjectStatsSerializer
+        }
+    )
+    def get(self, *args, **kwargs):
+        return super().get(*args, **kwargs)
+
+
+class QuestionSearchApiView(APIView):
+    """
+    Полнотекстовый поиск вопросов по тексту вопроса и ответов
+    """
+    max_limit = 100
+
+    @extend_schema(
+        summary="Search questions",
+        parameters=[
+            OpenApiParameter("q", str, required=True, description="Поисковый запрос"),
+            OpenApiParameter("limit", int, description="Количество результатов (по умолчанию 20)"),
+            *FIELDSET_PARAMETERS,
+        ],
+        responses={
+            400: OpenApiResponse(description="Empty query"),
+            200: QuestionSerializer
+        }
+    )
+    def get(self, request: Request) -> Response:
+        query = request.query_params.get("q", "").strip()
+        if not search.build_match(query):
+            raise ValidationError({"q": "Empty query"})
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 20)), self.max_limit))
+        except ValueError:
+            raise ValidationError({"limit": "Must be integer"})
+
+        if search.is_available():
+            ranked = search.search_questions(query, limit)
+        else:
+            ids = Question.objects.filter(Q(text__icontains=query) | Q(answer__text__icontains=query))
+            ranked = [(pk, None) for pk in ids.order_by("pk").values_list("pk", flat=True).distinct()[:limit]]
+
+        serializer_class = sparse_serializer_class(request.query_params, QuestionSerializer)
+        questions = optimize_queryset(Question.objects.all(), serializer_class).in_bulk([pk for pk, _ in ranked])
+        with timing.span("serialize"):
+            results = [
+                {**serializer_class(questions[pk]).data, "rank": rank}
+                for pk, rank in ranked if pk in questions
+            ]
+        return Response({"results": results})
+
+
+class QuestionImportApiView(APIView):
+    """
+    Импорт банка вопросов из CSV или JSONL, только для администраторов
+    """
+    permission_classes = IsAdminUser,
+    parser_classes = MultiPartParser,
+
+    @extend_schema(
+        summary="Import questions",
+        request={
+            "multipart/form-data": {
+                "type": "object",
+                "properties": {
+                    "file": {"type": "string", "format": "binary"},
+                    "format": {"type": "string", "enum": list(question_import.FORMATS)},
+                },
+                "required": ["file"],
+            }
+        },
+        responses={
+            400: OpenApiResponse(description="No file or unknown format"),
+            200: OpenApiResponse(description="Import report: counters and per-row errors")
+        }
+    )
+    def post(self, request: Request) -> Response:
+        """
+        Файл читается построчно: большие загрузки Django хранит во временном файле, а не в памяти
+        """
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": "No file"})
+        try:
+            fmt = request.data.get("format") or question_import.detect_format(upload.name)
+            question_import.check_encoding(upload)  # до вставки первой пачки
+            upload.seek(0)
+            lines = (line.decode("utf-8-sig") for line in upload)
+            report = question_import.import_questions(question_import.read_records(lines, fmt))
+        except question_import.ImportFormatError as exc:
+            raise ValidationError({"file": str(exc)})
+        return Response(report)
+
+
+class ExportApiView(APIView):
+    """
+    Потоковая выгрузка попыток или результатов тестирования в CSV одним ответом, только для администраторов.
+    kind задается в urls.py: ExportApiView.as_view(kind="attempts")
+    """
+    kind = "attempts"
+    permission_classes = IsAdminUser,
+    renderer_classes = [CSVRenderer, *api_settings.DEFAULT_RENDERER_CLASSES]
+
+    @extend_schema(
+        summary="Export as CSV",
+        parameters=[
+            OpenApiParameter("since_id", int, description="Только строки с id больше указанного"),
+            OpenApiParameter("since_date", str, description="Только попытки с этой даты (YYYY-MM-DD)"),
+            OpenApiParameter("compress", str, enum=["gzip"], description="Файл .csv.gz, сжатие на лету"),
+        ],
+        responses={
+            400: OpenApiResponse(description="Invalid since_id, since_date or compress"),
+            200: OpenApiResponse(description="CSV, строки по возрастанию id")
+        }
+    )
+    def get(self, request: Request) -> StreamingHttpResponse:
+        """
+        Параметры проверяются до начала потока: после первого куска статус ответа уже не изменить
+        """
+        params = request.query_params
+        try:
+            since_id = int(params["since_id"]) if params.get("since_id") else None
+        except ValueError:
+            raise ValidationError({"since_id": "Must be an integer"})
+        try:
+            since_date = date.fromisoformat(params["since_date"]) if params.get("since_date") else None
+        except ValueError:
+            raise ValidationError({"since_date": "Must be a date in YYYY-MM-DD format"})
+        compress = params.get("compress", "")
+        if compress not in ("", "gzip"):
+            raise ValidationError({"compress": "Only gzip is supported"})
+
+        filename = f"{self.kind}.csv"
+        if compress:
+            filename += ".gz"
+        response = StreamingHttpResponse(
+            export.export_csv(self.kind, since_id, since_date, compress=bool(compress)),
+            content_type="application/gzip" if compress else "text/csv; charset=utf-8",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response